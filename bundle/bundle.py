@@ -3,6 +3,7 @@
 from bundle.datatypes import *
 from bundle.datausages import *
 from collections import defaultdict
+import numpy as np
 from defs import datatypes
 from utils import data_summary, debug, error, info, warning, equal_lengths, as_list
 
@@ -67,6 +68,10 @@ class DataPool:
     def __init__(self):
         self.demand = {}
         self.explicit_outputs = []
+        # cascade instance selections per chain, selected inputs and instance counts per stage
+        self.instance_selections = {}
+        self.selected_inputs = {}
+        self.pruning_stats = {}
 
     def add_explicit_output(self, src):
         self.explicit_outputs.append(src)
@@ -85,13 +90,16 @@ class DataPool:
         self.current_running_chain = None
 
     def add_data_packs(self, datapack_list, source_name):
+        selection = self.instance_selections.get(self.current_running_chain)
         for dp in datapack_list:
             dp.chain = self.current_running_chain
             dp.source = source_name
+            if selection is not None:
+                dp.selection_tag = selection[1]
             dp.generate_id(override_existing=False)
             self.add_data(dp)
 
-    def get_outputs(self):
+    def get_outputs(self, keep_arrays=False):
         # if report data exists, return just them
         output = {}
         do_explicit_outputs = False
@@ -107,10 +115,10 @@ class DataPool:
             if matches(dp):
                 if not do_explicit_outputs:
                     # add each output full datapack dict
-                    output[dp.get_id()] = dp.to_json()
+                    output[dp.get_id()] = dp.to_json(keep_arrays)
                 else:
                     # use the explcit output data only
-                    output[dp.get_id()] = dp.to_json()["data"]
+                    output[dp.get_id()] = dp.to_json(keep_arrays)["data"]
         return output
 
     def mark_as_reference_data(self):
@@ -242,9 +250,46 @@ class DataPool:
         for dat in self.data:
             # datum is relevant if chain or component are feeders
             if dat.source  in self.feeder_components or dat.chain in self.feeder_chains:
-                res.append(dat)
+                res.append(self.get_selected_input(dat))
         return res
 
+    def clear_instance_selections(self):
+        self.instance_selections, self.selected_inputs, self.pruning_stats = {}, {}, {}
+
+    def set_instance_selection(self, chain_name, selection, tag):
+        """Restrict inputs of the chain to the selected instances"""
+        self.instance_selections[chain_name] = (np.asarray(selection, dtype=np.int64), tag)
+
+    def has_instance_selection(self):
+        return self.current_running_chain in self.instance_selections
+
+    def get_selected_input(self, dat):
+        """Apply the instance selection of the running chain to an input, lazily and once per datapack"""
+        selection = self.instance_selections.get(self.current_running_chain)
+        if selection is None or dat.selection_tag is not None or type(dat.data) in (DummyData, Dictionary):
+            return dat
+        selection, tag = selection
+        key = (self.current_running_chain, id(dat))
+        if key not in self.selected_inputs:
+            num_instances = len(dat.data.instances)
+            error(f"Cascade selection [{tag}] exceeds the {num_instances} instances of {dat}", len(selection) > 0 and selection.max() >= num_instances)
+            self.log_pruning(self.current_running_chain, num_instances, len(selection))
+            self.selected_inputs[key] = dat.select_instances(selection, tag)
+        return self.selected_inputs[key]
+
+    def get_tag_instances(self, tag, chain_name):
+        """Fetch the instances of an index tag, produced by a chain"""
+        for dat in self.data_per_chain[chain_name]:
+            for u in dat.get_usage(Indices, allow_multiple=True):
+                if u.has_tag(tag):
+                    return u.get_tag_instances(tag)
+        error(f"No index tag [{tag}] produced by chain {chain_name}")
+
+    def log_pruning(self, stage, num_total, num_retained):
+        """Log the number of instances a stage is applied to"""
+        self.pruning_stats[stage] = (num_total, num_retained)
+        info(f"Stage {stage}: {num_retained} / {num_total} instances retained, {num_total - num_retained} pruned")
+
     def log_data_production(self, productions):
         """Log chain data dependencies"""
         # for prod in productions:
@@ -379,8 +424,12 @@ class DataPool:
     # endregion
 
     # region: has-ers
+    def has_usage(self, usage):
+        """Whether any current input carries the usage; data_per_usage is keyed by joined usage names"""
+        return any(dp.has_usage(usage) for dp in self.get_current_inputs())
+
     def has_labels(self):
-        return Labels.name in self.data_per_usage
+        return self.has_usage(Labels)
 
     def has_text(self):
         return Text.name in self.data_per_type
@@ -389,7 +438,7 @@ class DataPool:
         return Numeric.name in self.data_per_type
 
     def has_indices(self):
-        return Indices.name in self.data_per_usage
+        return self.has_usage(Indices)
     # endregion
 
     # region: setters
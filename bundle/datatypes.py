@@ -3,9 +3,10 @@
 import numpy as np
 from numbers import Number
 from collections import OrderedDict
+from scipy import sparse
 
 import defs
-from utils import error, data_summary, is_collection
+from utils import error, data_summary, is_collection, warning
 
 
 class Datatype:
@@ -39,7 +40,10 @@ class Datatype:
         except KeyError:
             return None
 
-    def to_json(self):
+    def to_json(self, keep_arrays=False):
+        """Instances by index; array instances are kept as such for array-aware encoders if specified"""
+        if type(self.instances) is np.ndarray:
+            return self.instances if keep_arrays else dict(enumerate(self.instances.tolist()))
         res = {}
         for i, inst in enumerate(self.instances):
             if type(inst) is np.ndarray:
@@ -65,39 +69,359 @@ class Datatype:
         return ret
 
 
+class TokenSpans:
+    """Columnar container of tokenized documents
+
+    Tokens of all documents are interned into a vocabulary and stored in a single flat int32 id array.
+    Each instance is a [start, end) span over that array, so slicing only gathers span boundaries
+    and never copies token data. Optional part-of-speech tags are stored the same way.
+    """
+    vocabulary = None
+    token_ids = None
+    starts, ends = None, None
+    pos_vocabulary = None
+    pos_ids = None
+
+    def __init__(self, token_ids, starts, ends, vocabulary, pos_ids=None, pos_vocabulary=None):
+        self.token_ids = token_ids
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.vocabulary = vocabulary
+        self.pos_ids = pos_ids
+        self.pos_vocabulary = pos_vocabulary
+
+    @staticmethod
+    def can_compact(instances):
+        """Check whether the input is a collection of word-dict instances with string tokens"""
+        if type(instances) is TokenSpans:
+            return True
+        if type(instances) is not list or len(instances) == 0:
+            return False
+        inst = instances[0]
+        if type(inst) not in [dict, OrderedDict] or "words" not in inst:
+            return False
+        # e.g. (word, pos) tuples are left as-is
+        return all(type(w) in (str, np.str_) for w in inst["words"])
+
+    @staticmethod
+    def from_instances(instances):
+        """Intern a list of {"words": [...], "pos": [...]} instances"""
+        word_to_id, pos_to_id = {}, {}
+        token_ids, pos_ids, lengths = [], [], []
+        has_pos = any(len(inst.get("pos", [])) > 0 for inst in instances)
+        for inst in instances:
+            words = inst["words"]
+            lengths.append(len(words))
+            token_ids.extend(word_to_id.setdefault(w, len(word_to_id)) for w in words)
+            if has_pos:
+                # pos entries are (word, tag) tuples as produced by nltk
+                tags = [p[1] for p in inst.get("pos", [])]
+                if len(tags) != len(words):
+                    tags = [""] * len(words)
+                pos_ids.extend(pos_to_id.setdefault(t, len(pos_to_id)) for t in tags)
+        ends = np.cumsum(lengths, dtype=np.int64)
+        starts = ends - np.asarray(lengths, dtype=np.int64)
+        token_ids = np.asarray(token_ids, dtype=np.int32)
+        pos_ids = np.asarray(pos_ids, dtype=np.int32) if has_pos else None
+        return TokenSpans(token_ids, starts, ends, list(word_to_id), pos_ids, list(pos_to_id) if has_pos else None)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_instance(i)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return self.get_instance(idx)
+        # slices and index collections produce views sharing the token storage
+        return TokenSpans(self.token_ids, self.starts[idx], self.ends[idx], self.vocabulary, self.pos_ids, self.pos_vocabulary)
+
+    def __add__(self, other):
+        return TokenSpans.concatenate([self, other])
+
+    def get_lengths(self):
+        return self.ends - self.starts
+
+    def get_pos_pairs(self):
+        """View of the same spans with distinct (word, pos) pairs as the tokens"""
+        error("Requested (word, pos) pairs from token spans without pos information", self.pos_ids is None)
+        num_tags = len(self.pos_vocabulary)
+        pair_codes = self.token_ids.astype(np.int64) * num_tags + self.pos_ids
+        codes, pair_ids = np.unique(pair_codes, return_inverse=True)
+        vocab = [(self.vocabulary[c // num_tags], self.pos_vocabulary[c % num_tags]) for c in codes]
+        return TokenSpans(pair_ids.astype(np.int32), self.starts, self.ends, vocab)
+
+    def get_token_ids(self, i):
+        """Token id view of the i-th instance"""
+        return self.token_ids[self.starts[i]:self.ends[i]]
+
+    def get_instance(self, i):
+        """Compatibility accessor to the word-dict instance format"""
+        words = [self.vocabulary[t] for t in self.get_token_ids(i)]
+        pos = []
+        if self.pos_ids is not None:
+            tags = self.pos_ids[self.starts[i]:self.ends[i]]
+            pos = [(w, self.pos_vocabulary[t]) for (w, t) in zip(words, tags)]
+        return {"words": words, "pos": pos}
+
+    def get_word_lists(self):
+        """Get the word list of each instance"""
+        return [[self.vocabulary[t] for t in self.get_token_ids(i)] for i in range(len(self))]
+
+    def get_token_positions(self):
+        """Locate the tokens of all instances in the shared token array
+
+        Returns:
+            The instance index of each token, its offset within the instance and its position in the token array
+        """
+        lengths = self.get_lengths()
+        total = int(lengths.sum())
+        instance_idx = np.repeat(np.arange(len(self)), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        within = np.arange(total) - np.repeat(offsets, lengths)
+        return instance_idx, within, within + np.repeat(self.starts, lengths)
+
+    def get_flat_token_ids(self):
+        """Gather the tokens of all instances into a flat array
+
+        Returns:
+            The instance index of each token and the token ids themselves
+        """
+        instance_idx, _, token_pos = self.get_token_positions()
+        return instance_idx, self.token_ids[token_pos]
+
+    @staticmethod
+    def concatenate(collections):
+        """Concatenate span collections, re-interning to the vocabularies of the first"""
+        base = collections[0]
+        if len(collections) == 1:
+            return base
+        # pos information is retained only if all collections carry it
+        has_pos = all(col.pos_ids is not None for col in collections)
+        if not has_pos and any(col.pos_ids is not None for col in collections):
+            warning("Discarding pos information when concatenating token spans, since not all collections carry it.")
+        word_to_id = {w: i for (i, w) in enumerate(base.vocabulary)}
+        pos_to_id = {t: i for (i, t) in enumerate(base.pos_vocabulary)} if has_pos else None
+        token_ids, pos_ids, starts, ends = [], [], [], []
+        offset = 0
+        for col in collections:
+            # map collection vocabulary ids to the merged vocabulary
+            mapping = np.asarray([word_to_id.setdefault(w, len(word_to_id)) for w in col.vocabulary], dtype=np.int32)
+            _, _, token_pos = col.get_token_positions()
+            ids = col.token_ids[token_pos]
+            lengths = col.get_lengths()
+            token_ids.append(mapping[ids] if len(ids) > 0 else ids)
+            if has_pos:
+                pos_mapping = np.asarray([pos_to_id.setdefault(t, len(pos_to_id)) for t in col.pos_vocabulary], dtype=np.int32)
+                tags = col.pos_ids[token_pos]
+                pos_ids.append(pos_mapping[tags] if len(tags) > 0 else tags)
+            col_ends = offset + np.cumsum(lengths)
+            starts.append(col_ends - lengths)
+            ends.append(col_ends)
+            offset += int(lengths.sum())
+        pos_ids = np.concatenate(pos_ids).astype(np.int32) if has_pos else None
+        return TokenSpans(np.concatenate(token_ids).astype(np.int32), np.concatenate(starts), np.concatenate(ends), list(word_to_id),
+                          pos_ids, list(pos_to_id) if has_pos else None)
+
+
 class Text(Datatype):
     """Textual data"""
     name = "text"
     vocabulary = None
 
     def __init__(self, inst, vocab=None):
+        # store tokenized documents in columnar form
+        if TokenSpans.can_compact(inst) and type(inst) is not TokenSpans:
+            inst = TokenSpans.from_instances(inst)
         super().__init__(inst)
         self.vocabulary = vocab
 
+    def is_compact(self):
+        return type(self.instances) is TokenSpans
+
+    def get_slice(self, instance_idx):
+        if self.is_compact():
+            return self.instances[np.asarray(instance_idx, dtype=np.int64)]
+        return super().get_slice(instance_idx)
+
+    def get_all_but_slice(self, instance_idx):
+        if self.is_compact():
+            return self.instances[np.setdiff1d(np.arange(len(self.instances)), instance_idx)]
+        return super().get_all_but_slice(instance_idx)
+
     def append_instance(self, inst):
         """Append another instance object"""
-        self.instances += inst
+        if self.is_compact():
+            if type(inst) is not TokenSpans:
+                inst = TokenSpans.from_instances(inst)
+            self.instances = TokenSpans.concatenate([self.instances, inst])
+        else:
+            self.instances += inst
 
     @staticmethod
     def get_strings(data):
         """Get text from the dataset outputs"""
-        return [" ".join(item["words"]) for item in data]
+        return [" ".join(words) for words in Text.get_words(data)]
     @staticmethod
     def get_words(data):
         """Get text from the dataset outputs"""
+        if type(data) is TokenSpans:
+            return data.get_word_lists()
         return [item["words"] for item in data]
 
+class CompositeMatrix:
+    """Lazy matrix composed of column blocks over a shared row index
+
+    Blocks can be dense ndarrays or scipy sparse matrices. Row replication and selection only compose
+    the row index and column concatenation only collects blocks; data is materialized exclusively
+    for the rows that are requested.
+    """
+    blocks = None
+    row_index = None
+    batch_size = 5000
+
+    def __init__(self, blocks, row_index=None):
+        # flatten nested composites sharing an identical row mapping
+        self.blocks = []
+        for block in blocks:
+            if type(block) is CompositeMatrix and block.row_index is None:
+                self.blocks.extend(block.blocks)
+            else:
+                self.blocks.append(block)
+        num_rows = set(b.shape[0] for b in self.blocks)
+        error(f"Row mismatch in composite matrix blocks: {[b.shape for b in self.blocks]}", len(num_rows) > 1)
+        self.row_index = None if row_index is None else np.asarray(row_index, dtype=np.int64)
+
+    @property
+    def shape(self):
+        num_rows = self.blocks[0].shape[0] if self.row_index is None else len(self.row_index)
+        return (num_rows, sum(b.shape[1] for b in self.blocks))
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def dtype(self):
+        return np.result_type(*[b.dtype for b in self.blocks])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        for batch in self.iter_batches():
+            yield from batch
+
+    def __array__(self, dtype=None):
+        res = self.get_rows(np.arange(len(self)))
+        return res if dtype is None else res.astype(dtype)
+
+    def __getitem__(self, idx):
+        cols = None
+        if type(idx) is tuple:
+            idx, cols = idx
+        if isinstance(idx, (int, np.integer)):
+            res = self.get_rows(np.asarray([idx]))[0]
+            return res if cols is None else res[cols]
+        if type(idx) is slice:
+            idx = np.arange(len(self))[idx]
+        res = self.get_rows(np.asarray(idx))
+        return res if cols is None else res[:, cols]
+
+    def map_rows(self, idx):
+        """Map composite rows to block rows"""
+        idx = np.asarray(idx, dtype=np.int64)
+        return idx if self.row_index is None else self.row_index[idx]
+
+    def get_rows(self, idx):
+        """Materialize the specified rows to a dense ndarray"""
+        rows = self.map_rows(idx)
+        parts = [b[rows].toarray() if sparse.issparse(b) else b[rows] for b in self.blocks]
+        return np.hstack(parts) if len(parts) > 1 else parts[0]
+
+    def take_rows(self, idx):
+        """Lazy row selection / replication"""
+        return CompositeMatrix(self.blocks, self.map_rows(idx))
+
+    def iter_batches(self, idx=None, batch_size=None):
+        """Materialize rows in dense batches"""
+        idx = np.arange(len(self)) if idx is None else np.asarray(idx)
+        batch_size = batch_size or self.batch_size
+        for start in range(0, len(idx), batch_size):
+            yield self.get_rows(idx[start:start + batch_size])
+
+    def tocsr(self):
+        """Sparse materialization, avoiding dense copies of sparse blocks"""
+        rows = self.map_rows(np.arange(len(self)))
+        return sparse.hstack([sparse.csr_matrix(b[rows]) for b in self.blocks], format="csr")
+
+
+def get_nan_row_mask(data):
+    """Mask of the rows containing nans, without dense copies: composite matrices are checked per block
+    and sparse matrices on their stored values only"""
+    if type(data) is CompositeMatrix:
+        rows = data.map_rows(np.arange(len(data)))
+        mask = np.zeros(len(rows), dtype=bool)
+        for block in data.blocks:
+            mask |= get_nan_row_mask(block)[rows]
+        return mask
+    if sparse.issparse(data):
+        data = data.tocsr()
+        mask = np.zeros(data.shape[0], dtype=bool)
+        nan_values = np.isnan(data.data)
+        if nan_values.any():
+            mask[np.repeat(np.arange(data.shape[0]), np.diff(data.indptr))[nan_values]] = True
+        return mask
+    data = np.asarray(data)
+    # locate nans only if any exist
+    if not np.issubdtype(data.dtype, np.floating) or not np.isnan(np.sum(data)):
+        return np.zeros(len(data), dtype=bool)
+    return np.isnan(data.reshape(len(data), -1)).any(axis=1)
+
+
 class Numeric(Datatype):
     name = "numeric"
     def __init__(self, inst):
         super().__init__(inst)
 
+    def is_composite(self):
+        return type(self.instances) is CompositeMatrix
+
+    def is_matrix(self):
+        """Check for row-indexable matrix containers other than ndarrays"""
+        return self.is_composite() or sparse.issparse(self.instances)
+
+    def get_slice(self, instance_idx):
+        if self.is_composite():
+            # lazy row selection, rather than a dense copy
+            return self.instances.take_rows(instance_idx)
+        if self.is_matrix():
+            return self.instances[instance_idx]
+        return super().get_slice(instance_idx)
+
+    def get_all_but_slice(self, instance_idx):
+        if self.is_matrix():
+            return self.get_slice(np.setdiff1d(np.arange(self.instances.shape[0]), instance_idx))
+        return super().get_all_but_slice(instance_idx)
+
+    def get_shape_info(self):
+        if self.is_matrix():
+            return self.instances.shape
+        return super().get_shape_info()
+
+    def append_instance(self, inst):
+        if self.is_composite():
+            self.instances = np.asarray(self.instances)
+        super().append_instance(inst)
+
 class Dictionary(Datatype):
     name = "dict"
     def __init__(self, inst):
         super().__init__(inst)
 
-    def to_json(self):
+    def to_json(self, keep_arrays=False):
         return self.instances
 
 class DummyData(Datatype):
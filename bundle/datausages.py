@@ -1,6 +1,6 @@
 from bundle.datatypes import *
 import numpy as np
-from utils import as_list, warning, align_index, error, debug
+from utils import as_list, warning, align_index, error, debug, label_matrix, label_matrix_to_lists
 from collections import defaultdict
 
 class DataUsage:
@@ -97,12 +97,20 @@ class Indices(DataUsage):
     def apply_mask(self, surviving):
         """Apply a boolean deletion mask and realign all indexes
         """
+        return self.select(np.unique(surviving), skip_empty=True)
+
+    def select(self, selection, skip_empty=False):
+        """Restrict indexes to the selected instances, renumbered to their position in the selection"""
+        selection = np.asarray(selection, dtype=np.int64)
+        instances = [np.asarray(inst, dtype=np.int64) for inst in self.instances]
+        size = max([selection.max(initial=-1)] + [inst.max(initial=-1) for inst in instances]) + 1
+        lookup = np.full(size, -1, np.int64)
+        lookup[selection] = np.arange(len(selection))
         output = []
-        for inst in self.instances:
-            binary_mask = [i in surviving for i in inst]
-            ind  = align_index(inst, binary_mask, mask_shows_deletion=False)
-            output.append(ind)
-        return self.__class__(output, self.tags)
+        for inst in instances:
+            mapped = lookup[inst]
+            output.append(mapped[mapped >= 0])
+        return self.__class__(output, self.tags, skip_empty=skip_empty)
 
 
     def __init__(self, instances, tags, epi=None, skip_empty=True):
@@ -261,6 +269,15 @@ class Labels(GroundTruth):
     def map_to_label_names(self, label_indexes):
         return [self.label_names[i] for i in label_indexes]
 
+    def get_label_matrix(self, label_instances):
+        """Sparse binary instance-label matrix of label instances"""
+        return label_matrix(label_instances, self.get_num_labels())
+
+    @staticmethod
+    def get_label_instances(matrix):
+        """Label instances from an instance-label matrix"""
+        return label_matrix_to_lists(matrix)
+
     def to_json(self):
         res = super().to_json()
         res["labelnames"] = list(self.label_names)
@@ -279,6 +296,8 @@ class DataPack:
     chain = "NO_CHAIN"
     source = "NO_SOURCE"
     id = "NO_ID"
+    # index tag of the cascade instance selection the data was computed on, if any
+    selection_tag = None
 
     def get_copy(self):
         dat = self.data
@@ -286,9 +305,9 @@ class DataPack:
         return DataPack(dat, usages)
 
 
-    def to_json(self):
+    def to_json(self, keep_arrays=False):
         res = {"usages": defaultdict(list)}
-        res["data"] = self.data.to_json()
+        res["data"] = self.data.to_json(keep_arrays)
         for us in self.usages:
             res["usages"][us.name].append(us.to_json())
         return res
@@ -325,6 +344,16 @@ class DataPack:
             u.instances = new_instances
             u.tags = new_tags
 
+    def select_instances(self, selection, tag=None):
+        """Get a datapack restricted to the selected data instances, with indexes realigned"""
+        if type(self.data) in (DummyData, Dictionary):
+            return self
+        data = get_data_class(self.data)(self.data.get_slice(selection))
+        usages = [u.select(selection) if issubclass(type(u), Indices) else u for u in self.usages]
+        dp = DataPack(data, usages, source=self.source, chain=self.chain)
+        dp.id, dp.selection_tag = self.id, tag
+        return dp
+
     def apply_index_contraction(self, new_idx):
         """
         Inform indexes in usages with appended indexes, pointing to existing data in the container
@@ -86,23 +86,29 @@ class Component:
         """Component runner function"""
         self.set_serialization_params()
 
+        # outputs computed on a cascade instance selection are partial, and not cached
+        partial_outputs = self.data_pool.has_instance_selection()
         # try loading component outputs from disk
-        if not (self.config.output_deserialization_allowed() and self.load_outputs_from_disk()):
+        if not (self.config.output_deserialization_allowed() and not partial_outputs and self.load_outputs_from_disk()):
             # if not available, fetch component inputs
             self.get_component_inputs()
 
             # try to load component's model from disk, if not already
-            self.attempt_load_model_from_disk(failure_is_fatal=False)
+            # models of a cascade instance selection are built on the selection only, and neither loaded nor saved
+            if not partial_outputs:
+                self.attempt_load_model_from_disk(failure_is_fatal=False)
             if not self.model_loaded:
                 # if not available, build it from inputs
                 self.attempt_build_model()
                 # save it to disk
-                self.save_model()
+                if not partial_outputs:
+                    self.save_model()
 
             # use the model and inputs to produce outputs
             self.produce_outputs()
             # save them to disk
-            self.save_outputs()
+            if not partial_outputs:
+                self.save_outputs()
         # assign produced outputs to the data pool
         self.set_component_outputs()
 
@@ -112,6 +118,18 @@ class Component:
     def get_component_inputs(self):
         error("Attempted to get inputs via abstract function.")
 
+    def outputs_depend_on_batch(self):
+        """Whether the output of an instance depends on the other instances processed along with it"""
+        return False
+
+    def get_produced_index_tags(self):
+        """Index tags produced by the component"""
+        return []
+
+    def get_cascade_tag(self):
+        """Index tag whose instances restrict the computation of the component's input chains, if any"""
+        return None
+
     def set_component_outputs(self):
         error("Attempted to set outputs via abstract function.")
 
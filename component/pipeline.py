@@ -1,3 +1,6 @@
+import time
+from collections import defaultdict
+
 from bundle.bundle import DataPool
 from utils import debug, error, info, warning
 
@@ -10,6 +13,8 @@ class Pipeline:
         """Constructor"""
         self.chains = {}
         self.data_pool = DataPool()
+        # chains deferred until a cascade index tag is available, mapped to the (producer chain, tag)
+        self.deferred_chains = {}
 
     def visualize(self):
         """Visualization function"""
@@ -115,18 +120,95 @@ class Pipeline:
     def load_models(self, failure_is_fatal=True):
         """Load the model from each component"""
         info("Preloading the models for each component")
+        load_times = []
         for chain in self.chains.values():
             for comp in chain.get_components():
                 debug(f"Preloading {comp.get_full_name()}")
-                comp.attempt_load_model_from_disk(failure_is_fatal=failure_is_fatal)
+                start = time.time()
+                loaded = comp.attempt_load_model_from_disk(failure_is_fatal=failure_is_fatal)
+                load_times.append((comp.get_full_name(), time.time() - start, loaded))
+        # startup report, slowest first
+        info("Model loading times:")
+        for name, elapsed, loaded in sorted(load_times, key=lambda x: x[1], reverse=True):
+            info("{:10.3f} sec {} {}".format(elapsed, name, "" if loaded else "(not loaded)"))
+        info("{:10.3f} sec total".format(sum(x[1] for x in load_times)))
+
+    def get_index_tag_producer(self, chain_names, tag):
+        """Get the chain, among the input ones, producing the index tag"""
+        producers = [x for x in chain_names if any(tag in comp.get_produced_index_tags() for comp in self.chains[x].get_components())]
+        error(f"Require a single chain producing the index tag [{tag}], found: {producers}", len(producers) != 1)
+        return producers[0]
+
+    def get_upstream_chains(self, chain_name):
+        """Get all chains the input chain transitively depends on"""
+        upstream, pending = set(), list(self.chains[chain_name].get_required_finished_chains())
+        while pending:
+            name = pending.pop()
+            if name not in upstream:
+                upstream.add(name)
+                pending.extend(self.chains[name].get_required_finished_chains())
+        return upstream
+
+    def setup_cascades(self):
+        """Defer chains that only feed cascading slices, to compute them just on the instances surviving the slicing tag.
+
+        A chain is deferred if it is not required for producing the tag and all chains consuming it are the slice or other
+        deferred chains. Deferred chains are assumed to preserve the instance order of their inputs.
+        """
+        consumers = defaultdict(set)
+        for name, chain in self.chains.items():
+            for req in chain.get_required_finished_chains():
+                consumers[req].add(name)
 
-    def run(self):
-        """Executes the pipeline"""
+        for name, chain in self.chains.items():
+            tag = chain.get_components()[0].get_cascade_tag()
+            if tag is None:
+                continue
+            producer = self.get_index_tag_producer(chain.get_required_finished_chains(), tag)
+            required = self.get_upstream_chains(producer) | {producer}
+            deferred = set()
+            changed = True
+            while changed:
+                changed = False
+                for cand, cand_chain in self.chains.items():
+                    if cand in deferred or cand in required or cand == name or cand in self.deferred_chains:
+                        continue
+                    # data-reading chains cannot be restricted
+                    if not cand_chain.get_required_finished_chains():
+                        continue
+                    if consumers[cand] and consumers[cand] <= deferred | {name}:
+                        deferred.add(cand)
+                        changed = True
+            if not deferred:
+                warning(f"No chains to compute in cascade for the [{tag}] slicing of chain {name}")
+            for cand in deferred:
+                self.deferred_chains[cand] = (producer, tag)
+            info(f"Cascade on [{tag}] from chain {producer}: deferring chains {sorted(deferred)}")
+
+    def chain_ready(self, chain, completed_chain_names):
+        if not chain.ready(completed_chain_names):
+            return False
+        # deferred chains also wait for the cascade tag
+        return chain.get_name() not in self.deferred_chains or self.deferred_chains[chain.get_name()][0] in completed_chain_names
+
+    def report_pruning(self):
+        """Summarize instances retained at each filtering / cascaded stage"""
+        if not self.data_pool.pruning_stats:
+            return
+        info("Instance pruning per stage:")
+        for stage, (total, retained) in self.data_pool.pruning_stats.items():
+            info("{:>10d} / {:<10d} retained ({:6.2f}% pruned): {}".format(retained, total, 100 * (total - retained) / max(total, 1), stage))
+
+    def run(self, keep_arrays=False):
+        """Executes the pipeline; array outputs are returned as such if keep_arrays is set, else as lists"""
         info("================")
         info("Running pipeline.")
         info("----------------")
         self.sanity_check()
         self.visualize()
+        self.deferred_chains = {}
+        self.data_pool.clear_instance_selections()
+        self.setup_cascades()
         # chain_outputs = {ch: None for ch in self.chains}
         completed_chain_outputs = None
         completed_chain_names = []
@@ -135,11 +217,15 @@ class Pipeline:
         while run_pool:
             chain = self.chains[run_pool.pop(0)]
             # check if the chain requires inputs from other chains
-            if not chain.ready(completed_chain_names):
+            if not self.chain_ready(chain, completed_chain_names):
                 debug("Delaying execution of chain {} since the required chain output {} is not available in the current ones: {}".format(chain.get_name(), str(chain.get_required_finished_chains()), completed_chain_names))
                 run_pool.append(chain.get_name())
                 continue
 
+            if chain.get_name() in self.deferred_chains:
+                producer, tag = self.deferred_chains[chain.get_name()]
+                self.data_pool.set_instance_selection(chain.get_name(), self.data_pool.get_tag_instances(tag, producer), tag)
+
             # set input chains as the feeders
             self.data_pool.clear_feeders()
             self.data_pool.add_feeders(chain.get_required_finished_chains(), None)
@@ -157,7 +243,8 @@ class Pipeline:
 
             # info(f"Default linkage after completion of chain {chain.get_name()}")
             # Bundle.print_linkages(completed_chain_outputs)
-        outputs = self.data_pool.get_outputs()
+        self.report_pruning()
+        outputs = self.data_pool.get_outputs(keep_arrays)
         debug(f"Finished with {len(self.data_pool.data)} bundles in the data pool {self.data_pool}")
         return outputs
 
@@ -0,0 +1,185 @@
+"""Per-instance cache of pipeline outputs, for serving triggers"""
+import hashlib
+import json
+import pickle
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+from os import makedirs, stat
+from os.path import dirname, exists
+from threading import Lock
+
+from utils import debug, info
+
+
+def normalize_text(text):
+    """Unicode- and whitespace-normalize a text; case is preserved, since pipelines may be case-sensitive"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def get_model_fingerprint(pipelines):
+    """Hash of the pipeline components and the state of their model files"""
+    hasher = hashlib.sha1()
+    for pipeline in pipelines:
+        for chain in pipeline.chains.values():
+            for comp in chain.get_components():
+                hasher.update(comp.get_full_name().encode("utf-8"))
+                try:
+                    path = comp.get_model_path()
+                except (AttributeError, TypeError):
+                    path = None
+                if path is not None and exists(path):
+                    st = stat(path)
+                    hasher.update(f"{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def get_batch_dependent_components(pipelines):
+    """Names of the pipeline components whose per-instance outputs depend on the rest of the batch, e.g. via idf fitting"""
+    return [comp.get_full_name() for pipeline in pipelines for chain in pipeline.chains.values()
+            for comp in chain.get_components() if comp.outputs_depend_on_batch()]
+
+
+def split_instance_outputs(outputs, num_instances):
+    """Split pipeline outputs into per-instance outputs, if all outputs are aligned to the input instances, else return None.
+
+    Each datapack output yields the data of the instance and, per index usage, whether the instance is in each index.
+    """
+    if type(outputs) is not dict or not outputs:
+        return None
+    res = [{} for _ in range(num_instances)]
+    for dp_id, out in outputs.items():
+        data, usages = (out.get("data"), out.get("usages")) if type(out) is dict and "data" in out else (out, None)
+        if type(data) is not dict or sorted(data) != list(range(num_instances)):
+            return None
+        index_sets = None
+        if usages is not None:
+            index_sets = {name: [[set(inst) for inst in usg["instances"]] if "instances" in usg else None for usg in usg_list]
+                          for name, usg_list in usages.items()}
+        for i in range(num_instances):
+            usage_membership = None
+            if usages is not None:
+                usage_membership = {name: [usg if sets is None else {**usg, "instances": [i in x for x in sets]}
+                                           for usg, sets in zip(usg_list, index_sets[name])]
+                                    for name, usg_list in usages.items()}
+            res[i][dp_id] = (data[i], usage_membership)
+    return res
+
+
+def merge_instance_outputs(instance_outputs):
+    """Merge per-instance outputs into pipeline outputs, in instance order"""
+    merged = {}
+    for dp_id in instance_outputs[0]:
+        data = {i: out[dp_id][0] for i, out in enumerate(instance_outputs)}
+        usages = instance_outputs[0][dp_id][1]
+        if usages is None:
+            merged[dp_id] = data
+            continue
+        merged_usages = {}
+        for name, usg_list in usages.items():
+            merged_usages[name] = []
+            for u, usg in enumerate(usg_list):
+                if "instances" not in usg:
+                    merged_usages[name].append(usg)
+                    continue
+                memberships = [out[dp_id][1][name][u]["instances"] for out in instance_outputs]
+                instances = [[i for i, member in enumerate(memberships) if member[k]] for k in range(len(usg["instances"]))]
+                merged_usages[name].append({**usg, "instances": instances})
+        merged[dp_id] = {"usages": merged_usages, "data": data}
+    return merged
+
+
+class PredictionCache:
+    """LRU cache of per-instance outputs, keyed by the normalized text, request parameters and model fingerprint.
+    Entries are optionally persisted in an sqlite database, consulted on in-memory misses.
+    """
+    def __init__(self, capacity, fingerprint, path=None):
+        self.capacity = capacity
+        self.fingerprint = fingerprint
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = self.misses = self.disk_hits = 0
+        # whether the pipeline outputs split per input instance; learned on the first run
+        self.aligned = None
+        self.path = path
+        self.db = None
+        if path is not None:
+            makedirs(dirname(path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS outputs (key TEXT PRIMARY KEY, value BLOB)")
+        info(f"Prediction cache of capacity {capacity}{', persisted at ' + path if path else ''}, model fingerprint {fingerprint[:10]}")
+
+    def make_key(self, text, params=None):
+        params = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha1("\0".join((self.fingerprint, params, normalize_text(text))).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM outputs WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    value = pickle.loads(row[0])
+                    self.insert(key, value)
+                    return value
+            self.misses += 1
+            return None
+
+    def insert(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def put(self, key, value):
+        with self.lock:
+            self.insert(key, value)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?)", (key, pickle.dumps(value)))
+                self.db.commit()
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits,
+                    "hit_rate": self.hits / lookups if lookups else 0.0, "size": len(self.entries), "capacity": self.capacity,
+                    "path": self.path, "model_fingerprint": self.fingerprint}
+
+    def fetch_outputs(self, texts, params, run):
+        """Get outputs for the texts, running the uncached (unique) ones via the run function"""
+        if not texts or self.aligned is False:
+            return run(texts)
+        keys = [self.make_key(t, params) for t in texts]
+        cached = [self.get(k) for k in keys]
+        miss_positions = [i for (i, c) in enumerate(cached) if c is None]
+        if self.aligned:
+            # run each uncached text once
+            first_positions = OrderedDict()
+            for i in miss_positions:
+                first_positions.setdefault(keys[i], i)
+            miss_positions = list(first_positions.values())
+        # else, until outputs are known to split per instance, duplicates are run as well:
+        # unsplittable outputs of all texts are then returned as is, without a second run
+        debug(f"Prediction cache: {len(texts) - sum(c is None for c in cached)} / {len(texts)} texts cached, running {len(miss_positions)}")
+        if miss_positions:
+            miss_texts = [texts[i] for i in miss_positions]
+            outputs = run(miss_texts)
+            instance_outputs = split_instance_outputs(outputs, len(miss_texts))
+            if instance_outputs is None:
+                # outputs not per input instance: not cacheable
+                debug("Pipeline outputs are not aligned to input instances, bypassing the prediction cache")
+                self.aligned = False
+                return outputs if len(miss_texts) == len(texts) else run(texts)
+            self.aligned = True
+            computed = {}
+            for i, out in zip(miss_positions, instance_outputs):
+                if keys[i] not in computed:
+                    computed[keys[i]] = out
+                    self.put(keys[i], out)
+            cached = [c if c is not None else computed[k] for k, c in zip(keys, cached)]
+        return merge_instance_outputs(cached)
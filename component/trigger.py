@@ -57,7 +57,7 @@ class Trigger:
         """Prime the trigger to be able to fire"""
         error("Attempted to access abstract trigger arming function.")
 
-    def fire(self, data=None):
+    def fire(self, data=None, keep_arrays=False):
         """Cause pipeline execution"""
         outputs = []
         with self.execution_lock:
@@ -68,7 +68,7 @@ class Trigger:
                     self.package_data(data)
                 info("Executing pipeline(s).")
                 for pipeline in self.pipelines:
-                    res = pipeline.run()
+                    res = pipeline.run(keep_arrays)
                     outputs.append(res)
 
                 # squeeze
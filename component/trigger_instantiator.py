@@ -1,16 +1,16 @@
 from component.trigger import ImmediateExecution
-from endpoint.endpoint import IOEndpoint
-from utils import error
+from utils import error, import_object
 
 class TriggerInstantiator:
+    # trigger name to class path, imported on first use
+    candidates = {"rest-io": "endpoint.endpoint:IOEndpoint"}
+
     @staticmethod
     def create(trigger_name, conf):
-        candidates = [IOEndpoint]
         name = conf.name
-        for c in candidates:
-            if name == c.name:
-                return c(trigger_name, conf)
-        error(f"Undefined trigger type {name} for trigger: {trigger_name}. Candidates are: {[c.name for c in candidates]}")
+        if name in TriggerInstantiator.candidates:
+            return import_object(TriggerInstantiator.candidates[name])(trigger_name, conf)
+        error(f"Undefined trigger type {name} for trigger: {trigger_name}. Candidates are: {list(TriggerInstantiator.candidates)}")
 
     @staticmethod
     def make_default(conf):
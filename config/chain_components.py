@@ -23,6 +23,8 @@ class manip_conf(Configuration):
         self.target_tags = self.get_value("target_tags", base=config, default=None)
         self.rename_tag = self.get_value("rename_tag", base=config, default=None)
         self.params = self.get_value("params", base=config, default=None)
+        # slicing: compute chains feeding only the slice just for the tagged instances
+        self.cascade = self.get_value("cascade", base=config, default=False, expected_type=bool)
 
 class sampling_conf(Configuration):
     conf_key_name = "sample"
@@ -55,6 +57,12 @@ class dataset_conf(Configuration):
         self.extract_pos = self.get_value("extract_pos", default=False)
         self.filter_stopwords = self.get_value("filter_stopwords", default=True)
         self.remove_digits = self.get_value("remove_digits", default=False)
+        # tokenizer backend: nltk / regex
+        self.tokenizer = self.get_value("tokenizer", default="nltk", expected_type=str)
+        # number of documents per pos tagging call
+        self.pos_batch_size = self.get_value("pos_batch_size", default=1000, expected_type=int)
+        # maximum number of memoized (word, pos) stemming / lemmatization results
+        self.prepro_cache_size = self.get_value("prepro_cache_size", default=1000000, expected_type=int)
 
     def has_data_limit(self):
         return self.data_limit is not None and any([x is not None for x in self.data_limit])
@@ -87,6 +95,11 @@ class representation_conf(Configuration):
         self.term_list = self.get_value("term_list", base=config)
         self.ngram_range = self.get_value("ngram_range", base=config, default=None)
         self.limit = self.get_value("limit", base=config, default=[])
+        # keep bag outputs as sparse matrices
+        self.sparse = self.get_value("sparse", base=config, default=False, expected_type=bool)
+        # worker processes and documents per task, for trained document embeddings
+        self.workers = self.get_value("workers", base=config, default=1, expected_type=int)
+        self.batch_size = self.get_value("batch_size", base=config, default=1000, expected_type=int)
 
         if self.term_list is not None:
             self.allow_model_deserialization = True
@@ -104,6 +117,14 @@ class transform_conf(Configuration):
             return
         self.name = self.conf["name"]
         self.dimension = self.conf["dimension"]
+        # out-of-core mode: fit incrementally over input chunks
+        self.incremental = self.get_value("incremental", default=False, expected_type=bool)
+        self.chunk_size = self.get_value("chunk_size", default=10000, expected_type=int)
+        # write outputs to a memory-mapped array rather than in memory
+        self.memmap = self.get_value("memmap", default=False, expected_type=bool)
+        # randomized svd parameters
+        self.oversampling = self.get_value("oversampling", default=10, expected_type=int)
+        self.power_iterations = self.get_value("power_iterations", default=5, expected_type=int)
 
 
 class semantic_conf(Configuration):
@@ -129,6 +150,8 @@ class semantic_conf(Configuration):
         self.context_aggregation = self.get_value("context_aggregation", base=config)
         self.context_threshold = self.get_value("context_threshold", base=config)
         self.spreading_activation = self.get_value("spreading_activation", base=config, expected_type=list, default=[])
+        # processes to resolve the vocabulary with
+        self.workers = self.get_value("workers", base=config, default=1, expected_type=int)
 
 
 class learner_conf(Configuration):
@@ -173,6 +196,17 @@ class learner_conf(Configuration):
         self.do_test = self.get_value("do_test", default=True, base=config)
         self.model_id = self.get_value("model_id", base=config)
         self.retain_embedding_matrix = self.get_value("retain_embeddings", default=False, base=config)
+        # roles of the instances to predict: test, val_test or all, and number of models applied concurrently
+        self.prediction_scope = self.get_value("prediction_scope", default="all", base=config)
+        self.prediction_workers = self.get_value("prediction_workers", default=1, base=config, expected_type=int)
+        # nearest neighbour learners: neighbours, metric and inverted file index partitions / partitions probed per query
+        self.neighbours = self.get_value("neighbours", default=5, base=config, expected_type=int)
+        self.metric = self.get_value("metric", default="euclidean", base=config)
+        self.index_lists = self.get_value("index_lists", default=None, base=config)
+        self.index_probes = self.get_value("index_probes", default=8, base=config, expected_type=int)
+        # linear svm probability calibration: sigmoid / isotonic, fitted on a held-out portion of the training data, or softmax
+        self.calibration = self.get_value("calibration", default="sigmoid", base=config)
+        self.calibration_portion = self.get_value("calibration_portion", default=0.2, base=config)
 
         # training parameters
         self.train = learner_conf.train()
@@ -232,6 +266,8 @@ class evaluator_conf(Configuration):
         self.measures = as_list(self.measures)
         self.print_individual_models = self.get_value("print_individual_models", default=False, base=config)
         self.label_distribution = self.get_value("show_label_distributions", base=config, default="logs")
+        # multilabel score threshold for label assignment
+        self.decision_threshold = self.get_value("decision_threshold", base=config, default=0.5)
 
 class endpoint_conf(Configuration):
     conf_key_name = "endpoint"
@@ -244,9 +280,14 @@ class endpoint_conf(Configuration):
         self.port = self.get_value("port", default="9999")
         self.endpoint_name = self.get_value("endpoint_name", default="smaug")
         self.raise_errors = self.get_value("raise_errors", default=False)
+        # number of texts per pipeline execution, for bulk NDJSON scoring
+        self.bulk_chunk_size = self.get_value("bulk_chunk_size", default=1000, expected_type=int)
+        # per-text prediction cache: max in-memory entries (disabled if unset) and optional sqlite file to persist to
+        self.cache_size = self.get_value("cache_size", default=None, expected_type=int)
+        self.cache_path = self.get_value("cache_path", default=None)
 
 def get_chain_component_classes():
-    res = [manip_conf, dataset_conf, representation_conf, semantic_conf, learner_conf, sampling_conf]
+    res = [manip_conf, dataset_conf, representation_conf, transform_conf, semantic_conf, learner_conf, sampling_conf]
     res += [link_conf, evaluator_conf, endpoint_conf]
     res += [report_conf]
     return res
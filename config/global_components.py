@@ -4,10 +4,8 @@ import random
 from os.path import join
 import os
 
-import nltk
-
 from config.config import Configuration
-from utils import datetime_str, warning, error, info
+from utils import datetime_str, warning, error, info, set_nltk_data_path
 
 
 class print_conf(Configuration):
@@ -71,7 +69,7 @@ class folders_conf(Configuration):
         self.raw_data = self.get_value("raw_data", base=config, default="raw_data")
 
         nltk_data_path = self.get_value("nltk", base=config, default=join(self.raw_data, "nltk"))
-        # set nltk data folder
-        nltk.data.path = [nltk_data_path]
+        # set nltk data folder, without importing nltk at configuration time
+        set_nltk_data_path(nltk_data_path)
 
 global_component_classes = [print_conf, misc_conf, folders_conf]
@@ -1,7 +1,8 @@
 import random
 import string
+from collections import OrderedDict
 from os import listdir
-from os.path import basename
+from os.path import basename, exists, join
 
 import nltk
 from modern_greek_accentuation.accentuation import remove_all_diacritics
@@ -19,7 +20,29 @@ from dataset.sampling import Sampler
 from semantic.wordnet import Wordnet
 from serializable import Serializable
 from utils import (error, flatten, info, nltk_download, tictoc, warning,
-                   write_pickled, set_constant_epi)
+                   write_pickled, read_pickled, set_constant_epi, apply_nltk_data_path)
+import re
+
+apply_nltk_data_path()
+
+
+class CombiningMarkRemover(dict):
+    """Translate table dropping combining marks after NFD decomposition, filled lazily per encountered code point"""
+    def __missing__(self, c):
+        self[c] = None if unicodedata.category(chr(c)) == "Mn" else c
+        return self[c]
+
+
+combining_mark_remover = CombiningMarkRemover()
+# unicode quotes and dashes are separate tokens, as in the nltk treebank tokenizer; everything else splits on whitespace
+token_regex = re.compile(r"[«“‘„»”’\u2012-\u2015]|[^\s«“‘„»”’\u2012-\u2015]+")
+# treebank tokenizer contraction splits (CONTRACTIONS2), e.g. cannot -> can not
+# apostrophe contractions never reach the tokenizers, since punctuation is removed first
+contraction_regex = re.compile(r"\b(can)(not)\b|\b(gim)(me)\b|\b(gon)(na)\b|\b(got)(ta)\b|\b(lem)(me)\b|\b(wan)(na)(?=\s|$)")
+
+
+def split_contraction(match):
+    return " ".join(g for g in match.groups() if g is not None)
 
 
 class Dataset(Serializable):
@@ -32,6 +55,8 @@ class Dataset(Serializable):
     dir_name = "datasets"
     undefined_word_index = None
     preprocessed = False
+    # (word, pos) -> stemmed / lemmatized word
+    prepro_cache = OrderedDict()
 
     data, roles, indices = None, None, None
     labels, multilabel = None, None
@@ -255,7 +280,7 @@ class Dataset(Serializable):
         self.digit_remover = str.maketrans('', '', string.digits)
 
     def apply_lemmatizer(self, w_pos):
-        wordnet_pos = Wordnet.get_wordnet_pos(w_pos[1])
+        wordnet_pos = Wordnet.get_wordnet_pos(self.config, w_pos[1])
         if not wordnet_pos:
             return self.lemmatizer.lemmatize(w_pos[0]), w_pos[1]
         else:
@@ -267,38 +292,100 @@ class Dataset(Serializable):
             text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
         return text.translate(punctuation_remover)
 
-    def process_single_text(self, text, punctuation_remover, digit_remover, word_prepro_func, stopwords):
-        """Apply processing for a single text element"""
-        data = {}
-        sents = sent_tokenize(text.lower())
+    def tokenize_nltk(self, text, punctuation_remover):
+        """Sentence-split, then remove punctuation and word-tokenize each sentence with nltk"""
         words = []
-        for sent in sents:
+        for sent in sent_tokenize(text):
             # remove punctuation content
             sent = self.handle_punctuation(sent, punctuation_remover)
             words.extend(word_tokenize(sent))
+        return words
+
+    def tokenize_regex(self, text, punctuation_remover):
+        """Single-pass normalization and tokenization with translate tables and a precompiled regex"""
+        if not text.isascii():
+            text = unicodedata.normalize('NFD', text).translate(combining_mark_remover)
+        text = contraction_regex.sub(split_contraction, text.translate(punctuation_remover))
+        return token_regex.findall(text)
+
+    def get_tokenizer(self):
+        tokenizer = self.config.tokenizer if self.config is not None else "nltk"
+        if tokenizer == "regex":
+            return self.tokenize_regex
+        error(f"Undefined tokenizer: {tokenizer}", tokenizer != "nltk")
+        return self.tokenize_nltk
+
+    def process_single_text(self, text, punctuation_remover, digit_remover, word_prepro_func, stopwords, do_tag=True):
+        """Apply processing for a single text element"""
+        data = {}
+        words = self.get_tokenizer()(text.lower(), punctuation_remover)
         # words = text_to_word_sequence(text, filters=filt, lower=True, split=' ')
         # words = [w.lower() for w in self.nltk_tokenizer.tokenize(text)]
 
-        # remove stopwords and numbers
-        # words = [w.translate(digit_remover) for w in words if w not in stopwords and w.isalpha()]
-        # remove empty "words"
-        words = [w for w in words if w]
+        # remove numbers, then empty "words" and stopwords in a single pass
         if self.remove_digits:
-            words = [w for w in [w.translate(digit_remover) for w in words] if w]
+            words = [w.translate(digit_remover) for w in words]
         if self.filter_stopwords:
-            words = [w for w in words if w not in stopwords]
+            words = [w for w in words if w and w not in stopwords]
+        else:
+            words = [w for w in words if w]
         data["words"] = words
-        if self.config.extract_pos:
+        # word preprocessing operates on tagged words
+        error(f"Specified {self.config.prepro} word preprocessing without POS extraction.", self.config.prepro is not None and not self.config.extract_pos)
+        if self.config.extract_pos and do_tag:
             # pos tagging
             data["pos"] = nltk.pos_tag(words)
-        # stemming / lemmatization
-        if self.config.prepro is not None:
-            data["words"] = [word_prepro_func((w, p)) for (w, p) in zip(words, data["pos"])]
+            self.apply_word_prepro(data, word_prepro_func)
         # if not data["words"]:
         #     # warning("Text preprocessed to an empty list:\n{}".format(text))
         #     return None
         return data
 
+    def apply_word_prepro(self, data, word_prepro_func):
+        """Apply stemming / lemmatization on tagged words, memoized per (word, tag)"""
+        if self.config.prepro is None:
+            return
+        cache = self.prepro_cache
+        words = []
+        for w_pos in data["pos"]:
+            try:
+                words.append(cache[w_pos])
+            except KeyError:
+                res = word_prepro_func(w_pos)
+                if len(cache) >= self.config.prepro_cache_size:
+                    # bounded: evict the oldest entry
+                    cache.popitem(last=False)
+                cache[w_pos] = res
+                words.append(res)
+        data["words"] = words
+
+    def tag_collection(self, collection):
+        """Pos-tag and apply word preprocessing on a collection, in batches of documents"""
+        batch_size = self.config.pos_batch_size
+        with tictoc(f"Pos tagging {len(collection)} documents in batches of {batch_size}"):
+            for start in range(0, len(collection), batch_size):
+                batch = collection[start:start + batch_size]
+                tagged = nltk.pos_tag_sents([data["words"] for data in batch])
+                for data, pos in zip(batch, tagged):
+                    data["pos"] = pos
+                    self.apply_word_prepro(data, self.word_prepro_func)
+
+    def get_prepro_cache_path(self):
+        return join(self.serialization_dir, f"{self.config.prepro}.word_prepro.cache.pkl")
+
+    def load_prepro_cache(self):
+        self.prepro_cache = OrderedDict()
+        if self.config.prepro is None or self.serialization_dir is None:
+            return
+        path = self.get_prepro_cache_path()
+        if exists(path):
+            self.prepro_cache = OrderedDict(read_pickled(path, msg=f"{self.config.prepro} cache"))
+
+    def save_prepro_cache(self):
+        if self.config.prepro is None or self.serialization_dir is None:
+            return
+        write_pickled(self.get_prepro_cache_path(), self.prepro_cache, msg=f"{len(self.prepro_cache)}-long {self.config.prepro} cache")
+
     def has_text_targets(self):
         return self.targets is not None and len(self.targets) > 0 and type(self.targets[0]) == str
 
@@ -317,18 +404,19 @@ class Dataset(Serializable):
                 pbar.set_description("Document {}/{}".format(i + 1, len(container_idxs)))
                 pbar.update()
                 data = self.process_single_text(data, punctuation_remover=self.punctuation_remover, digit_remover=self.digit_remover,
-                                                          word_prepro_func=self.word_prepro_func, stopwords=self.stopwords)
-                word_data = data["words"]
-                if not word_data:
+                                                          word_prepro_func=self.word_prepro_func, stopwords=self.stopwords, do_tag=False)
+                if not data["words"]:
                     # warning("Text {}/{} preprocessed to an empty list:\n{}".format(i + 1, len(document_list), document_list[i]))
                     discarded_indexes.append(i)
                     # continue
                     data["words"] = []
-
                 ret_words_pos.append(data)
-                if track_vocabulary:
-                    ret_voc.update(word_data)
-                num_words.append(len(word_data))
+        if self.config.extract_pos:
+            self.tag_collection(ret_words_pos)
+        for data in ret_words_pos:
+            if track_vocabulary:
+                ret_voc.update(data["words"])
+            num_words.append(len(data["words"]))
         stats = [x(num_words) for x in [np.mean, np.var, np.std]]
         info(f"New vocabulary size extracted from text: {len(ret_voc)}" + ", stats: mean {:.3f}, var {:.3f}, std {:.3f}".format(*stats))
         return ret_words_pos, ret_voc, discarded_indexes
@@ -338,6 +426,7 @@ class Dataset(Serializable):
         """Apply preprocessing"""
 
         self.setup_nltk_resources()
+        self.load_prepro_cache()
         # make indices object -- this filters down non-existent (with no instances) roles
         if type(self.indices) is not Indices:
             self.indices = Indices(self.indices, tags=self.roles)
@@ -377,6 +466,7 @@ class Dataset(Serializable):
             #     warning(f"Discarded {len(discarded_indexes)} instances from preprocessing.")
             #     if self.test_labels is not None:
             #         self.test_labels = [self.test_labels[i] for i in discarded_indexes]
+            self.save_prepro_cache()
             # fix word order and get word indexes
             self.vocabulary = list(self.vocabulary)
             for index, word in enumerate(self.vocabulary):
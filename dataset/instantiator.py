@@ -1,22 +1,19 @@
 """Dataset instantiation module"""
-from dataset.manual import ManualDataset
-from dataset.input_string import InputString
-from dataset.reuters import Reuters
-from dataset.twenty_newsgroups import TwentyNewsGroups
+from utils import import_object
 
 
 class Instantiator:
     """Class to instantiate a dataset object"""
     component_name = "dataset"
+    # dataset name to class path, imported on first use
+    candidates = {
+        "20newsgroups": "dataset.twenty_newsgroups:TwentyNewsGroups",
+        "reuters": "dataset.reuters:Reuters",
+        "string": "dataset.input_string:InputString",
+    }
 
     def create(config):
         name = config.name
-        if name == TwentyNewsGroups.name:
-            return TwentyNewsGroups(config)
-        elif name == Reuters.name:
-            return Reuters(config)
-        elif name == InputString.name:
-            return InputString(config)
-        else:
-            # default to manually-defined dataset
-            return ManualDataset(config)
+        # default to manually-defined dataset
+        path = Instantiator.candidates.get(name, "dataset.manual:ManualDataset")
+        return import_object(path)(config)
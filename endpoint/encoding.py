@@ -0,0 +1,93 @@
+"""Encoding of pipeline outputs for endpoint responses"""
+import json
+
+import numpy as np
+
+from utils import warning
+
+
+def numpy_default(obj):
+    """Convert numpy / sparse objects to JSON-serializable ones"""
+    if hasattr(obj, "toarray"):
+        obj = obj.toarray()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONEncoder:
+    """JSON encoding, via orjson if available"""
+    media_type = "application/json"
+    keep_arrays = False
+
+    def __init__(self):
+        try:
+            import orjson
+            self.orjson = orjson
+        except ImportError:
+            self.orjson = None
+
+    def encode(self, outputs):
+        if self.orjson is not None:
+            opts = self.orjson.OPT_SERIALIZE_NUMPY | self.orjson.OPT_NON_STR_KEYS
+            return self.orjson.dumps(outputs, default=numpy_default, option=opts)
+        return json.dumps(outputs, ensure_ascii=False, default=numpy_default).encode("utf-8")
+
+
+class MsgpackEncoder:
+    """MessagePack encoding, with numeric arrays as typed binary buffers: {"dtype", "shape", "data"}"""
+    media_type = "application/msgpack"
+    keep_arrays = True
+
+    def __init__(self):
+        import msgpack
+        self.msgpack = msgpack
+
+    @staticmethod
+    def default(obj):
+        if hasattr(obj, "toarray"):
+            obj = obj.toarray()
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == object:
+                return obj.tolist()
+            obj = np.ascontiguousarray(obj)
+            return {"dtype": obj.dtype.str, "shape": list(obj.shape), "data": obj.tobytes()}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+    def encode(self, outputs):
+        return self.msgpack.packb(outputs, default=self.default)
+
+
+encoders = {"application/json": JSONEncoder, "application/msgpack": MsgpackEncoder, "application/x-msgpack": MsgpackEncoder}
+encoder_cache = {}
+
+
+def get_encoder(accept=None):
+    """Get the encoder for the preferred supported media type of an Accept header, defaulting to JSON"""
+    candidates = []
+    for i, entry in enumerate((accept or "").split(",")):
+        media_type, *params = [x.strip() for x in entry.split(";")]
+        quality = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    quality = float(p[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type in encoders and quality > 0:
+            candidates.append((-quality, i, media_type))
+    # fall back to JSON if no requested encoding is available
+    for *_, media_type in sorted(candidates) + [(0, 0, JSONEncoder.media_type)]:
+        if media_type not in encoder_cache:
+            try:
+                encoder_cache[media_type] = encoders[media_type]()
+            except ImportError:
+                warning(f"Cannot encode outputs to {media_type}: missing dependency")
+                encoder_cache[media_type] = None
+        if encoder_cache[media_type] is not None:
+            return encoder_cache[media_type]
+
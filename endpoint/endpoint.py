@@ -1,14 +1,15 @@
 from component.component import Component
-import json
-from flask import Flask, request
+from flask import Flask, Response, request, stream_with_context
 from threading import Lock
 from bundle.datausages import Indices, DataPack
 from bundle.datatypes import Text, Numeric, Dictionary
 import numpy as np
 import defs
-from utils import info, datetime_str
+from utils import info, warning, datetime_str
 
+from component.prediction_cache import PredictionCache, get_batch_dependent_components, get_model_fingerprint
 from component.trigger import Trigger
+from endpoint.encoding import get_encoder
 
 class IOEndpoint(Trigger):
     name = "rest-io"
@@ -24,9 +25,14 @@ class IOEndpoint(Trigger):
         try:
             self.url = self.config.url
             self.port = self.config.port
+            self.bulk_chunk_size = self.config.bulk_chunk_size
+            self.cache_size, self.cache_path = self.config.cache_size, self.config.cache_path
         except AttributeError:
             self.url = "localhost"
             self.port = 9999
+            self.bulk_chunk_size = 1000
+            self.cache_size, self.cache_path = None, None
+        self.prediction_cache = None
 
         self.data_buffer = []
         self.buffer_lock = Lock() 
@@ -41,14 +47,78 @@ class IOEndpoint(Trigger):
             else:
                 data = list(request.args.keys())
 
+            # response encoding negotiated via the Accept header: json (default) or msgpack
+            encoder = get_encoder(request.headers.get("Accept"))
             self.insert_to_data_buffer(data)
-            results = self.fire()
-            return json.dumps(results, ensure_ascii=False)
+            results = self.fire(keep_arrays=encoder.keep_arrays)
+            return Response(encoder.encode(results), mimetype=encoder.media_type)
+
+        @self.app.route("/bulk", methods=["POST"])
+        def ingest_bulk():
+            """Score an NDJSON stream of documents in fixed-size chunks, streaming an NDJSON result line per chunk"""
+            chunk_size = request.args.get("chunk_size", self.bulk_chunk_size, type=int)
+            lines = stream_with_context(self.iter_bulk_chunks(request.stream, chunk_size))
+            return Response(lines, mimetype="application/x-ndjson")
+
+        @self.app.route("/stats", methods=["GET"])
+        def stats():
+            """Prediction cache statistics"""
+            if self.prediction_cache is None:
+                return {"cache": None}
+            return {"cache": self.prediction_cache.get_stats()}
 
         @self.app.route('/')
         def hello_world():
             return 'Hello World!'
 
+    def read_bulk_chunks(self, stream, chunk_size):
+        """Read chunks of texts from an NDJSON stream.
+        Each line is a text string, an object with a "text" field, or an object with "params" applied to subsequent chunks.
+        Yields the chunk data, offset of its first text in the stream and messages for malformed lines.
+        """
+        texts, params, messages, offset = [], None, [], 0
+        for line_num, line in enumerate(stream):
+            if not line.strip():
+                continue
+            value, msg = self.parse_json_input(line)
+            if type(value) is dict and "params" in value:
+                params = value["params"]
+                continue
+            if type(value) is dict:
+                value = value.get(Text.name)
+            if type(value) is not str:
+                messages.append(f"Line {line_num + 1}: {msg or 'expected a text string or an object with a text field.'}")
+                continue
+            texts.append(value)
+            if len(texts) == chunk_size:
+                yield self.make_bulk_data(texts, params), offset, messages
+                offset += len(texts)
+                texts, messages = [], []
+        if texts or messages:
+            yield self.make_bulk_data(texts, params), offset, messages
+
+    @staticmethod
+    def make_bulk_data(texts, params):
+        data = {Text.name: texts}
+        if params is not None:
+            data["params"] = params
+        return data
+
+    def iter_bulk_chunks(self, stream, chunk_size):
+        """Run the pipeline per chunk of the input stream, yielding encoded result lines"""
+        encoder = get_encoder()
+        for chunk_index, (data, offset, messages) in enumerate(self.read_bulk_chunks(stream, chunk_size)):
+            size = len(data[Text.name])
+            results = {}
+            if size > 0:
+                info(f"Scoring bulk chunk {chunk_index + 1} of {size} texts, from offset {offset}")
+                self.insert_to_data_buffer(data)
+                results = self.fire()
+            line = {"chunk": chunk_index, "offset": offset, "size": size, "results": results}
+            if messages:
+                line["messages"] = messages
+            yield encoder.encode(line) + b"\n"
+
     def insert_to_data_buffer(self, data):
         with self.buffer_lock:
             self.data_buffer.append(data)
@@ -59,11 +129,26 @@ class IOEndpoint(Trigger):
         self.data_pool.mark_as_reference_data()
         self.app.run(host=self.url, port=self.port)
 
-    def fire(self):
+    def setup(self):
+        if self.cache_size:
+            dependent = get_batch_dependent_components(self.pipelines)
+            if dependent:
+                # cached outputs would depend on the texts they were first computed along with
+                warning(f"Disabling the prediction cache: outputs of components {dependent} depend on the whole input batch")
+                return
+            # models are loaded prior to trigger setup
+            self.prediction_cache = PredictionCache(self.cache_size, get_model_fingerprint(self.pipelines), self.cache_path)
+
+    def fire(self, keep_arrays=False):
         # can continue if there's inputs for ingestion
         data = self.pop_from_data_buffer()
+        # serve cached per-text outputs, where available; array outputs are not cached
+        if self.prediction_cache is not None and not keep_arrays and type(data) is dict and Text.name in data:
+            run = lambda texts: super(IOEndpoint, self).fire({**data, Text.name: texts})
+            params = {k: v for (k, v) in data.items() if k != Text.name}
+            return self.prediction_cache.fetch_outputs(data[Text.name], params, run)
         # submit for execution
-        results = super().fire(data)
+        results = super().fire(data, keep_arrays)
         return results
 
     def pop_from_data_buffer(self):
@@ -169,25 +169,28 @@ class Evaluator(Serializable):
                 in_idx = self.indexes[self.tags.index(inner_tag)]
                 joint_idx = np.intersect1d(out_idx, in_idx)
                 current_predictions = input_predictions[joint_idx]
-                if len(current_predictions) == 0:
+                if current_predictions.shape[0] == 0:
                     continue
 
                 total_idxs_inner[inner_tag].append(joint_idx)
 
                 out_dict[outer_tag][inner_tag] = {}
 
+                # instances of the predictions
+                input_idx = self.prediction_inputs[joint_idx]
                 for measure in self.available_measures:
-                    result = self.evaluate_measure(current_predictions, joint_idx, measure, tag_info=(outer_tag, inner_tag))
+                    result = self.evaluate_measure(current_predictions, input_idx, measure, tag_info=(outer_tag, inner_tag))
                     out_dict[outer_tag][inner_tag][measure] = result
                 do_print = (not has_multiple_models) or self.should_print_this(run_type, outer_tag)
-                self.compute_additional_info(current_predictions, joint_idx, f"{run_type}-{outer_tag}-{inner_tag}", do_print=do_print)
+                self.compute_additional_info(current_predictions, input_idx, f"{run_type}-{outer_tag}-{inner_tag}", do_print=do_print)
 
         if has_multiple_models:
             # aggregate
             out_dict["all_tags"] = {}
             self.aggregate_tags(outer, inner, out_dict)
             for o in total_idxs_inner:
-                self.compute_additional_info(input_predictions, np.concatenate(total_idxs_inner[o]), f"{run_type}-{o}-all_tags", do_print=not self.is_baseline_run(run_type))
+                rows = np.concatenate(total_idxs_inner[o])
+                self.compute_additional_info(input_predictions[rows], self.prediction_inputs[rows], f"{run_type}-{o}-all_tags", do_print=not self.is_baseline_run(run_type))
         print()
 
     def should_print_this(self, run_type, tag):
@@ -261,6 +264,16 @@ class Evaluator(Serializable):
         # ensure unique tags
         error(f"Evaluation requires unique tagset, got {self.tags}", len(self.tags) != len(set(self.tags)))
         self.indexes = preds_usage.instances
+        self.set_prediction_inputs()
+
+    def set_prediction_inputs(self):
+        """Map prediction rows to the input instances they correspond to; identity unless tagged per model"""
+        self.prediction_inputs = np.arange(len(self.predictions))
+        suffix = f"_{defs.roles.inputs}"
+        for tag, inputs in zip(self.tags, self.indexes):
+            model_tag = tag[:-len(suffix)]
+            if tag.startswith("model") and tag.endswith(suffix) and model_tag in self.tags:
+                self.prediction_inputs[self.indexes[self.tags.index(model_tag)]] = inputs
 
 
     def get_results(self):
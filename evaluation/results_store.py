@@ -0,0 +1,123 @@
+"""Columnar store of experiment run results"""
+import json
+import sqlite3
+from numbers import Number
+from os.path import getmtime
+
+import pandas as pd
+
+from utils import debug, info
+
+# fixed columns of the runs table; the remaining ones are configuration variables
+run_columns = ["run_id", "source", "source_mtime"]
+
+
+def quote(name):
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def to_column_value(value):
+    """Configuration variable values are stored as is if scalar, else as json"""
+    if value is None or isinstance(value, (str, Number)):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def flatten_results(results):
+    """Get (run type, measure, label aggregation, statistic, fold, value) score rows from nested evaluation results.
+    Per-fold scores are under the "folds" statistic; multilabel results lack a label aggregation level.
+    """
+    rows = []
+    for run_type, measures in results.items():
+        if not isinstance(measures, dict):
+            continue
+        for measure, aggregations in measures.items():
+            if not isinstance(aggregations, dict):
+                continue
+            # multilabel results hold the statistics directly
+            groups = [(None, aggregations)] if "folds" in aggregations else aggregations.items()
+            for aggregation, stats in groups:
+                if not isinstance(stats, dict):
+                    continue
+                for stat, value in stats.items():
+                    if stat == "folds":
+                        rows.extend((run_type, measure, aggregation, stat, f, float(v)) for f, v in enumerate(value or []) if isinstance(v, Number))
+                    elif isinstance(value, Number):
+                        rows.append((run_type, measure, aggregation, stat, None, float(value)))
+    return rows
+
+
+class ResultsStore:
+    """SQLite store of run scores, with the configuration variables of each run as columns of the runs table.
+    Each run is added in a single transaction; runs whose results file is unchanged are not re-read.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, source TEXT, source_mtime REAL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS scores (run_id TEXT, run_type TEXT, measure TEXT, aggregation TEXT, statistic TEXT, fold INTEGER, value REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS scores_lookup ON scores (measure, aggregation, statistic, run_type)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS scores_run ON scores (run_id)")
+
+    def get_variables(self, run_ids=None):
+        """Get the configuration variables; if run ids are given, only the ones set in any of these runs"""
+        names = [row[1] for row in self.db.execute("PRAGMA table_info(runs)") if row[1] not in run_columns]
+        if run_ids is None:
+            return names
+        runs = self.query("SELECT * FROM runs", run_ids=run_ids)
+        return [n for n in names if runs[n].notna().any()]
+
+    def is_current(self, run_id, source):
+        """Whether the run is stored from the current version of its results file"""
+        row = self.db.execute("SELECT source_mtime FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row is not None and row[0] == getmtime(source)
+
+    def add_run(self, run_id, variables, results, source=None):
+        """Store the run variables and scores, replacing any previous ones"""
+        scores = flatten_results(results)
+        existing = set(self.get_variables())
+        names = list(variables)
+        with self.db:
+            for name in names:
+                if name not in existing:
+                    self.db.execute(f"ALTER TABLE runs ADD COLUMN {quote(name)}")
+            columns = ", ".join(quote(c) for c in run_columns + names)
+            placeholders = ", ".join("?" * (len(run_columns) + len(names)))
+            values = [run_id, source, getmtime(source) if source is not None else None] + [to_column_value(variables[n]) for n in names]
+            self.db.execute(f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({placeholders})", values)
+            self.db.execute("DELETE FROM scores WHERE run_id = ?", (run_id,))
+            self.db.executemany("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?)", [(run_id,) + row for row in scores])
+        debug(f"Stored {len(scores)} scores of run {run_id}")
+
+    def query(self, sql, params=(), run_ids=None):
+        frame = pd.read_sql_query(sql, self.db, params=params)
+        if run_ids is not None:
+            frame = frame[frame["run_id"].isin(run_ids)]
+        return frame
+
+    def get_scores(self, statistic, measures=None, run_types=None, aggregations=None, run_ids=None):
+        """Get a run-by-score frame of a fold statistic, with "runtype.measure.aggregation.statistic" abbreviated columns"""
+        frame = self.query("SELECT run_id, run_type, measure, aggregation, value FROM scores WHERE statistic = ?", (statistic,), run_ids)
+        if measures is not None:
+            frame = frame[frame["measure"].isin(measures)]
+        if run_types is not None:
+            frame = frame[frame["run_type"].isin(run_types)]
+        if aggregations is not None:
+            # multilabel scores have no label aggregation
+            frame = frame[frame["aggregation"].isin(aggregations) | frame["aggregation"].isna()]
+        aggregation = frame["aggregation"].fillna("").str[:3]
+        frame = frame.assign(header=frame["run_type"].str[:3] + "." + frame["measure"].str[:3] + "." + aggregation + "." + statistic)
+        return frame.pivot_table(index="run_id", columns="header", values="value", aggfunc="first").round(4)
+
+    def get_fold_scores(self, run_type, measure, aggregation, run_ids=None):
+        """Get a frame of per-fold scores, along with the configuration variables of their run"""
+        variables = ", ".join("r." + quote(v) for v in self.get_variables(run_ids))
+        sql = (f"SELECT s.run_id, {variables + ', ' if variables else ''}s.value AS score FROM scores s JOIN runs r ON r.run_id = s.run_id "
+               "WHERE s.statistic = 'folds' AND s.run_type = ? AND s.measure = ? AND s.aggregation IS ? ORDER BY s.run_id, s.fold")
+        return self.query(sql, (run_type, measure, aggregation), run_ids)
+
+    def summarize(self):
+        num_runs = self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        num_scores = self.db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        info(f"Results store {self.path}: {num_runs} runs, {num_scores} scores, variables: {self.get_variables()}")
@@ -6,6 +6,7 @@ from bundle.datausages import *
 from collections import defaultdict
 
 import numpy as np
+from scipy import sparse
 from sklearn import metrics
 from utils import info, count_occurences
 from sklearn.dummy import DummyClassifier
@@ -50,9 +51,12 @@ class SupervisedEvaluator(Evaluator):
         matches = self.data_pool.request_data(None, [Labels, Indices], usage_matching="exact", client=self.name, on_error_message="Failed to find ground truth labels.")
         self.labels = matches.data
         self.labels_info = matches.get_usage(Labels)
-        # TODO subclass
-        # perform single-label transformations
-        self.labels.instances = np.concatenate(self.labels.instances)
+        if self.labels_info.multilabel:
+            # binary instance-label matrix
+            self.labels.instances = self.labels_info.get_label_matrix(self.labels.instances)
+        else:
+            # perform single-label transformations
+            self.labels.instances = np.concatenate(self.labels.instances)
 
     def set_printable_info(self, df):
         df = super().set_printable_info(df)
@@ -84,9 +88,16 @@ class SupervisedEvaluator(Evaluator):
     def preprocess_predictions(self, predictions):
         if predictions.ndim == 1:
             predictions = np.expand_dims(predictions, axis=0)
+        if self.labels_info.multilabel:
+            return self.apply_decision_threshold(predictions, self.config.decision_threshold)
         predictions = np.argmax(predictions, axis=1)
         return predictions
 
+    @staticmethod
+    def apply_decision_threshold(proba, thresh):
+        """Binary sparse instance-label decisions of scores exceeding the threshold"""
+        return sparse.csr_matrix(proba > thresh, dtype=np.int8)
+
     def preprocess_ground_truth(self, gt):
         gt = np.concatenate(gt)
         return gt
@@ -179,7 +190,7 @@ class SupervisedEvaluator(Evaluator):
 
         gt, preds = self.get_evaluation_input(predictions, indexes)
         if do_print:
-            info(f"{key} | predictions ({len(preds)} instances) Top-{self.num_max_print_labels} label distros (index/labelname):count :")
+            info(f"{key} | predictions ({preds.shape[0]} instances) Top-{self.num_max_print_labels} label distros (index/labelname):count :")
         gt_distr, preds_distr = count_occurences(gt), count_occurences(preds)
 
         if do_print:
@@ -1,5 +1,6 @@
 """ Large-scale experiment runner module for smaug """
 import argparse
+import ast
 import getpass
 import itertools
 import logging
@@ -20,6 +21,7 @@ from numpy import round
 
 import pandas as pd
 import stattests
+from evaluation.results_store import ResultsStore
 from experiments.utils import (compare_dicts, filter_testing, keyseq_exists,
                                sendmail)
 from experiments.variable_config import VariableConf
@@ -141,26 +143,30 @@ def print_existing_csv_results(path):
     x = pd.read_csv(path, index_col=0).transpose()['mean']
     dct = {}
     for i in x.index:
-        dct[i.replace('dimension', 'dim')] = eval(x[i])
+        dct[i.replace('dimension', 'dim')] = ast.literal_eval(x[i])
     print_dataframe_results(dct)
 
 
-def print_dataframe_results(dict_scores):
-    if not dict_scores:
+def print_existing_store_results(path):
+    info("Printing existing results from {}".format(path))
+    info("Showing mean aggregation")
+    store = ResultsStore(path)
+    store.summarize()
+    print_dataframe_results(store.get_scores("mean"))
+
+
+def print_dataframe_results(scores):
+    """Print a run-by-score frame (or dict), with per-score and total ranks"""
+    if len(scores) == 0:
         print("<empty scores!>")
         return
-    df = pd.DataFrame.from_dict(dict_scores, orient='index')
+    df = scores if type(scores) is pd.DataFrame else pd.DataFrame.from_dict(scores, orient='index')
     # print'em
     info("SCORES:")
     print(df.to_string())
     info("RANKS:")
-    ranked = pd.concat([
-        df[c].rank(ascending=False)
-        for c in [x for x in df.columns if x.startswith('run')]
-    ],
-                       axis=1)
-    avg_rank = sum([ranked[x].values for x in ranked.columns])
-    ranked['avg rank'] = pd.Series(avg_rank, index=ranked.index)
+    ranked = df[[x for x in df.columns if x.startswith('run')]].rank(ascending=False)
+    ranked['avg rank'] = ranked.sum(axis=1)
     print(ranked.to_string())
 
 
@@ -193,10 +199,13 @@ def main(input_path, only_report=False, force_dir=False, no_config_check=False,
     else:
         config_file = input_path
 
-    # if input file is existing csv scores, just print them
+    # if input file is existing csv scores or results store, just print them
     if config_file.endswith(".csv"):
         print_existing_csv_results(config_file)
         return
+    if config_file.endswith(".sqlite"):
+        print_existing_store_results(config_file)
+        return
 
     conf = read_ordered_yaml(config_file)
 
@@ -223,6 +232,8 @@ def main(input_path, only_report=False, force_dir=False, no_config_check=False,
     # results csv file
     # results_file = conf["experiments"]["results_file"]
     results_file = join(run_dir, "run_results.csv")
+    # results store, appended to per completed run
+    results_store_file = join(run_dir, "results.sqlite")
 
     if venv_dir and not exists(venv_dir):
         error("Virtualenv dir {} not found".format(venv_dir))
@@ -317,7 +328,8 @@ def main(input_path, only_report=False, force_dir=False, no_config_check=False,
                 "Only-report run: will not copy experiment configuration at {}"
                 .format(experiments_conf_path))
 
-    results, result_paths = {}, {}
+    store = ResultsStore(results_store_file)
+    run_ids = []
 
     #################################################################################
     skipped_configs = []
@@ -388,43 +400,26 @@ def main(input_path, only_report=False, force_dir=False, no_config_check=False,
                 if do_send_mail:
                     sendmail(email, passw, "an error occurred")
                 exit(1)
-        # read experiment results
+        # store experiment results, unless already stored
         exp_res_file = join(experiment_dir, "results", "results.pkl")
-        with open(exp_res_file, "rb") as f:
-            res_data = pickle.load(f)
-        results[run_id] = res_data
-        result_paths[run_id] = exp_res_file
+        if not store.is_current(run_id, exp_res_file):
+            with open(exp_res_file, "rb") as f:
+                res_data = pickle.load(f)
+            store.add_run(run_id, {k: v for (k, v) in conf.ddict.items() if k != "id"}, res_data, source=exp_res_file)
+        run_ids.append(run_id)
 
     # messages = []
     total_results = {}
  
     # show results
+    store.summarize()
     for stat in stat_functions:
         info("Results regarding {} statistic:".format(stat))
-        print_vals = {}
-        for run_id in results:
-            print_vals[run_id] = {}
-            for m in eval_measures:
-                for run in run_types:
-                    for ag in aggr_measures:
-                        try:
-                            results[run_id][run][m][ag]
-                        except KeyError:
-                            continue
-                        header = "{}.{}.{}.{}".format(run[:3], m[:3], ag[:3],
-                                                      stat)
-
-                        if stat in "var mean std".split():
-                            val = results[run_id][run][m][ag][stat]
-                        if val is None:
-                            continue
-                        val = round(val, decimals=4)
-                        print_vals[run_id][header] = val
+        scores = store.get_scores(stat, eval_measures, run_types, aggr_measures, run_ids)
         # print'em
-        info("SCORES:")
-        print_dataframe_results(print_vals)
+        print_dataframe_results(scores)
 
-        total_results[stat] = print_vals
+        total_results[stat] = {run_id: row.dropna().to_dict() for (run_id, row) in scores.iterrows()}
     info("Writing these results to file {}".format(results_file))
     total_df = pd.DataFrame.from_dict(total_results, orient='index')
     if total_df.size == 0:
@@ -438,36 +433,25 @@ def main(input_path, only_report=False, force_dir=False, no_config_check=False,
                 s + 1, len(skipped_configs), sk))
 
     if do_sstests:
-        do_stat_sig_testing(sstests, sstests_measures, sstests_aggregations, configs, results, sstests_limit_vars)
+        do_stat_sig_testing(sstests, sstests_measures, sstests_aggregations, store, run_ids, sstests_limit_vars)
 
     # [info(msg) for msg in messages]
     if do_send_mail:
         sendmail(email, passw, "run complete.")
 
-def do_stat_sig_testing(methods, measures, label_aggregations, configs, results, limit_variables=None, run_mode="run"):
-    testable_variables = list(configs[0].ddict.keys())
+def do_stat_sig_testing(methods, measures, label_aggregations, store, run_ids, limit_variables=None, run_mode="run"):
+    # variables of the current experiment runs only
+    testable_variables = store.get_variables(run_ids)
     if limit_variables:
         testable_variables = [x for x in testable_variables if x in limit_variables]
     info("Running statistical tests on{} variables: {}".format(" all" if limit_variables is None else " specified", testable_variables))
     for method, measure, label_aggregation in product(methods, measures, label_aggregations):
         info("Running statistical testing via {} on {} {}".format(method, label_aggregation, measure))
-        # get ids and variable values per configuration
-        df_inputs = []
-        try:
-            for run_id in results:
-                # find corresp. configuration
-                conf = [c for c in configs if c.id == run_id]
-                error("Num configurations found with id: {} is: {} during stat-testing!".format(run_id, len(conf)), len(conf) != 1)
-                conf = conf[0]
-                # get variables
-                df_row = {k: v for (k, v) in conf.ddict.items() if k != "id"}
-                for score in  results[run_id][run_mode][measure][label_aggregation]['folds']:
-                    df_row["score"] = score
-                    df_inputs.append(deepcopy(df_row))
-        except:
+        # per-fold scores and variable values of each run
+        data = store.get_fold_scores(run_mode, measure, label_aggregation, run_ids)
+        if len(data) == 0:
             warning("Encountered invalid results accessors: {}".format((run_mode, measure, label_aggregation)))
             continue
-        data = pd.DataFrame(df_inputs)
         inst = instantiator.Instantiator()
         stat_test = inst.create(method)
  
@@ -476,13 +460,15 @@ def do_stat_sig_testing(methods, measures, label_aggregations, configs, results,
             if limit_variables is not None:
                 if variable not in limit_variables:
                     continue
-            if len(data[variable]) == len(set(data[variable])):
+            # runs lacking the variable are not a group of their own
+            values = data[variable].dropna()
+            if len(values) == len(set(values)):
                 warning("Skipping testing for parameter [{}] due to having only 1 observation per value".format(variable))
                 continue
-            if len(set(data[variable])) == 1:
-                warning("Skipping testing for parameter [{}] due to having only 1 unique parameter value: {}".format(variable, data[variable].values[0]))
+            if len(set(values)) == 1:
+                warning("Skipping testing for parameter [{}] due to having only 1 unique parameter value: {}".format(variable, values.values[0]))
                 continue
-            stat_result = stat_test.run(data["score"], data[variable])
+            stat_result = stat_test.run(data["score"][values.index], values)
             stat_test.report()
 
 
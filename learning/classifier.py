@@ -1,6 +1,9 @@
 import numpy as np
 from sklearn.dummy import DummyClassifier as sk_Dummy
-from sklearn.svm import SVC
+from scipy import sparse
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.model_selection import StratifiedShuffleSplit
+from sklearn.svm import SVC, LinearSVC
 from sklearn.linear_model import LogisticRegression as sk_LogReg
 from sklearn.naive_bayes import GaussianNB as sk_NaiveBayes
 from sklearn.preprocessing import StandardScaler
@@ -56,7 +59,8 @@ class SKLClassifier(Classifier):
     def train_model(self):
         train_data = self.get_data_from_index(self.train_index, self.embeddings)
         train_labels = self.targets.get_slice(self.train_index)
-        self.scaler = StandardScaler()
+        # centering would densify sparse inputs
+        self.scaler = StandardScaler(with_mean=not sparse.issparse(train_data))
         train_data = self.scaler.fit_transform(train_data)
         self.model = self.model_class(**self.args)
         self.model.fit(train_data, np.asarray(train_labels).ravel())
@@ -71,12 +75,23 @@ class SKLClassifier(Classifier):
     def get_model(self):
         return (self.model, self.scaler)
 
+    @staticmethod
+    def predict_scores(model, data):
+        """Per-label scores: probabilities if available, else softmax-normalized decision function values"""
+        if hasattr(model, "predict_proba"):
+            return model.predict_proba(data)
+        scores = model.decision_function(data)
+        if scores.ndim == 1:
+            # binary decision
+            scores = np.stack((-scores, scores), axis=1)
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
     # evaluate a clustering
     def test_model(self, model):
         model, scaler = model
-        test_data = self.get_data_from_index(self.test_index, self.embeddings)
-        test_data = scaler.transform(test_data)
-        predictions = model.predict_proba(test_data)
+        predictions = [self.predict_scores(model, scaler.transform(test_data)) for test_data in self.iter_data_from_index(self.test_index, self.embeddings)]
+        predictions = np.concatenate(predictions)
         # # convert back to one-hot
         # predictions = one_hot(predictions, self.num_labels, self.do_multilabel)
         return predictions
@@ -99,6 +114,29 @@ class SVM(SKLClassifier):
         error("Cannot apply {} to multilabel data.".format(self.name), self.do_multilabel)
         SKLClassifier.make(self)
 
+class LinearSVM(SKLClassifier):
+    """Linear SVM via liblinear, with probability calibration fitted on a held-out split or softmax over the decision function"""
+    name = "linear_svm"
+    calibration_methods = ["sigmoid", "isotonic", "softmax"]
+
+    def __init__(self, config):
+        self.config = config
+        self.calibration = config.calibration
+        error(f"Undefined {self.name} calibration: {self.calibration}, available ones are {self.calibration_methods}", self.calibration not in self.calibration_methods)
+        self.args = {"max_iter": config.train.epochs, "random_state": config.misc.seed}
+        SKLClassifier.__init__(self)
+
+    def model_class(self, **args):
+        svm = LinearSVC(**args)
+        if self.calibration == "softmax":
+            return svm
+        held_out = StratifiedShuffleSplit(n_splits=1, test_size=self.config.calibration_portion, random_state=self.config.misc.seed)
+        return CalibratedClassifierCV(svm, method=self.calibration, cv=held_out)
+
+    def make(self):
+        error("Cannot apply {} to multilabel data.".format(self.name), self.do_multilabel)
+        SKLClassifier.make(self)
+
 class NaiveBayes(SKLClassifier):
     name = "naive_bayes"
 
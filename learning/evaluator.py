@@ -5,10 +5,11 @@ from os.path import join
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn import metrics
 from collections import Counter
 
-from utils import (count_occurences, debug, error, info,
+from utils import (count_occurences, debug, error, info, label_matrix, label_matrix_to_lists,
                    numeric_to_string, one_hot, warning)
 
 
@@ -471,7 +472,8 @@ class Evaluator:
             error("Attempted to evaluated {}-dimensional predictions against {} labels".format(preds_proba.shape[-1], self.num_labels))
 
         if self.do_multilabel:
-            onehot_gt = one_hot(self.get_current_reference_labels(), self.num_labels, self.do_multilabel)
+            # ranking measures take dense indicator matrices
+            onehot_gt = label_matrix(self.get_current_reference_labels(), self.num_labels).toarray()
 
             # average precision
             ap = metrics.average_precision_score(onehot_gt, preds_proba)
@@ -596,11 +598,7 @@ class Evaluator:
 
     # applies the threshold to the probabilistic predictions, extracting decision indices
     def apply_decision_threshold(self, proba, thresh):
-        decisions = []
-        for row in proba:
-            idxs, _ = np.where(row > thresh)
-            decisions.append(idxs)
-        return decisions
+        return label_matrix_to_lists(sparse.csr_matrix(np.asarray(proba) > thresh))
 
     # compute statistics across folds
     def calc_fold_score_stats(self, container):
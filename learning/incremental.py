@@ -0,0 +1,149 @@
+from copy import deepcopy
+from os import remove
+from os.path import exists
+
+import numpy as np
+from scipy import sparse
+from sklearn.linear_model import PassiveAggressiveClassifier, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.preprocessing import MaxAbsScaler, StandardScaler
+
+from learning.classifier import SKLClassifier
+from utils import error, info, read_pickled, tictoc, write_pickled
+
+
+class IncrementalClassifier(SKLClassifier):
+    """Scikit-learn classifier trained out-of-core via partial_fit.
+
+    Training rows are read in shuffled mini-batches, so memory is bounded by the batch size regardless of the
+    (possibly memory-mapped or sparse) input size. A held-out chunk drives early stopping, and the training state
+    is checkpointed every save_interval epochs, from which interrupted runs resume.
+    """
+
+    def make(self):
+        error("Cannot apply {} to multilabel data.".format(self.name), self.do_multilabel)
+        SKLClassifier.make(self)
+
+    def make_scaler(self):
+        # centering would densify sparse inputs
+        return StandardScaler(with_mean=not sparse.issparse(self.embeddings))
+
+    def iter_batches(self, index, batch_size):
+        """Yield data and label batches; rows are read in storage order within each batch"""
+        for start in range(0, len(index), batch_size):
+            batch = np.sort(index[start:start + batch_size])
+            yield self.get_data_from_index(batch, self.embeddings), np.asarray(self.targets.get_slice(batch)).ravel()
+
+    def get_checkpoint_path(self):
+        return self.get_current_model_path() + ".checkpoint"
+
+    def split_holdout(self, rng):
+        """Get training and held-out indexes for early stopping; the validation data if available, else a batch of training data"""
+        train_index = np.asarray(self.train_index)
+        if self.val_index is not None and len(self.val_index) > 0:
+            return train_index, np.asarray(self.val_index)
+        if self.early_stopping_patience is None or len(train_index) <= self.batch_size:
+            return train_index, np.empty(0, dtype=train_index.dtype)
+        permuted = rng.permutation(train_index)
+        return permuted[self.batch_size:], permuted[:self.batch_size]
+
+    def fit_scaler(self, train_index):
+        scaler = self.make_scaler()
+        for data, _ in self.iter_batches(train_index, self.batch_size):
+            scaler.partial_fit(data)
+        return scaler
+
+    def score_holdout(self, model, scaler, holdout_index):
+        correct = 0
+        for data, labels in self.iter_batches(holdout_index, self.batch_size):
+            correct += np.sum(model.predict(scaler.transform(data)) == labels)
+        return correct / len(holdout_index)
+
+    def train_model(self):
+        rng = np.random.RandomState(self.seed)
+        train_index, holdout_index = self.split_holdout(rng)
+        classes = np.arange(self.num_labels)
+
+        path = self.get_checkpoint_path()
+        if exists(path):
+            state = read_pickled(path, msg=f"{self.name} training checkpoint")
+            info(f"Resuming {self.name} training from epoch {state['epoch'] + 1}")
+            rng.set_state(state["rng"])
+        else:
+            with tictoc(f"Fitting {self.name} scaler on {len(train_index)} instances"):
+                scaler = self.fit_scaler(train_index)
+            state = {"epoch": 0, "model": self.model_class(**self.args), "scaler": scaler, "best": None, "best_score": -1, "stale": 0}
+
+        model, scaler = state["model"], state["scaler"]
+        while state["epoch"] < self.epochs:
+            for data, labels in self.iter_batches(rng.permutation(train_index), self.batch_size):
+                model.partial_fit(scaler.transform(data), labels, classes=classes)
+            state["epoch"] += 1
+
+            if len(holdout_index) > 0:
+                score = self.score_holdout(model, scaler, holdout_index)
+                info("{} epoch {}/{}: held-out accuracy {:.4f}".format(self.name, state["epoch"], self.epochs, score))
+                if score > state["best_score"]:
+                    state["best"], state["best_score"], state["stale"] = deepcopy(model), score, 0
+                else:
+                    state["stale"] += 1
+
+            if self.save_interval and state["epoch"] % self.save_interval == 0:
+                state["rng"] = rng.get_state()
+                write_pickled(path, state, msg=f"{self.name} training checkpoint")
+
+            if self.early_stopping_patience is not None and state["stale"] >= self.early_stopping_patience:
+                info(f"Early stopping {self.name} after {state['stale']} epochs without held-out improvement")
+                break
+
+        # the trained model is persisted as usual
+        if exists(path):
+            remove(path)
+        self.model = state["best"] if state["best"] is not None else model
+        self.scaler = scaler
+        return (self.model, self.scaler)
+
+
+class SGDSVM(IncrementalClassifier):
+    """Linear SVM via stochastic gradient descent"""
+    name = "sgd_svm"
+
+    def __init__(self, config):
+        self.config = config
+        self.model_class = SGDClassifier
+        self.args = {"loss": "hinge", "random_state": config.misc.seed}
+        IncrementalClassifier.__init__(self)
+
+
+class SGDLogisticRegression(IncrementalClassifier):
+    """Logistic regression via stochastic gradient descent"""
+    name = "sgd_logreg"
+
+    def __init__(self, config):
+        self.config = config
+        self.model_class = SGDClassifier
+        self.args = {"loss": "log_loss", "random_state": config.misc.seed}
+        IncrementalClassifier.__init__(self)
+
+
+class PassiveAggressive(IncrementalClassifier):
+    name = "passive_aggressive"
+
+    def __init__(self, config):
+        self.config = config
+        self.model_class = PassiveAggressiveClassifier
+        self.args = {"random_state": config.misc.seed}
+        IncrementalClassifier.__init__(self)
+
+
+class MultinomialNaiveBayes(IncrementalClassifier):
+    name = "multinomial_nb"
+
+    def __init__(self, config):
+        self.config = config
+        self.model_class = MultinomialNB
+        IncrementalClassifier.__init__(self)
+
+    def make_scaler(self):
+        # multinomial likelihoods require non-negative features
+        return MaxAbsScaler()
@@ -1,24 +1,33 @@
-from learning.classifier import Dummy, LogisticRegression, NaiveBayes, SVM
-from learning.clusterer import KMeansClusterer
 # from learning.dnn import MLP as tfMLP
-from utils import error, info
-
-from learning.neural.models import instantiator as neural_instantiator
+from utils import error, info, import_object
 
 class Instantiator:
     component_name = "learner"
+    # learner name to class path, imported on first use
+    candidates = {
+        "kmeans": "learning.clusterer:KMeansClusterer",
+        "naive_bayes": "learning.classifier:NaiveBayes",
+        "dummy": "learning.classifier:Dummy",
+        "logreg": "learning.classifier:LogisticRegression",
+        "svm": "learning.classifier:SVM",
+        "linear_svm": "learning.classifier:LinearSVM",
+        "knn": "learning.knn:KNN",
+        "sgd_svm": "learning.incremental:SGDSVM",
+        "sgd_logreg": "learning.incremental:SGDLogisticRegression",
+        "passive_aggressive": "learning.incremental:PassiveAggressive",
+        "multinomial_nb": "learning.incremental:MultinomialNaiveBayes",
+    }
 
     @staticmethod
     def create(config):
         """Function to instantiate a learning"""
         name = config.name
-        candidates = [KMeansClusterer, NaiveBayes, Dummy, LogisticRegression, SVM]
         # instantiate non-neural candidates
-        for candidate in candidates:
-            if name == candidate.name:
-                return candidate(config)
+        if name in Instantiator.candidates:
+            return import_object(Instantiator.candidates[name])(config)
 
-        # instantiate neural candidates
+        # instantiate neural candidates; the neural stack is imported only if required
+        from learning.neural.models import instantiator as neural_instantiator
         try:
             neural_wrapper_class = neural_instantiator.get_neural_wrapper_class(name)
             info(f"Parsed wrapper: {neural_wrapper_class.name} from learner name: {name}")
@@ -26,4 +35,4 @@ class Instantiator:
         except ValueError:
             # handled in the neural instantiator
             pass
-        error("Undefined learning: {}. Available ones are: {}".format(name, candidates))
+        error("Undefined learning: {}. Available ones are: {}".format(name, list(Instantiator.candidates)))
@@ -0,0 +1,164 @@
+import time
+from os.path import exists
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from bundle.datatypes import Dictionary
+from bundle.datausages import DataPack
+from learning.classifier import Classifier
+from utils import error, info, read_pickled, tictoc, write_pickled
+
+
+class NeighbourIndex:
+    """Inverted file (IVF) index for approximate nearest neighbour search.
+
+    Vectors are partitioned by a coarse k-means quantizer and stored contiguously per partition;
+    queries are exhaustively compared only against the vectors of the nearest probed partitions.
+    Arrays are persisted as separate npy files, memory-mapped when loaded.
+    """
+    array_names = ("centroids", "offsets", "vectors", "ids", "targets")
+
+    def __init__(self, metric="euclidean", num_lists=None, num_probes=8, seed=None):
+        error(f"Undefined neighbour metric: {metric}", metric not in ("euclidean", "cosine"))
+        self.metric = metric
+        self.num_lists = num_lists
+        self.num_probes = num_probes
+        self.seed = seed
+        self.centroids = self.offsets = self.vectors = self.ids = self.targets = None
+
+    def prepare(self, data):
+        data = np.asarray(data, dtype=np.float32)
+        if self.metric == "cosine":
+            norms = np.linalg.norm(data, axis=1, keepdims=True)
+            data = data / np.maximum(norms, np.finfo(np.float32).tiny)
+        return data
+
+    def build(self, data, ids, targets):
+        """Partition the data and store it contiguously, per partition"""
+        data = self.prepare(data)
+        num_lists = self.num_lists or max(1, int(np.sqrt(len(data))))
+        num_lists = min(num_lists, len(data))
+        if num_lists > 1:
+            quantizer = MiniBatchKMeans(num_lists, random_state=self.seed, n_init=3).fit(data)
+            self.centroids, assignments = quantizer.cluster_centers_.astype(np.float32), quantizer.labels_
+        else:
+            self.centroids, assignments = data.mean(axis=0, keepdims=True), np.zeros(len(data), np.int64)
+        order = np.argsort(assignments, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=len(self.centroids)))))
+        self.vectors, self.ids, self.targets = data[order], np.asarray(ids)[order], targets[order]
+        self.num_lists = len(self.centroids)
+
+    @staticmethod
+    def squared_distances(queries, data):
+        dists = (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ data.T + (data ** 2).sum(axis=1)[None, :]
+        return np.maximum(dists, 0)
+
+    def search(self, queries, k):
+        """Return the positions in the index and distances of the k nearest neighbours of each query"""
+        queries = self.prepare(queries)
+        num_probes = min(self.num_probes, self.num_lists)
+        probes = np.argsort(self.squared_distances(queries, self.centroids), axis=1)[:, :num_probes]
+        positions = np.full((len(queries), k), -1, np.int64)
+        distances = np.full((len(queries), k), np.inf, np.float32)
+        for q, query_probes in enumerate(probes):
+            candidates = np.concatenate([np.arange(self.offsets[p], self.offsets[p + 1]) for p in query_probes])
+            dists = self.squared_distances(queries[q: q + 1], self.vectors[candidates])[0]
+            num = min(k, len(candidates))
+            nearest = np.argpartition(dists, num - 1)[:num]
+            nearest = nearest[np.argsort(dists[nearest], kind="stable")]
+            positions[q, :num], distances[q, :num] = candidates[nearest], dists[nearest]
+        if self.metric == "cosine":
+            # squared euclidean to cosine distance, for unit vectors
+            distances /= 2
+        else:
+            distances = np.sqrt(distances)
+        return positions, distances
+
+    def vote(self, positions):
+        """Label scores as the fraction of neighbours voting for each label"""
+        valid = positions >= 0
+        scores = np.zeros((len(positions), self.targets.shape[1]), np.float32)
+        for j in range(positions.shape[1]):
+            rows = valid[:, j]
+            scores[rows] += self.targets[positions[rows, j]]
+        return scores / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+
+    def __getstate__(self):
+        # arrays are stored separately
+        return {k: v for (k, v) in self.__dict__.items() if k not in self.array_names}
+
+    def save(self, path):
+        for name in self.array_names:
+            np.save(f"{path}.{name}.npy", getattr(self, name))
+        write_pickled(path, self, msg="neighbour index")
+
+    @staticmethod
+    def load(path):
+        index = read_pickled(path, msg="neighbour index")
+        for name in index.array_names:
+            setattr(index, name, np.load(f"{path}.{name}.npy", mmap_mode="r"))
+        return index
+
+
+class KNN(Classifier):
+    """k-nearest neighbour classifier, voting over an approximate neighbour index of the training vectors"""
+    name = "knn"
+
+    def __init__(self, config):
+        self.config = config
+        self.neighbours = config.neighbours
+        Classifier.__init__(self)
+        self.neighbour_outputs = []
+
+    def __str__(self):
+        return "name: {} k: {} metric: {}".format(self.name, self.neighbours, self.config.metric)
+
+    def train_model(self):
+        train_data = self.get_data_from_index(self.train_index, self.embeddings)
+        train_labels = self.labels_info.get_label_matrix(self.targets.get_slice(self.train_index)).toarray().astype(np.float32)
+        index = NeighbourIndex(self.config.metric, self.config.index_lists, self.config.index_probes, self.seed)
+        with tictoc(f"Building {self.name} index over {len(train_data)} vectors"):
+            index.build(train_data, self.train_index, train_labels)
+        self.model = index
+        return self.model
+
+    def test_model(self, model):
+        positions, distances, elapsed = [], [], 0
+        for test_data in self.iter_data_from_index(self.test_index, self.embeddings):
+            start = time.time()
+            pos, dist = model.search(test_data, self.neighbours)
+            elapsed += time.time() - start
+            positions.append(pos)
+            distances.append(dist)
+        positions, distances = np.concatenate(positions), np.concatenate(distances)
+        info("{} query latency: {:.3f} ms / instance over {} instances, probing {}/{} lists".format(
+            self.name, 1000 * elapsed / max(len(positions), 1), len(positions), min(model.num_probes, model.num_lists), model.num_lists))
+
+        ids = np.where(positions >= 0, np.asarray(model.ids)[np.maximum(positions, 0)], -1)
+        self.neighbour_outputs.append({"model": f"model_{self.model_index}", "ids": ids.tolist(), "distances": distances.tolist()})
+        return model.vote(positions)
+
+    def produce_outputs(self):
+        self.neighbour_outputs = []
+        super().produce_outputs()
+
+    def set_component_outputs(self):
+        super().set_component_outputs()
+        if self.neighbour_outputs:
+            # neighbour ids and distances, per model
+            dp = DataPack(Dictionary({"neighbours": self.neighbour_outputs}))
+            self.data_pool.add_data_packs([dp], self.name)
+
+    def save_model(self):
+        for m in range(len(self.models)):
+            self.model_index = m
+            self.models[m].save(self.get_current_model_path())
+        self.save_model_wrapper()
+
+    def load_model(self):
+        path = self.get_model_path()
+        if not exists(path):
+            return False
+        self.model = NeighbourIndex.load(path)
+        return True
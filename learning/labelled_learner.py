@@ -7,6 +7,7 @@ from bundle.datatypes import *
 from bundle.datausages import *
 from defs import roles
 from learning.supervised_learner import SupervisedLearner
+from learning.validation.splitting import folds_to_splits, iterative_stratification
 from learning.validation.validation import ValidationSetting
 from utils import (count_occurences, error, info, is_multilabel, tictoc, write_pickled, all_labels_have_samples, one_hot, read_pickled, read_json, write_json, warning)
 
@@ -61,10 +62,8 @@ class LabelledLearner(SupervisedLearner):
         self.evaluator.update_reference_labels(train_idx, test_label_index)
 
     def stratified_mutltilabel_split(self):
-        stratifier = IterativeStratification(n_splits=2, order=2, sample_distribution_per_fold=[self.validation_portion, 1.0-self.validation_portion])
-        labels = one_hot(self.train_labels, self.num_labels, self.do_multilabel)
-        train_indexes, test_indexes = next(stratifier.split(np.zeros(len(self.train_labels)), labels))
-        return [(train_indexes, test_indexes)]
+        folds = iterative_stratification(self.train_labels, self.num_labels, [self.validation_portion, 1.0 - self.validation_portion], self.seed)
+        return folds_to_splits(folds, 2)[:1]
 
     def process_ground_truth_input(self):
         super().process_ground_truth_input()
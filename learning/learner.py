@@ -1,4 +1,5 @@
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
 from os import makedirs
 from os.path import dirname, exists, join, basename, abspath, isabs
 
@@ -20,6 +21,24 @@ Abstract class representing a learning model
 """
 
 
+def scatter_predictions(num_instances, model_inputs, model_predictions):
+    """Place the predictions of each model on the rows of its inputs, in a block of num_instances rows per model.
+
+    Row m * num_instances + i holds the prediction of model m for input instance i; rows of instances that
+    were not predicted are nan (zero for non-float predictions).
+    """
+    computed = [p for p in model_predictions if p is not None]
+    if not computed:
+        return np.empty((0, 0))
+    num_columns, dtype = computed[0].shape[-1], computed[0].dtype
+    fill = np.nan if np.issubdtype(dtype, np.floating) else 0
+    res = np.full((len(model_inputs) * num_instances, num_columns), fill, dtype=dtype)
+    for model_index, (inputs, predictions) in enumerate(zip(model_inputs, model_predictions)):
+        if predictions is not None:
+            res[model_index * num_instances + np.asarray(inputs, dtype=np.int64)] = predictions
+    return res
+
+
 class Learner(Serializable):
 
     component_name = "learner"
@@ -74,8 +93,9 @@ class Learner(Serializable):
     def check_sanity(self):
         """Sanity checks"""
         # check data for nans
-        if np.size(np.where(np.isnan(self.embeddings))[0]) > 0:
-            error("NaNs exist in data:{}".format(np.where(np.isnan(self.embeddings))))
+        nan_rows = np.where(get_nan_row_mask(self.embeddings))[0]
+        if nan_rows.size > 0:
+            error("NaNs exist in data rows:{}".format(nan_rows))
         # validation configuration
         if self.do_folds and self.do_validate_portion:
             error("Specified both folds {} and validation portion {}.".format(
@@ -230,14 +250,32 @@ class Learner(Serializable):
         self.serialization_path_preprocessed = join(self.results_folder, "data")
         self.execute_training()
 
+    def get_prediction_roles(self):
+        """Instance roles to produce predictions for, as per the configured prediction scope"""
+        scopes = {"test": [defs.roles.test],
+                  "val_test": [defs.roles.val, defs.roles.test],
+                  "all": [defs.roles.train, defs.roles.val, defs.roles.test]}
+        error(f"Undefined prediction scope: {self.config.prediction_scope}, available ones are {list(scopes)}", self.config.prediction_scope not in scopes)
+        return scopes[self.config.prediction_scope]
+
+    def predict_with_model(self, model_index, index):
+        """Apply a model on input instances, via a shallow learner copy to allow concurrent application"""
+        if len(index) == 0:
+            return None
+        learner = copy(self)
+        learner.model_index, learner.test_index = model_index, index
+        return learner.test_model(self.models[model_index])
+
+    def add_prediction_tag(self, idx, tag):
+        if self.output_usage is None:
+            self.output_usage = Predictions(idx, tag)
+        else:
+            self.output_usage.add_instance(idx, tag)
+
     def produce_outputs(self):
         # apply the learning model on the input data
         # produce pairing with ground truth for future evaluation
-        # training data
         self.configure_model_after_inputs()
-        self.predictions = None
-        self.prediction_model_indexes = []
-        self.prediction_roles = []
 
         if self.validation is not None:
             idxs = {defs.roles.train: self.validation.get_train_indexes(),
@@ -248,38 +286,33 @@ class Learner(Serializable):
                     defs.roles.val: [np.asarray([], dtype=np.int32)],
                     defs.roles.test: [self.test_embedding_index]}
 
-        # loop over the available models / data batches
         num_models = len(self.models)
-        if num_models > 1 and len(train_indexes) == 1:
-            for k, v in idxs:
+        for role in idxs:
+            if len(idxs[role]) == 1 and num_models > 1:
                 # single set of indexes, multiple models: duplicate
-                idxs[k] = idxs[k] * num_models
-
-        self.predictions = None
-
+                idxs[role] = idxs[role] * num_models
+
+        # each model predicts the union of the instances of the roles in scope, once
+        roles = self.get_prediction_roles()
+        model_inputs = [np.unique(np.concatenate([np.asarray(idxs[role][m], dtype=np.int64) for role in roles])) for m in range(num_models)]
+        with tictoc(f"Applying {num_models} model(s) on {'/'.join(roles)} data with {self.config.prediction_workers} worker(s)"):
+            with ThreadPoolExecutor(self.config.prediction_workers) as pool:
+                model_predictions = list(pool.map(self.predict_with_model, range(num_models), model_inputs))
+
+        # predictions stay aligned to the input instances, in a block per model
+        num_instances = self.embeddings.shape[0]
+        self.predictions = scatter_predictions(num_instances, model_inputs, model_predictions)
         self.output_usage = None
-        for model_index, model in enumerate(self.models):
-            # apply to all input data
-            self.test_index = np.arange(len(self.embeddings))
-            info(f"Applying trained model {model_index + 1}/{num_models} on all {len(self.test_index)} input data.")
-            new_predictions = self.test_model(self.models[model_index])
-            if self.predictions is None:
-                self.predictions = np.empty((0, new_predictions.shape[-1]), dtype=new_predictions.dtype)
-            predictions_index = np.arange(len(self.predictions), len(self.predictions) + len(new_predictions))
-            self.predictions = np.vstack((self.predictions, new_predictions))
-
-            # make the prediction usages annotation
-            # mark role tags and indexes
-
-            for role, idx in idxs.items():
-                idx = idx[model_index]
-                if self.output_usage is None:
-                    self.output_usage = Predictions(idx, role)
-                else:
-                    self.output_usage.add_instance(idx, role)
-            # mark model index tags and indexes
-            model_id = f"model_{self.model_index}"
-            self.output_usage.add_instance(predictions_index, model_id)
+        for model_index, inputs in enumerate(model_inputs):
+            info(f"Model {model_index + 1}/{num_models}: {len(inputs)} predictions.")
+            offset = model_index * num_instances
+            # mark model tags, and the correspondence of prediction rows to the input instances
+            model_id = f"model_{model_index}"
+            self.add_prediction_tag(np.arange(offset, offset + num_instances), model_id)
+            self.add_prediction_tag(np.arange(num_instances), f"{model_id}_{defs.roles.inputs}")
+            # mark role tags, on prediction rows
+            for role in roles:
+                self.add_prediction_tag(offset + np.asarray(idxs[role][model_index], dtype=np.int64), role)
 
     def get_model(self):
         return self.model
@@ -355,6 +388,13 @@ class Learner(Serializable):
                 error("Learner [{}] has no defined aggregation and is not sequence-capable, but the input index has shape {}".format(self.name, index.shape))
         return embeddings[index] if len(index) > 0 else None
 
+    def iter_data_from_index(self, index, embeddings):
+        """Get data from the embedding matrix in batches; lazy composite inputs are materialized per batch"""
+        if type(embeddings) is CompositeMatrix and len(index) > 0:
+            yield from embeddings.iter_batches(index)
+        else:
+            yield self.get_data_from_index(index, embeddings)
+
     def set_component_outputs(self):
         """Set the output data of the clusterer"""
         # predictions to output
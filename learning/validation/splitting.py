@@ -1,13 +1,73 @@
+import heapq
+
 from sklearn.model_selection import KFold, StratifiedKFold, ShuffleSplit, StratifiedShuffleSplit
-from skmultilearn.model_selection import IterativeStratification, iterative_train_test_split
 import numpy as np
 
 # from learning.sampling import oversample_single_sample_labels
 
-from utils import info, one_hot, warning, error
+from utils import info, label_matrix, warning, error
 """Module for validation splits"""
 
 
+def iterative_stratification(labels, num_labels, proportions, seed):
+    """Assign instances to folds with the given size proportions, via first-order iterative stratification (Sechidis et al., 2011)
+
+    Labels are processed in increasing order of the number of their unassigned instances, kept in a lazily updated heap.
+    Each instance of the current label goes to the fold that most lacks that label, breaking ties by the overall fold
+    lack and then randomly. Returns the fold index of each instance.
+    """
+    rng = np.random.RandomState(seed)
+    by_instance = labels.tocsr() if hasattr(labels, "tocsr") else label_matrix(labels, num_labels)
+    by_label = by_instance.tocsc()
+    num_instances, num_folds = by_instance.shape[0], len(proportions)
+    proportions = np.asarray(proportions, dtype=np.float64)
+
+    label_counts = np.asarray(by_instance.sum(axis=0)).ravel()
+    desired = proportions * num_instances
+    desired_per_label = np.outer(proportions, label_counts)
+    folds = np.full(num_instances, -1, dtype=np.int64)
+
+    remaining = label_counts.copy()
+    # random tie-breaking among equally rare labels
+    tiebreak = rng.permutation(num_labels)
+    heap = [(remaining[l], tiebreak[l], l) for l in range(num_labels) if remaining[l] > 0]
+    heapq.heapify(heap)
+    while heap:
+        count, _, label = heapq.heappop(heap)
+        if count != remaining[label] or count == 0:
+            # stale entry
+            continue
+        instances = by_label.indices[by_label.indptr[label]:by_label.indptr[label + 1]]
+        instances = rng.permutation(instances[folds[instances] < 0])
+        for inst in instances:
+            lack = desired_per_label[:, label]
+            candidates = np.flatnonzero(lack == lack.max())
+            if len(candidates) > 1:
+                candidates = candidates[desired[candidates] == desired[candidates].max()]
+            fold = candidates[rng.randint(len(candidates))] if len(candidates) > 1 else candidates[0]
+            folds[inst] = fold
+            inst_labels = by_instance.indices[by_instance.indptr[inst]:by_instance.indptr[inst + 1]]
+            desired_per_label[fold, inst_labels] -= 1
+            desired[fold] -= 1
+            remaining[inst_labels] -= 1
+        # re-rank labels sharing instances with the current one
+        for other in np.unique(by_instance[instances].indices):
+            if remaining[other] > 0:
+                heapq.heappush(heap, (remaining[other], tiebreak[other], other))
+
+    # label-less instances fill the folds lacking the most instances
+    for inst in rng.permutation(np.flatnonzero(folds < 0)):
+        fold = np.argmax(desired)
+        folds[inst] = fold
+        desired[fold] -= 1
+    return folds
+
+
+def folds_to_splits(folds, num_folds):
+    """Convert fold assignments to (train, test) index pairs"""
+    return [(np.flatnonzero(folds != f), np.flatnonzero(folds == f)) for f in range(num_folds)]
+
+
 
 def kfold_split(data, num_folds, seed, labels=None, label_info=None):
     """Do K-fold cross-validation"""
@@ -21,9 +81,8 @@ def kfold_split(data, num_folds, seed, labels=None, label_info=None):
         num_labels = len(label_info.label_names)
         if multilabel:
             info(msg +" using iterative stratification.")
-            splitter = IterativeStratification(num_folds, order=1)
-            oh_labels = one_hot(labels, num_labels, is_multilabel=True)
-            return list(splitter.split(np.zeros(len(labels)), oh_labels))
+            folds = iterative_stratification(labels, num_labels, [1.0 / num_folds] * num_folds, seed)
+            return folds_to_splits(folds, num_folds)
         else:
             try:
                 info(msg +" using stratification.")
@@ -45,11 +104,10 @@ def portion_split(data, portion, seed=1337, labels=None, label_info=None):
         multilabel = label_info.multilabel
         num_labels = len(label_info.label_names)
         if multilabel:
-            stratifier = IterativeStratification(n_splits=2, order=2, sample_distribution_per_fold=[portion, 1.0-portion])
-            labels = one_hot(labels, num_labels, True)
             info(msg +" using iterative stratification.")
-            train_indexes, test_indexes = next(stratifier.split(np.zeros(len(data)), labels))
-            return [(train_indexes, test_indexes)]
+            folds = iterative_stratification(labels, num_labels, [portion, 1.0 - portion], seed)
+            # the validation portion is the first fold
+            return folds_to_splits(folds, 2)[:1]
         else:
             try:
                 info(msg +" using stratification.")
@@ -1,3 +1,6 @@
+import hashlib
+from os.path import exists, join
+
 import numpy as np
 from learning.validation.splitting import kfold_split, portion_split
 
@@ -25,15 +28,32 @@ class ValidationSetting:
         self.seed = seed
         self.make_splits()
 
+    def get_split_cache_path(self):
+        """Path to cached splits, keyed by a hash of the training indexes, labels and split parameters"""
+        digest = hashlib.sha1(np.ascontiguousarray(self.train_idx, dtype=np.int64).tobytes())
+        digest.update(f"{self.folds}_{self.portion}_{self.seed}".encode())
+        if self.labels is not None:
+            labels = [np.atleast_1d(l) for l in self.labels]
+            digest.update(np.asarray([len(l) for l in labels], dtype=np.int64).tobytes())
+            digest.update(np.concatenate(labels).astype(np.int64).tobytes())
+            digest.update(str(self.label_info.multilabel).encode())
+        return join(self.config.folders.serialization, "splits", digest.hexdigest() + ".pkl")
+
     def make_splits(self):
         """Produce validation splits, if defined"""
         # produce fold/portion splits of the training indexes: these output indexes to the tr. indexes themselves
-        if self.folds is not None:
-            meta_trainval_idx = kfold_split(self.train_idx, self.folds, self.seed, self.labels, self.label_info)
-        elif self.portion is not None:
-            meta_trainval_idx = portion_split(self.train_idx, self.portion, self.seed, self.labels, self.label_info)
-        else:
+        if self.folds is None and self.portion is None:
             meta_trainval_idx = [(np.arange(len(self.train_idx)), np.arange(0, dtype=np.int32))]
+        else:
+            cache_path = self.get_split_cache_path()
+            if exists(cache_path):
+                meta_trainval_idx = read_pickled(cache_path, msg="validation splits")
+            else:
+                if self.folds is not None:
+                    meta_trainval_idx = kfold_split(self.train_idx, self.folds, self.seed, self.labels, self.label_info)
+                else:
+                    meta_trainval_idx = portion_split(self.train_idx, self.portion, self.seed, self.labels, self.label_info)
+                write_pickled(cache_path, meta_trainval_idx, msg="validation splits")
         # "dereference" the metaindexes to point to the data themselves
         self.trainval_idx = []
         for (tidx, vidx) in meta_trainval_idx:
@@ -26,5 +26,6 @@ class Concatenation(Fusion):
         for d in self.input_dps:
             info(f"{d} : {d.data.instances.shape}")
         info(f"Manipulating {self.name} inputs: {shapes_list(insts)}")
-        self.outputs = np.concatenate(insts, axis=1)
+        # column-block view; no concatenated copy is allocated
+        self.outputs = CompositeMatrix(insts)
         info(f"Produced {self.name} outputs: {self.outputs.shape}")
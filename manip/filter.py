@@ -42,6 +42,7 @@ class Filter(Manipulation):
             else:
                 mask = self.apply_operation(instances)
             debug(f"First 10 of the {len(mask)} survivors: {mask[:10]}")
+            self.data_pool.log_pruning(self.config.produce_index_tag, len(instances), len(mask))
             # add filtered index and tag
             output_usages = [Indices(mask, [self.config.produce_index_tag], skip_empty=False)]
             # modify (align) existing indexes, post-filtering
@@ -54,6 +55,9 @@ class Filter(Manipulation):
             new_dp = DataPack(DummyData(), output_usages)
             self.outputs.append(new_dp)
 
+    def get_produced_index_tags(self):
+        return [self.config.produce_index_tag]
+
     def set_component_outputs(self):
         self.data_pool.add_data_packs(self.outputs, self.name)
 
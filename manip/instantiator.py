@@ -1,17 +1,18 @@
-from manip.ngram import NGram
-from manip.slice import Slice
-from manip.concat import Concatenation
-from manip.replication import Replication
-from manip.filter import Filter
-from utils import error
+from utils import error, import_object
 
 class Instantiator:
     component_name = "manip"
-    candidates = [Concatenation, Replication, Filter, NGram, Slice]
+    # manipulation name to class path, imported on first use
+    candidates = {
+        "concat": "manip.concat:Concatenation",
+        "repl": "manip.replication:Replication",
+        "filter": "manip.filter:Filter",
+        "ngram": "manip.ngram:NGram",
+        "slice": "manip.slice:Slice",
+    }
 
     @staticmethod
     def create(config):
-        for cand in Instantiator.candidates:
-            if cand.name == config.name:
-                return cand(config)
+        if config.name in Instantiator.candidates:
+            return import_object(Instantiator.candidates[config.name])(config)
         error("Undefined {} : {}".format(Instantiator.component_name, config.name))
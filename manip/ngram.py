@@ -1,10 +1,10 @@
 # from manip.filter import Filter
 from manip.manip import Manipulation
-from utils import info, error, is_collection, make_indexes
+from utils import info, error, is_collection
 from collections import OrderedDict
 from bundle.datatypes import *
 from bundle.datausages import *
-from dataset.dataset import Dataset
+import numpy as np
 
 class NGram(Manipulation):
     """Class to expand inputs to ngram instances
@@ -25,54 +25,40 @@ class NGram(Manipulation):
 
     def apply_operation(self, inputs):
         """Generate ngrams from input sequences
+
+        Contexts are produced as spans over the token array of the input, so no text is copied.
         """
-        # gather contexts separately to make subsequent flexible handling doable
-        before, after, center = [], [], []
-        out_train, out_test = [], []
+        if type(inputs) is not TokenSpans:
+            inputs = TokenSpans.from_instances(inputs)
         train, test = self.indices.get_train_test()
-        global_idx = -1
         # keep track to which instance each center word belongs to
-        instance_level_index = []
-        # produce ngrams
-        for s, sequence in enumerate(inputs):
-            sequence = Dataset.get_words(sequence)
-            instance_level_index.extend([s] * len(sequence))
-            for i in range(len(sequence)):
-                global_idx += 1
-                # get and filter indices for fefore - after contexts
-                cbi = [x for x in range(i-self.before, i) if x >= 0]
-                cai = [x for x in range(i+1, i+1+self.after) if x < len(sequence)]
-                # assign elements
-                cb = [sequence[k] for k in cbi]
-                ca = [sequence[k] for k in cai]
-                # add to collections
-                before.append(cb)
-                center.append(sequence[i])
-                after.append(ca)
-                # handle role indexing to the new collection
-                if s in train:
-                    out_train.append(global_idx)
-                if s in test:
-                    out_test.append(global_idx)
-        # all data in a single container
-        data = [Dataset.get_instance_from_words(x) for x in (center + before + after)]
+        instance_level_index, word_idx, token_pos = inputs.get_token_positions()
+        lengths = inputs.get_lengths()[instance_level_index]
+        num_center = len(token_pos)
+        # clip before - after windows to the instance boundaries
+        before_size = np.minimum(word_idx, self.before)
+        after_size = np.minimum(lengths - word_idx - 1, self.after)
+        starts = np.concatenate((token_pos, token_pos - before_size, token_pos + 1))
+        ends = np.concatenate((token_pos + 1, token_pos, token_pos + 1 + after_size))
+        # all data in a single container: center, before and after sections
+        data = TokenSpans(inputs.token_ids, starts, ends, inputs.vocabulary, inputs.pos_ids, inputs.pos_vocabulary)
+
         # all indexes
         all_tags = [defs.roles.train, defs.roles.test] + "center before after".split()
         # add train-test idxs, expanding to center, before and after sections
-        expand_idx = lambda idx: idx + [x + k* len(center) for k in (1, 2) for x in idx]
-        all_idxs = [expand_idx(out_train), expand_idx(out_test)] 
-        all_idxs.extend(make_indexes([len(x) for x in (center, before, after)]))
+        expand_idx = lambda idx: np.concatenate([idx + k * num_center for k in range(3)])
+        out_train = np.where(np.isin(instance_level_index, train))[0]
+        out_test = np.where(np.isin(instance_level_index, test))[0]
+        all_idxs = [expand_idx(out_train), expand_idx(out_test)]
+        all_idxs.extend(np.arange(k * num_center, (k + 1) * num_center) for k in range(3))
 
-        # add the word2instance indexes:
-        inst_idx_dict = {}
-        # duplicate for context
-        instance_level_index *= 3
-        for inst in set(instance_level_index):
-            idx = [i for (i, idx) in enumerate(instance_level_index) if idx == inst]
+        # add the word2instance indexes, duplicated for context
+        instance_level_index = np.tile(instance_level_index, 3)
+        order = np.argsort(instance_level_index, kind="stable")
+        insts, counts = np.unique(instance_level_index, return_counts=True)
+        for inst, idx in zip(insts, np.split(order, np.cumsum(counts)[:-1])):
             all_tags.append(f"ngram_inst_{inst}")
             all_idxs.append(idx)
-        # all_idxs.append(instance_level_index)
-        # all_tags.append("ngram")
 
         self.indexes = Indices(all_idxs, tags=all_tags)
         self.output = Text(data)
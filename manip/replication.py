@@ -1,4 +1,5 @@
-from bundle.datatypes import Numeric
+from bundle.datatypes import Numeric, CompositeMatrix
+from bundle.datausages import Indices
 import numpy as np
 from utils import info, error
 
@@ -24,15 +25,18 @@ class Replication(Manipulation):
     def fuse():
         return None
 
-    def run(self):
-        self.process_component_inputs()
-        if type(self.vectors) is tuple:
-            self.vectors = list(self.vectors)
-        for v, vec in enumerate(self.vectors):
-            # replicate k rows: from MxN to Mx(N+k), reshape to N-dimensional
-            msg = "Replicating input collection with shape: {} to".format(vec.shape)
-            vec = np.reshape(np.tile(vec, (1, self.replicate_times)), (-1, vec.shape[-1]))
-            info(msg + " {}".format(vec.shape))
-            self.vectors[v] = vec
-        self.outputs.set_vectors(Numeric(vecs=self.vectors, epi=[np.ones(len(vec), np.int32) * self.replicate_times for vec in self.vectors]))
-        # self.outputs.set_source_name(self.name)
+    def produce_outputs(self):
+        error(f"{self.name} can only operate on a single input, but {len(self.inputs)}", len(self.inputs) > 1)
+        vec, indices = self.inputs[0], self.indices[0]
+        # replicate k rows: from MxN to (k*M)xN, as a row-index view over the input
+        msg = "Replicating input collection with shape: {} to".format(vec.shape)
+        row_index = np.repeat(np.arange(vec.shape[0]), self.replicate_times)
+        if type(vec) is CompositeMatrix:
+            self.outputs = vec.take_rows(row_index)
+        else:
+            self.outputs = CompositeMatrix([vec], row_index=row_index)
+        info(msg + " {}".format(self.outputs.shape))
+        # input row i maps to output rows i*k ... i*k + k-1
+        k = self.replicate_times
+        instances = [(np.asarray(idx)[:, None] * k + np.arange(k)).ravel() for idx in indices.instances]
+        self.indices = Indices(instances, indices.tags)
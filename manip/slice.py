@@ -22,6 +22,18 @@ class Slice(Manipulation):
         if self.target_tags is not None:
             self.target_tags = as_list(self.target_tags)
 
+    def get_tagged_positions(self, values):
+        """Get all positions of the values in the tagged index, in value order"""
+        order = np.argsort(self.tagged_idx, kind="stable")
+        sorted_idx = self.tagged_idx[order]
+        start = np.searchsorted(sorted_idx, values, side="left")
+        counts = np.searchsorted(sorted_idx, values, side="right") - start
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return order[np.repeat(start, counts) + offsets]
+
+    def get_cascade_tag(self):
+        return self.tag if self.config.cascade else None
+
     def set_component_outputs(self):
         # make datapack
         # dp = DataPack(self.output)
@@ -57,6 +69,11 @@ class Slice(Manipulation):
         if type(self.input_dp.data) is DummyData:
             return self.slice_dummy()
 
+        if self.input_dp.selection_tag == self.tag:
+            # input computed in cascade, on the tagged instances only
+            info(f"Input already restricted to the [{self.tag}] instances in cascade")
+            self.tagged_idx = sliced_index
+
         # make the data
         sliced_instances = self.input_dp.data.get_slice(self.tagged_idx)
         data_cls = get_data_class(self.input_dp.data)
@@ -80,7 +97,7 @@ class Slice(Manipulation):
                     info(f"Skipping tag {tg} because specified target tags: {self.target_tags}")
                     continue
                 # re-align the other index wrt. the slicing
-                ix = np.concatenate([np.where(self.tagged_idx == i)[0] for i in ix])
+                ix = self.get_tagged_positions(ix)
                 # add the idx to the indices object
                 output_idx.add_instance(ix, tg)
 
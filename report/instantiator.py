@@ -1,17 +1,18 @@
 """Report instantiation module"""
-from utils import error
-from report.report import MultistageClassificationReport
-from report.nvreport import NVReport
+from utils import error, import_object
 
 class Instantiator:
     """Class to instantiate a report object"""
     component_name = "report"
+    # report name to class path, imported on first use
+    candidates = {
+        "multistageclassif": "report.report:MultistageClassificationReport",
+        "nvreport": "report.nvreport:NVReport",
+    }
 
     @staticmethod
     def create(config):
         name = config.name
-        if name == MultistageClassificationReport.name:
-            return MultistageClassificationReport(config)
-        if name == NVReport.name:
-            return NVReport(config)
+        if name in Instantiator.candidates:
+            return import_object(Instantiator.candidates[name])(config)
         error(f"Undefined report name {name}")
@@ -88,6 +88,9 @@ class NVReport(Report):
 
 
         ngram_tags = sorted([x for x in datapack.usages[0].tags if x.startswith("ngram_inst")])
+        # top-k predictions of each step, over all instances
+        step_topk = [self.get_topK_preds(predictions[step_idx], self.label_mapping[step_idx], self.params.only_report_labels[step_idx])
+                     for step_idx in range(num_steps)]
 
         with tictoc("Classification report building", announce=False):
             for n, ngram_tag in enumerate(ngram_tags):
@@ -102,14 +105,12 @@ class NVReport(Report):
                     
                     # for each step
                     for step_idx in range(num_steps):
-                        preds = predictions[step_idx]
                         step_name = self.params.pred_chains[step_idx]
                         step_obj = {"name": step_name, "step_index": step_idx}
 
                         survives = thresholding[ix, step_idx]
-                        step_preds = np.expand_dims(preds[ix, :], axis=0)
-                        scores, classes = self.get_topK_preds(step_preds, self.label_mapping[step_idx], self.params.only_report_labels[step_idx])
-                        step_preds = {c: round(s, 4) for (c, s) in zip(classes[0], scores[0])}
+                        scores, classes = step_topk[step_idx]
+                        step_preds = {c: round(s, 4) for (c, s) in zip(classes[ix], scores[ix])}
                         step_obj["step_preds"] = step_preds
                         detailed.append(step_preds)
 
@@ -190,9 +191,11 @@ class NVReport(Report):
             # argsort the column prediction probas descending, get top k
             top_k_idxs = np.argsort(predictions, axis=1)[:,::-1][:, :self.topk]
             # make a reordered probs container
-            top_k_preds = [row[top_k_idxs[row_idx]].tolist() for row_idx, row in enumerate(predictions)]
+            top_k_preds = np.take_along_axis(predictions, top_k_idxs, axis=1).tolist()
             # take the classses corresponding to the argsorted indexes probs
-            top_k_predicted_classes = [[label_mapping[ix] for ix in idxs] for idxs in top_k_idxs]
+            label_names = np.empty(len(label_mapping), dtype=object)
+            label_names[:] = [label_mapping[ix] for ix in range(len(label_mapping))]
+            top_k_predicted_classes = label_names[top_k_idxs].tolist()
         if only_report_labels is not None:
             only_report_labels = as_list(only_report_labels)
             for i in range(len(top_k_predicted_classes)):
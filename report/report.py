@@ -29,11 +29,27 @@ class IndexMapper:
                         Implicitly defines a new container with the elements it points to, where the next index list refers to.
         """
         self.size = size
-        self.indexes = list_of_indexes
+        self.indexes = [np.asarray(idx, np.int64) for idx in list_of_indexes]
+        # inverse permutations: position of each element of the previous level's container in the current level, or -1
+        self.inverse = []
+        prev_size = size
+        for idx in self.indexes:
+            inv = np.full(prev_size, -1, np.int64)
+            # on duplicates, the first position is retained
+            inv[idx[::-1]] = np.arange(len(idx) - 1, -1, -1)
+            self.inverse.append(inv)
+            prev_size = len(idx)
+
+    def get_level_size(self, level):
+        return self.size if level == -1 else len(self.indexes[level])
 
     def index_survives(self, idx, target_level=-1):
         return self.convert_index(idx, target_level=target_level) is not None
 
+    def survival_mask(self, idx, source_level=-1, target_level=None):
+        """Mask of the input indexes that survive to the target level"""
+        return self.convert_indexes(idx, source_level, target_level) >= 0
+
     def convert_index_to_last_container(self, idx):
         """Converts input index to indexes of the last tangible container (to which the last index-list refers to)"""
         lvl =  len(self.indexes) - 2
@@ -41,42 +57,42 @@ class IndexMapper:
 
     def convert_index(self, idx, source_level=-1, target_level=None):
         """Converts index idx that resides on index_list of level source_level to the corresponding one
-        at target_level"""
-        error(f"Invalid index {idx}", idx < 0)
-        if source_level == -1:
-            # starts from the original index pool
-            if idx >= self.size:
-                error(f"Invalid index {idx} wrt. original size: {self.size}")
-            pass
-        else:
-            # make sure it exists in the specified level
-            if idx not in self.indexes[source_level]:
-                error(f"Requested conversion of idx {idx}: lvl {source_level}->{target_level}, but it's not in the source: {self.indexes[source_level]}")
+        at target_level, or None if it does not survive to it"""
+        res = self.convert_indexes([idx], source_level, target_level)
+        return None if res[0] < 0 else res
+
+    def convert_indexes(self, idx, source_level=-1, target_level=None):
+        """Converts a batch of indexes at level source_level to the corresponding ones at target_level,
+        with -1 for indexes that do not survive"""
+        idx = np.asarray(idx, np.int64)
         if target_level is None:
             # by default produce indexes in the final level
             target_level = len(self.indexes) - 1
-
-        if target_level == source_level:
-            return np.asarray([idx], np.int64)
-
-        # compute
-        curr_value = idx
-        curr_lvl = source_level
-        while True:
-            if target_level > curr_lvl:
-                # next level is ahead
-                curr_lvl += 1
-                if idx not in self.indexes[curr_lvl]:
-                    # index did not survive past this step
-                    return None
-                curr_value = np.where(self.indexes[curr_lvl] == curr_value)[0]
-            elif target_level < curr_lvl:
-                # next level is behind
-                curr_lvl -= 1
-                # slice; it's guaranteed to exist
-                curr_value = self.indexes[curr_lvl][curr_value]
-            else:
-                return curr_value
+        invalid = (idx < 0) | (idx >= self.get_level_size(source_level))
+        error(f"Invalid index(es) {idx[invalid]} wrt. level {source_level} size: {self.get_level_size(source_level)}", np.any(invalid))
+
+        res = idx.copy()
+        if target_level > source_level:
+            # forward, via the inverse permutations
+            for lvl in range(source_level + 1, target_level + 1):
+                alive = res >= 0
+                res[alive] = self.inverse[lvl][res[alive]]
+        else:
+            # backward; always valid
+            for lvl in range(source_level, target_level, -1):
+                res = self.indexes[lvl][res]
+        return res
+
+    def get_level_positions(self, idx=None):
+        """Positions of original container indexes at each level, computed in a single pass.
+        Row 0 corresponds to the original container, row l + 1 to level l; -1 marks non-surviving indexes."""
+        res = np.arange(self.size, dtype=np.int64) if idx is None else np.asarray(idx, np.int64)
+        positions = np.full((len(self.indexes) + 1, len(res)), -1, np.int64)
+        positions[0] = res
+        for lvl in range(len(self.indexes)):
+            alive = positions[lvl] >= 0
+            positions[lvl + 1, alive] = self.inverse[lvl][positions[lvl, alive]]
+        return positions
 
 class MultistageClassificationReport(Report):
     name = "multistageclassif"
@@ -160,6 +176,11 @@ class MultistageClassificationReport(Report):
         num_all_ngrams = len(predictions[0].data.instances)
         num_steps = len(predictions)
         index_mapper = IndexMapper(num_all_ngrams, tagged_idx)
+        # positions of each ngram in each step's container, -1 if filtered out
+        level_positions = index_mapper.get_level_positions()
+        # top-k predictions of each step, over all its instances
+        step_topk = [self.get_topK_preds(predictions[step_idx].data.instances, self.label_mapping[step_idx], self.params.only_report_labels[step_idx])
+                     for step_idx in range(num_steps)]
 
         ngram_tags = sorted([x for x in datapack.usages[0].tags if x.startswith("ngram_inst")])
         with tictoc("Classification report building", announce=False):
@@ -177,17 +198,15 @@ class MultistageClassificationReport(Report):
                     final_stages_for_word = []
                     # for each step
                     for step_idx in range(num_steps):
-                        preds = predictions[step_idx].data.instances
                         step_name = self.params.pred_chains[step_idx]
                         step_obj = {"name": step_name, "step_index": step_idx}
+                        scores, classes = step_topk[step_idx]
 
 
-                        if step_idx == 0 or index_mapper.index_survives(ix, target_level=step_idx):
+                        if step_idx == 0 or level_positions[step_idx + 1, ix] >= 0:
                             # we want the position of in the pred. container previous to the step
-                            surv_idx = index_mapper.convert_index(ix, target_level=step_idx-1)
-                            step_preds = preds[surv_idx, :]
-                            scores, classes = self.get_topK_preds(step_preds, self.label_mapping[step_idx], self.params.only_report_labels[step_idx])
-                            step_obj["step_preds"] = {c:s for (c,s) in zip(classes[0], scores[0])}
+                            surv_idx = level_positions[step_idx, ix]
+                            step_obj["step_preds"] = {c:s for (c,s) in zip(classes[surv_idx], scores[surv_idx])}
 
                             if step_idx == num_steps -1:
                                 word_obj["overall_preds"] = step_obj["step_preds"]
@@ -199,12 +218,10 @@ class MultistageClassificationReport(Report):
                         else:
                             if self.params.report_if_fail is not None:
                                 if step_name in self.params.report_if_fail:
-                                    surv_idx = index_mapper.convert_index(ix, target_level=step_idx-1)
-                                    if surv_idx is None:
+                                    surv_idx = level_positions[step_idx, ix]
+                                    if surv_idx < 0:
                                         break
-                                    step_preds = preds[surv_idx, :]
-                                    scores, classes = self.get_topK_preds(step_preds, self.label_mapping[step_idx], self.params.only_report_labels[step_idx])
-                                    step_obj["step_preds"] = {c:s for (c,s) in zip(classes[0], scores[0])}
+                                    step_obj["step_preds"] = {c:s for (c,s) in zip(classes[surv_idx], scores[surv_idx])}
 
                                     # since it fails, it's def. a final step for this word
                                     word_obj["overall_preds"] = step_obj["step_preds"]
@@ -214,7 +231,6 @@ class MultistageClassificationReport(Report):
                                         word_obj["detailed_preds"].append(step_obj)
                             else:
                                 # add the score of the last classification
-                                scores, classes = [], []
                                 step_obj["step_preds"] = {}
                                 break
 
@@ -277,9 +293,11 @@ class MultistageClassificationReport(Report):
             # argsort the column prediction probas descending, get top k
             top_k_idxs = np.argsort(predictions, axis=1)[:,::-1][:, :self.topk]
             # make a reordered probs container
-            top_k_preds = [row[top_k_idxs[row_idx]].tolist() for row_idx, row in enumerate(predictions)]
+            top_k_preds = np.take_along_axis(predictions, top_k_idxs, axis=1).tolist()
             # take the classses corresponding to the argsorted indexes probs
-            top_k_predicted_classes = [[label_mapping[ix] for ix in idxs] for idxs in top_k_idxs]
+            label_names = np.empty(len(label_mapping), dtype=object)
+            label_names[:] = [label_mapping[ix] for ix in range(len(label_mapping))]
+            top_k_predicted_classes = label_names[top_k_idxs].tolist()
         if only_report_labels is not None:
             only_report_labels = as_list(only_report_labels)
             for i in range(len(top_k_predicted_classes)):
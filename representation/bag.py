@@ -2,12 +2,14 @@ from utils import error, tictoc, debug, info
 import defs
 import tqdm
 import numpy as np
-from scipy.sparse import csr_matrix
+from scipy.sparse import csr_matrix, issparse
 from functools import partial
+from numbers import Integral
 
-from functools import partial
 import defs
 from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from bundle.datatypes import TokenSpans
+
 
 class Bag:
     weighting = None
@@ -40,21 +42,24 @@ class Bag:
     def apply_thresholds(self, vectors):
         """Apply resholding"""
         if self.min_counts is not None:
-            sums = np.sum(vectors, axis=0)
-            term_idxs = np.where(sums > self.min_counts)
-            vectors = vectors.squeeze()[:, term_idxs]
+            sums = np.asarray(vectors.sum(axis=0)).ravel()
+            term_idxs = np.where(sums > self.min_counts)[0]
+            vectors = vectors[:, term_idxs]
         else:
             # error(f"Undefined bag thresholding type: {self.threshold_type}")
             pass
         return vectors
 
-    def __init__(self, weighting="counts", vocabulary=None, ngram_range=None, tokenizer_func=None, analyzer="word", max_terms=None):
+    def __init__(self, weighting="counts", vocabulary=None, ngram_range=None, tokenizer_func=None, analyzer="word", max_terms=None, sparse=False, vocabulary_analyzer=None):
         if weighting not in "bag tfidf".split():
             error(f"Undefined weighting {weighting}")
         self.weighting = weighting
+        self.sparse = sparse
         self.vocabulary = vocabulary
         self.tokenizer = tokenizer_func
         self.analyzer = analyzer
+        # optional function to analyze a whole token vocabulary at once
+        self.vocabulary_analyzer = vocabulary_analyzer
         analyzer_arg = self.analyzer
         # analyzer_arg = self.analyzer_wrapper if callable(analyzer) else analyzer
         if ngram_range is None:
@@ -64,9 +69,86 @@ class Bag:
                                      analyzer=analyzer_arg, min_df=1, max_df=0.9, max_features=max_terms)
 
     def get_vocabulary(self):
-        return self.model.get_feature_names()
+        return list(self.model.get_feature_names_out())
+
+    def can_map_spans(self, text_collection):
+        """Check whether the collection can be mapped directly from its interned token ids"""
+        if type(text_collection) is not TokenSpans or self.tokenizer is not None:
+            return False
+        # callable analyzers map word lists token-wise
+        return callable(self.analyzer) or (self.analyzer == "word" and tuple(self.ngram_range) == (1, 1))
+
+    def analyze_span_vocabulary(self, spans):
+        """Run the analyzer once per distinct token, rather than once per token occurrence"""
+        if self.vocabulary_analyzer is not None:
+            return self.vocabulary_analyzer(spans.vocabulary)
+        if callable(self.analyzer):
+            return [self.analyzer([w]) for w in spans.vocabulary]
+        analyzer = CountVectorizer.build_analyzer(self.model)
+        return [analyzer(w) for w in spans.vocabulary]
+
+    def get_term_index(self):
+        if self.vocabulary is not None and not hasattr(self.model, "vocabulary_"):
+            if type(self.vocabulary) is dict:
+                return self.vocabulary
+            return {t: i for (i, t) in enumerate(self.vocabulary)}
+        return self.model.vocabulary_
+
+    def count_spans(self, spans, analyzed, term_index):
+        """Count terms per span via a sparse document-token x token-term product"""
+        # map interned token ids to term columns; a token can analyze to multiple terms
+        rows, cols = [], []
+        for tid, terms in enumerate(analyzed):
+            for term in terms:
+                if term in term_index:
+                    rows.append(tid)
+                    cols.append(term_index[term])
+        token_to_term = csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(analyzed), len(term_index)))
+        instance_idx, token_ids = spans.get_flat_token_ids()
+        doc_tokens = csr_matrix((np.ones(len(token_ids), dtype=np.int32), (instance_idx, token_ids)), shape=(len(spans), len(analyzed)))
+        return (doc_tokens @ token_to_term).tocsr()
+
+    def fit_spans(self, spans):
+        """Fit the model vocabulary on pre-tokenized spans, applying the document frequency and size limits of the vectorizer"""
+        if self.vocabulary is not None:
+            self.model.vocabulary_ = self.get_term_index()
+            return
+        analyzed = self.analyze_span_vocabulary(spans)
+        term_index = {}
+        for terms in analyzed:
+            for term in terms:
+                term_index.setdefault(term, len(term_index))
+        counts = self.count_spans(spans, analyzed, term_index)
+        counts.sum_duplicates()
+        doc_freqs = np.bincount(counts.indices, minlength=len(term_index))
+        term_freqs = np.asarray(counts.sum(axis=0)).ravel()
+
+        num_docs = len(spans)
+        min_df, max_df = self.model.min_df, self.model.max_df
+        min_doc_count = min_df if isinstance(min_df, Integral) else min_df * num_docs
+        max_doc_count = max_df if isinstance(max_df, Integral) else max_df * num_docs
+        # vocabulary in term order, as the vectorizer sorts it
+        terms = list(term_index)
+        kept = [term_index[t] for t in sorted(terms[i] for i in np.where((doc_freqs >= min_doc_count) & (doc_freqs <= max_doc_count))[0])]
+        kept = np.asarray(kept, dtype=np.int64)
+        max_features = self.model.max_features
+        if max_features is not None and len(kept) > max_features:
+            top = (-term_freqs[kept]).argsort(kind="mergesort")[:max_features]
+            kept = kept[np.sort(top)]
+        error("No terms remain after document frequency limits", len(kept) == 0)
+        self.model.vocabulary_ = {terms[i]: col for (col, i) in enumerate(kept)}
+
+    def transform_spans(self, spans):
+        """Map spans to term counts via sparse products, without materializing document strings"""
+        return self.count_spans(spans, self.analyze_span_vocabulary(spans), self.get_term_index())
 
     def map_collection(self, text_collection, fit=False, transform=False):
+        if self.can_map_spans(text_collection):
+            return self.map_spans(text_collection, fit, transform)
+        if type(text_collection) is TokenSpans:
+            text_collection = text_collection.get_word_lists()
+            if not callable(self.analyzer):
+                text_collection = [" ".join(words) for words in text_collection]
 
         if fit:
             with tqdm.tqdm(total=len(text_collection), desc="Fitting bag model", ascii=True) as pbar:
@@ -75,12 +157,29 @@ class Bag:
         if transform:
             with tqdm.tqdm(total=len(text_collection), desc="Applying bag model", ascii=True) as pbar:
                 self.model.pbar = pbar
-                vectors = self.model.transform(text_collection).toarray()
-            vectors = self.apply_thresholds(vectors)
-            if len(vectors) == 0:
-                vectors = np.zeros((0, len(self.vocabulary)), dtype=np.int32)
-            else:
-                if self.weighting == "tfidf" and len(vectors) > 0:
-                    tft = TfidfTransformer()
-                    vectors = tft.fit_transform(vectors).toarray()
-            return vectors
+                vectors = self.model.transform(text_collection)
+            return self.postprocess_vectors(vectors)
+
+    def map_spans(self, spans, fit=False, transform=False):
+        """Map a columnar token span collection"""
+        if fit:
+            with tictoc("Fitting bag model on token spans"):
+                self.fit_spans(spans)
+        if transform:
+            with tictoc("Applying bag model on token spans"):
+                vectors = self.transform_spans(spans)
+            return self.postprocess_vectors(vectors)
+
+    def postprocess_vectors(self, vectors):
+        """Apply thresholding and weighting on count vectors"""
+        vectors = self.apply_thresholds(vectors)
+        if vectors.shape[0] == 0:
+            vectors = np.zeros((0, len(self.vocabulary)), dtype=np.int32)
+        else:
+            if self.weighting == "tfidf":
+                tft = TfidfTransformer()
+                vectors = tft.fit_transform(vectors)
+        # count matrices are sparse; densify unless sparse outputs are requested
+        if issparse(vectors) and not self.sparse:
+            vectors = vectors.toarray()
+        return vectors
@@ -3,6 +3,7 @@ from os.path import basename
 from collections import Counter
 
 import numpy as np
+from scipy import sparse
 
 import defs
 from defs import is_none
@@ -169,7 +170,7 @@ class BagRepresentation(Representation):
             bagger = Bag(vocabulary=self.term_list, weighting=self.base_name, ngram_range=self.ngram_range)
 
         train_idx = self.indices.get_train_instances()
-        texts = Text.get_strings(self.text.data.get_slice(train_idx))
+        texts = self.get_bag_input(train_idx)
         bagger.map_collection(texts, fit=True, transform=False)
         self.term_list = bagger.get_vocabulary()
 
@@ -178,6 +179,12 @@ class BagRepresentation(Representation):
 
 
 
+    def get_bag_input(self, idx):
+        """Get the bag input for the specified instances; compact texts are mapped via their token ids"""
+        if self.text.data.is_compact():
+            return self.text.data.get_slice(idx)
+        return Text.get_strings(self.text.data.get_slice(idx))
+
     def produce_outputs(self):
         """Map text to bag representations"""
         # if self.loaded_aggregated:
@@ -190,14 +197,17 @@ class BagRepresentation(Representation):
         #     debug("Skippping {} mapping due to preloading".format(self.base_name))
         #     return
 
-        bagger = Bag(vocabulary=self.term_list, weighting=self.base_name, ngram_range=self.ngram_range)
+        bagger = Bag(vocabulary=self.term_list, weighting=self.base_name, ngram_range=self.ngram_range, sparse=self.config.sparse)
 
-        self.embeddings = np.ndarray((0, len(self.term_list)), dtype=np.int32)
+        vectors = []
         for idx in self.indices.get_train_test():
-            texts = Text.get_strings(self.text.data.get_slice(idx))
-            vecs = bagger.map_collection(texts, fit=False, transform=True)
-            self.embeddings = np.append(self.embeddings, vecs, axis=0)
+            texts = self.get_bag_input(idx)
+            vectors.append(bagger.map_collection(texts, fit=False, transform=True))
             del texts
+        if self.config.sparse:
+            self.embeddings = sparse.vstack(vectors, format="csr") if vectors else sparse.csr_matrix((0, len(self.term_list)), dtype=np.int32)
+        else:
+            self.embeddings = np.concatenate(vectors) if vectors else np.ndarray((0, len(self.term_list)), dtype=np.int32)
 
         # texts = Text.get_strings(self.text.data.get_slice(test_idx))
         # vec_test = bagger.map_collection(texts, fit=do_fit)
@@ -213,3 +223,7 @@ class BagRepresentation(Representation):
 
 class TFIDFRepresentation(BagRepresentation):
     name = "tfidf"
+
+    def outputs_depend_on_batch(self):
+        # idf weights are fitted on each mapped collection
+        return True
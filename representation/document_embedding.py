@@ -1,87 +1,141 @@
+from multiprocessing import get_context
+from os import makedirs
+from os.path import dirname, exists, join
+
 import numpy as np
+import pandas as pd
 from gensim.models import Doc2Vec
 from gensim.models.doc2vec import TaggedDocument
 
 import defs
 import tqdm
+from bundle.datatypes import Text
+from bundle.datausages import Labels
 from representation.embedding import Embedding
 from representation.representation import Representation
-from utils import error, info, tictoc, write_pickled
+from utils import info, tictoc
+
+# model used by inference worker processes
+pool_model = None
+
+
+def infer_chunk(chunk):
+    start, word_lists = chunk
+    return start, np.asarray([pool_model.infer_vector(words) for words in word_lists], dtype=np.float32)
 
 
 class DocumentEmbedding(Embedding):
     """Document embedding class based on the doc2vec algorithm implemented by GenSim"""
     name = "doc2vec"
+    model = None
 
     def __init__(self, config):
         self.config = config
         self.name = self.base_name = self.config.name
         Embedding.__init__(self)
 
-    def set_resources(self):
-        if self.loaded():
-            return
-        # load existing word-level embeddings -- only when computing from scratch
-        csv_mapping_name = "{}/{}.wordembeddings.csv".format(self.raw_data_dir, self.base_name)
-        self.resource_paths.append(csv_mapping_name)
-        self.resource_read_functions.append(self.read_raw_embedding_mapping)
-        self.resource_handler_functions.append(lambda x: x)
-# nothing to load, can be computed on the fly
     def fetch_raw(self, path):
         pass
 
+    def get_word_vectors_path(self):
+        """Path to optional pretrained word vectors to seed the model with"""
+        return join(self.config.folders.raw_data, self.dir_name, self.base_name + ".wordembeddings.csv")
+
+    def seed_word_vectors(self, model):
+        """Overwrite model word vectors with pretrained ones, in a single assignment"""
+        path = self.get_word_vectors_path()
+        if not exists(path):
+            return
+        word_vectors = pd.read_csv(path, sep=self.config.misc.csv_separator, header=None, index_col=0)
+        common = word_vectors.index.intersection(pd.Index(model.wv.index_to_key))
+        info(f"Seeding {len(common)} / {len(model.wv.index_to_key)} {self.name} word vectors from {path}")
+        rows = np.asarray([model.wv.key_to_index[w] for w in common], dtype=np.int64)
+        model.wv.vectors[rows] = word_vectors.loc[common].to_numpy(dtype=np.float32)
+
+    @staticmethod
+    def get_word_lists(data):
+        # stemmed / lemmatized words are (word, pos) tuples
+        return [[w[0] if type(w) is tuple else w for w in words] for words in Text.get_words(data)]
+
     def fit_doc2vec(self, train_word_lists, multi_labels):
         # learn document vectors from the training dataset
         if multi_labels is not None:
-            tagged_docs = [TaggedDocument(doc, lbl) for doc, lbl in zip(train_word_lists, multi_labels)]
+            tagged_docs = [TaggedDocument(doc, [int(x) for x in np.atleast_1d(lbl)]) for doc, lbl in zip(train_word_lists, multi_labels)]
         else:
             tagged_docs = [TaggedDocument(doc, [i]) for i, doc in enumerate(train_word_lists)]
 
-        model = Doc2Vec(tagged_docs, vector_size=self.dimension, min_count=0, window=5, dm=1, workers=16)
-        # update_term_frequency word vectors with loaded elements
-        info("Updating word embeddings with loaded vectors")
-        words = [w for w in self.embeddings.index.to_list() if w in model.wv.vocab.keys()]
-        for word in words:
-            word_index = model.wv.index2entity.index(word)
-            model.wv.syn0[word_index] = self.embeddings.loc[word]
-        # model.wv.add(words, self.embeddings.loc[words], replace=True)
-        model.train(tagged_docs, epochs=5, total_examples=len(tagged_docs))
-        model.delete_temporary_training_data(keep_doctags_vectors=True, keep_inference=True)
-        del self.embeddings
-
-        import pickle
-        with open("doc2vecmodel.pkl", "wb") as f:
-            pickle.dump(model, f)
-
-
-        # write the traine document embedding
-        self.save_model()
+        model = Doc2Vec(vector_size=self.dimension, min_count=0, window=5, dm=1, workers=self.config.workers, seed=self.config.misc.seed)
+        model.build_vocab(tagged_docs)
+        # update word vectors with loaded elements prior to training
+        self.seed_word_vectors(model)
+        with tictoc(f"Training {self.name} on {len(tagged_docs)} documents with {self.config.workers} workers"):
+            model.train(tagged_docs, epochs=model.epochs, total_examples=len(tagged_docs))
         self.model = model
 
+    def build_model_from_inputs(self):
+        self.check_model_building_resources()
+        train_idx = self.indices.get_train_instances()
+        labels = self.labels.data.get_slice(train_idx) if self.labels is not None else None
+        self.fit_doc2vec(self.get_word_lists(self.text.data.get_slice(train_idx)), labels)
+
+    def infer_vectors(self, word_lists, output):
+        """Infer document vectors into the preallocated output, in chunks across worker processes"""
+        chunks = [(i, word_lists[i: i + self.config.batch_size]) for i in range(0, len(word_lists), self.config.batch_size)]
+        global pool_model
+        pool_model = self.model
+        try:
+            with tqdm.tqdm(total=len(word_lists), desc=f"Inferring {self.name} vectors", ascii=True) as pbar:
+                if self.config.workers > 1:
+                    # forked workers inherit the model, rather than receiving it pickled
+                    with get_context("fork").Pool(self.config.workers) as pool:
+                        for start, vectors in pool.imap_unordered(infer_chunk, chunks):
+                            output[start: start + len(vectors)] = vectors
+                            pbar.update(len(vectors))
+                else:
+                    for start, vectors in map(infer_chunk, chunks):
+                        output[start: start + len(vectors)] = vectors
+                        pbar.update(len(vectors))
+        finally:
+            # do not keep the model referenced after inference
+            pool_model = None
+
     def produce_outputs(self):
-        if self.loaded_preprocessed or self.loaded_aggregated:
-            return
         info("Mapping to {} embeddings.".format(self.name))
-        train_words = [wp[0] for doc in self.text_train for wp in doc]
-        self.fit_doc2vec(train_words, self.labels_train)
-        d2v = self.get_model()
-        self.embeddings = np.ndarray((0, self.dimension), np.float32)
-
+        role_idxs = self.indices.get_train_test()
+        self.embeddings = np.empty((sum(len(idx) for idx in role_idxs), self.dimension), np.float32)
+        offset = 0
         # loop over input text bundles (e.g. train & test)
-        for dset_idx in range(len(self.text)):
-            dset_word_list = self.text[dset_idx]
-            with tictoc("Embedding mapping for text bundle {}/{}".format(dset_idx + 1, len(self.text))):
-                info("Mapping text bundle {}/{}: {} texts".format(dset_idx + 1, len(self.text), len(self.text[dset_idx])))
-                num_docs = len(dset_word_list)
-                starting_instance_idx = dset_idx * len(self.embeddings)
-                for doc_word_pos in tqdm.tqdm(dset_word_list):
-                    doc_words = [wp[0] for wp in doc_word_pos]
-                    # debug("Inferring word list:{}".format(doc_words))
-                    vec = np.expand_dims(d2v.infer_vector(doc_words), axis=0)
-                    self.embeddings = np.append(self.embeddings, vec, axis=0)
+        for idx in role_idxs:
+            word_lists = self.get_word_lists(self.text.data.get_slice(idx))
+            with tictoc("Embedding mapping for {} texts".format(len(word_lists))):
+                self.infer_vectors(word_lists, self.embeddings[offset: offset + len(word_lists)])
+            offset += len(word_lists)
 
         self.set_constant_elements_per_instance()
 
+    def get_model(self):
+        return self.model
+
+    def save_model(self, path=None, model=None):
+        """Save via gensim, storing arrays as separate mmap-able files"""
+        path = self.get_model_path() if path is None else path
+        model = self.get_model() if model is None else model
+        if path is None or model is None:
+            return
+        makedirs(dirname(path), exist_ok=True)
+        model.save(path, sep_limit=0)
+
+    def load_model(self):
+        path = self.get_model_path()
+        if not exists(path):
+            return False
+        self.model = Doc2Vec.load(path, mmap="r")
+        return True
+
+    def load_model_from_disk(self):
+        self.model_loaded = self.load_model()
+        return self.model_loaded
+
     def set_params(self):
         Embedding.set_params(self)
         # define compatible aggregations
@@ -89,18 +143,8 @@ class DocumentEmbedding(Embedding):
         self.compatible_sequence_lengths = [defs.sequence_length.unit]
 
     def get_component_inputs(self):
-        Representation.process_component_inputs(self)
-        if self.loaded_aggregated or self.loaded_preprocessed:
-            return
-        error("{} needs label information.".format(self.component_name), not self.inputs.has_labels())
-
-        # resources for training the d2v
-        self.labels_train = self.inputs.get_labels(role=defs.roles.train, enforce_single=True)
-        self.text_train = self.inputs.get_text(role=defs.roles.train, enforce_single=True)
-
-        self.labels = self.inputs.get_labels().instances
-        self.text = self.inputs.get_text().instances
-
-        train_idx = self.inputs.get_indices(role=defs.roles.train, enforce_single=True)
-        test_idx = self.inputs.get_indices(role=defs.roles.test, enforce_single=True)
-        self.vector_indices = [train_idx, test_idx]
+        Representation.get_component_inputs(self)
+        # labels are used as document tags, if available
+        self.labels = None
+        if self.data_pool.has_labels():
+            self.labels = self.data_pool.request_data(None, Labels, self.name, "subset")
@@ -2,11 +2,11 @@ import numpy as np
 import pandas as pd
 from pandas.errors import ParserError
 
-from os.path import join, isabs
+from os.path import basename, exists, getmtime, join, isabs
 import defs
 from representation.representation import Representation
-from utils import (debug, error, get_shape, info, realign_embedding_index,
-                   shapes_list, warning)
+from utils import (debug, error, get_shape, info, read_model_artifact, realign_embedding_index,
+                   shapes_list, warning, write_model_artifact)
 
 
 class Embedding(Representation):
@@ -50,6 +50,10 @@ class Embedding(Representation):
     def build_model_from_inputs(self):
         self.read_raw_embedding_mapping(self.get_embeddings_path())
 
+    def get_embeddings_artifact_path(self, path):
+        """Path to the parsed embedding mapping, stored with memory-mappable vectors"""
+        return join(self.serialization_dir, basename(path) + ".artifact")
+
     def read_raw_embedding_mapping(self, path):
         # check if there's a vocabulary file and map token to its position in the embedding list
         try:
@@ -66,10 +70,16 @@ class Embedding(Representation):
 
         # word - vector correspondence
         if not self.data_pool.has_resource(path):
+            artifact_path = self.get_embeddings_artifact_path(path)
             try:
-                info(f"Reading embedding mapping file {path}...")
-                self.embeddings_source = pd.read_csv(path, sep=self.config.misc.csv_separator, header=None, index_col=0)
-                info(f"Read embedding mapping file of shape {self.embeddings_source.shape} using csv [separator]: [{self.config.misc.csv_separator}]")
+                if exists(artifact_path) and exists(path) and getmtime(artifact_path) >= getmtime(path):
+                    # memory-mapped copy of a previously parsed csv
+                    self.embeddings_source = read_model_artifact(artifact_path, msg="embedding mapping")
+                else:
+                    info(f"Reading embedding mapping file {path}...")
+                    self.embeddings_source = pd.read_csv(path, sep=self.config.misc.csv_separator, header=None, index_col=0)
+                    info(f"Read embedding mapping file of shape {self.embeddings_source.shape} using csv [separator]: [{self.config.misc.csv_separator}]")
+                    write_model_artifact(artifact_path, self.embeddings_source, msg="embedding mapping")
                 self.data_pool.add_resource(path, self.embeddings_source)
                 info(f"Storing resource")
             except ParserError as pe:
@@ -1,27 +1,23 @@
-from representation.bag_representation import BagRepresentation, TFIDFRepresentation
-from representation.document_embedding import DocumentEmbedding
-from representation.existing_vectors import ExistingVectors
-# from representation.ngg import NGG
-from representation.word_embedding import WordEmbedding
+from utils import import_object
 
 
 class Instantiator:
     component_name = "representation"
+    # representation name to class path, imported on first use
+    candidates = {
+        "bag": "representation.bag_representation:BagRepresentation",
+        "tfidf": "representation.bag_representation:TFIDFRepresentation",
+        "doc2vec": "representation.document_embedding:DocumentEmbedding",
+        # "ngg": "representation.ngg:NGG",
+        "existing": "representation.existing_vectors:ExistingVectors",
+    }
 
     def create(config):
         name = config.name
-        if name == BagRepresentation.name:
-            return BagRepresentation(config)
-        if name == TFIDFRepresentation.name:
-            return TFIDFRepresentation(config)
-        if name == DocumentEmbedding.name:
-            return DocumentEmbedding(config)
-        # if name == NGG.name:
-        #     return NGG(config)
-        if name == ExistingVectors.name:
-            return ExistingVectors(config)
+        if name in Instantiator.candidates:
+            return import_object(Instantiator.candidates[name])(config)
 
         # any unknown name, if it's an absolute path it's path to word vectors
         # if isabs(name
         # else, is assumed to be an embedding name, i.e. pretrained word embeddings
-        return WordEmbedding(config)
+        return import_object("representation.word_embedding:WordEmbedding")(config)
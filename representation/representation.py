@@ -4,6 +4,7 @@ import defs
 from bundle.datatypes import *
 from bundle.datausages import *
 from component.component import Component
+from representation import instantiator
 from serializable import Serializable
 from utils import debug, error, info, shapes_list, set_constant_epi
 
@@ -22,7 +23,8 @@ class Representation(Serializable):
 
     @staticmethod
     def get_available():
-        return [cls.name for cls in Representation.__subclasses__()]
+        # registered names; representation modules are imported on first use
+        return list(instantiator.Instantiator.candidates)
 
     def __init__(self):
         """Constructor"""
@@ -1,6 +1,4 @@
 """Perform sampling modifications"""
-from imblearn.over_sampling import RandomOverSampler
-from imblearn.under_sampling import RandomUnderSampler
 from collections import Counter
 from component.component import Component
 from utils import error, info
@@ -164,8 +162,10 @@ class Sampler(Component):
         if type(data) != np.ndarray:
             data = np.asarray(data)
         if op == "oversample":
+            from imblearn.over_sampling import RandomOverSampler
             sampler = RandomOverSampler(sampling_strategy=label_desired_nums_dict)
         elif op == "undersample":
+            from imblearn.under_sampling import RandomUnderSampler
             sampler = RandomUnderSampler(sampling_strategy=label_desired_nums_dict)
         else:
             error(f"Undefined resampling operation {op}")
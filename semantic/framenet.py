@@ -5,7 +5,9 @@ import nltk
 import defs
 from semantic.semantic_resource import SemanticResource
 from nltk.corpus import framenet as fn
-from utils import nltk_download
+from utils import apply_nltk_data_path, nltk_download
+
+apply_nltk_data_path()
 
 
 class Framenet(SemanticResource):
@@ -35,8 +37,12 @@ class Framenet(SemanticResource):
             nltk_download(self.config, "framenet_v17")
         self.initialized = True
 
-    def lookup(self, word):
-        frames = fn.frames_by_lemma(word)
+    def lookup(self, word_information):
+        if type(word_information) is tuple:
+            # in framenet, pos-disambiguation is done via the lookup
+            frames = self.lookup_with_POS(word_information)
+            return [f['name'] for f in frames] if frames else []
+        frames = fn.frames_by_lemma(word_information)
         return [f['name'] for f in frames]
 
     def lookup_(self, candidate):
@@ -67,6 +73,12 @@ class Framenet(SemanticResource):
             return None
         return self.disambiguate(frames, candidate, override=defs.disam.first)
 
+    def get_concept_relations(self):
+        """Frame - parent frame inheritance relations"""
+        for frame in fn.frames():
+            for rel in self.get_related_frames(frame):
+                yield frame.name, rel.name
+
     def get_related_frames(self, frame):
         # get just parents
         return [fr.Parent for fr in frame.frameRelations if fr.type.name == "Inheritance" and fr.Child == frame]
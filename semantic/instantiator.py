@@ -1,27 +1,20 @@
-from semantic.babelnet import BabelNet
-# from semantic.context_embedding import ContextEmbedding
-from semantic.dbpedia import DBPedia
-from semantic.framenet import Framenet
-from semantic.google_knowledge_graph import GoogleKnowledgeGraph
-from semantic.wordnet import Wordnet
-from utils import error
+from utils import error, import_object
 
 
 class Instantiator:
     component_name = "semantic"
+    # semantic resource name to class path, imported on first use
+    candidates = {
+        "wordnet": "semantic.wordnet:Wordnet",
+        "googlekt": "semantic.google_knowledge_graph:GoogleKnowledgeGraph",
+        # "context": "semantic.context_embedding:ContextEmbedding",
+        "framenet": "semantic.framenet:Framenet",
+        "babelnet": "semantic.babelnet:BabelNet",
+        "dbpedia": "semantic.dbpedia:DBPedia",
+    }
 
     def create(config):
         name = config.name
-        if name == Wordnet.name:
-            return Wordnet(config)
-        if name == GoogleKnowledgeGraph.name:
-            return GoogleKnowledgeGraph(config)
-        # if name == ContextEmbedding.name:
-        #     return ContextEmbedding(config)
-        if name == Framenet.name:
-            return Framenet(config)
-        if name == BabelNet.name:
-            return BabelNet(config)
-        if name == DBPedia.name:
-            return DBPedia(config)
+        if name in Instantiator.candidates:
+            return import_object(Instantiator.candidates[name])(config)
         error("Undefined semantic resource: {}".format(name))
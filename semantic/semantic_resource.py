@@ -1,18 +1,28 @@
+from multiprocessing import get_context
 from os import makedirs
 from os.path import dirname, exists, join
 
 import defs
 import numpy as np
+from scipy import sparse
 from bundle.bundle import DataPool
 from bundle.datatypes import *
 from bundle.datausages import *
 from component.component import Component
 from defs import is_none
 from representation.bag import Bag
+from semantic import instantiator
 from serializable import Serializable
 from utils import (debug, error, info, read_pickled, shapes_list, tictoc,
                    warning, write_pickled)
 
+# resource used by vocabulary resolution worker processes
+pool_resource = None
+
+
+def resolve_in_pool(word_information):
+    return pool_resource.analyze_word(word_information)
+
 
 class SemanticResource(Serializable):
     dir_name = "semantic"
@@ -22,8 +32,15 @@ class SemanticResource(Serializable):
     do_spread_activation = False
     loaded_vectorized = False
 
-    lookup_cache = {}
-    hypernym_cache = {}
+    # word -> concepts resolution cache, per resource instance
+    lookup_cache = None
+    # concepts of the last resolved vocabulary
+    resolved_vocabulary = None
+    resolved_concepts = None
+    # concept -> parent concept adjacency for spreading activation
+    concept_graph = None
+    graph_concepts = None
+    graph_concept_index = None
     word_concept_embedding_cache = {}
 
     concept_context_word_threshold = None
@@ -49,7 +66,8 @@ class SemanticResource(Serializable):
 
     @staticmethod
     def get_available():
-        return [cls.name for cls in SemanticResource.__subclasses__()]
+        # registered names; resource modules are imported on first use
+        return list(instantiator.Instantiator.candidates)
 
     # def set_additional_serialization_sources(self):
     #     self.serialization_path_vectorized = self.serialization_path_preprocessed + ".vectorized"
@@ -81,6 +99,7 @@ class SemanticResource(Serializable):
     def __init__(self):
         self.base_name = self.name
         self.initialized = False
+        self.lookup_cache = {}
         Serializable.__init__(self, self.dir_name)
 
     def populate(self):
@@ -133,51 +152,6 @@ class SemanticResource(Serializable):
             self.semantic_epi = [np.ones((len(ind),), np.int32) for ind in self.semantic_vector_indices]
             write_pickled(self.serialization_path_vectorized, self.get_all_vectorized())
 
-    # function to get a concept from a word, using the wordnet api
-    # and a local word cache. Updates concept frequencies as well.
-    def get_concept(self, word_information):
-        if self.do_cache and word_information in self.lookup_cache:
-            activations = self.lookup_cache[word_information]
-        else:
-            activations = self.lookup(word_information)
-        if not activations:
-            return {}
-        if self.do_spread_activation:
-            for concept in list(activations.keys()):
-                hypers = self.run_spreading_activation(concept)
-                for h in hypers:
-                    activations[h] = hypers[h]
-        if self.do_cache and word_information not in self.lookup_cache:
-            # populate cache
-            self.lookup_cache[word_information] = activations
-
-        return activations
-
-    def run_spreading_activation(self, concept):
-        ret = {}
-        # current weight value
-        current_concepts = [concept]
-        decay = 1
-        for _ in range(self.spread_steps):
-            decay *= self.spread_decay_factor
-            new_concepts = []
-            while current_concepts:
-                concept = current_concepts.pop()
-                if self.do_cache and concept in self.hypernym_cache:
-                    hypers = self.hypernym_cache[concept]
-                else:
-                    hypers = self.spread_activation(concept)
-                    if self.do_cache and concept not in self.hypernym_cache:
-                        self.hypernym_cache[concept] = hypers
-                if not hypers:
-                    continue
-                for h in hypers:
-                    ret[h] = decay
-                new_concepts.extend(hypers)
-            current_concepts = new_concepts
-
-        return ret
-
     # vectorized data handler
     def handle_vectorized(self, data):
         self.semantic_document_vectors, self.semantic_vector_indices, self.semantic_epi = \
@@ -254,8 +228,83 @@ class SemanticResource(Serializable):
     def get_cache_path(self):
         return join(self.config.folders.raw_data, self.dir_name, self.base_name + ".cache.pkl")
 
-    def get_hypernym_cache_path(self):
-        return join(self.config.folders.raw_data, self.dir_name, self.base_name + ".hypernym.cache.pkl")
+    def get_graph_path(self):
+        return join(self.config.folders.raw_data, self.dir_name, self.base_name + ".graph.pkl")
+
+    def get_concept_relations(self):
+        """Generate (concept, parent concept) pairs of the relation to spread activation over"""
+        error("Attempted to get concept relations for semantic resource {}.".format(self.name))
+
+    def build_concept_graph(self):
+        """Build a compact CSR adjacency of the concept relation, with integer concept ids"""
+        concept_index = {}
+        rows, cols = [], []
+        for concept, parent in self.get_concept_relations():
+            rows.append(concept_index.setdefault(concept, len(concept_index)))
+            cols.append(concept_index.setdefault(parent, len(concept_index)))
+        num_concepts = len(concept_index)
+        adjacency = sparse.csr_matrix((np.ones(len(rows), np.int8), (rows, cols)), shape=(num_concepts, num_concepts))
+        adjacency.sum_duplicates()
+        return {"concepts": list(concept_index), "indptr": adjacency.indptr, "indices": adjacency.indices}
+
+    def load_concept_graph(self):
+        """Read the concept graph artifact, building it from the resource if it does not exist"""
+        if self.concept_graph is not None:
+            return
+        graph_path = self.get_graph_path()
+        if exists(graph_path):
+            graph = read_pickled(graph_path)
+        else:
+            self.initialize_lookup()
+            with tictoc(f"Building the {self.base_name} concept graph"):
+                graph = self.build_concept_graph()
+            makedirs(dirname(graph_path), exist_ok=True)
+            write_pickled(graph_path, graph)
+        self.graph_concepts = graph["concepts"]
+        self.graph_concept_index = {c: i for (i, c) in enumerate(self.graph_concepts)}
+        num_concepts = len(self.graph_concepts)
+        self.concept_graph = sparse.csr_matrix((np.ones(len(graph["indices"]), np.float32), graph["indices"], graph["indptr"]), shape=(num_concepts, num_concepts))
+        info(f"Loaded a {self.base_name} concept graph of {num_concepts} concepts and {self.concept_graph.nnz} relations.")
+
+    def get_graph_selector(self):
+        """Sparse mapping of graph concept ids to vocabulary columns"""
+        graph_idx = np.asarray([self.graph_concept_index.get(c, -1) for c in self.vocabulary], dtype=np.int64)
+        in_graph = np.where(graph_idx >= 0)[0]
+        return sparse.csr_matrix((np.ones(len(in_graph), np.float32), (graph_idx[in_graph], in_graph)),
+                                 shape=(len(self.graph_concepts), len(self.vocabulary)))
+
+    def add_spread_concepts(self):
+        """Extend the vocabulary with the concepts reachable within the spreading steps"""
+        self.load_concept_graph()
+        reached = np.zeros(len(self.graph_concepts), dtype=bool)
+        frontier = sparse.csr_matrix(self.get_graph_selector().sum(axis=1).T)
+        for _ in range(self.spread_steps):
+            frontier = frontier @ self.concept_graph
+            reached[frontier.indices] = True
+        current = set(self.vocabulary)
+        added = sorted(c for c in (self.graph_concepts[i] for i in np.where(reached)[0]) if c not in current)
+        info(f"Added {len(added)} concepts reachable in {self.spread_steps} spreading activation steps.")
+        self.vocabulary = list(self.vocabulary) + added
+
+    def get_spreading_matrix(self):
+        """Decayed k-step propagation over the vocabulary: sum of decay^k * A^k"""
+        self.load_concept_graph()
+        selector = self.get_graph_selector()
+        adjacency = (selector.T @ self.concept_graph @ selector).tocsr()
+        res = sparse.csr_matrix(adjacency.shape, dtype=np.float32)
+        power = sparse.identity(adjacency.shape[0], dtype=np.float32, format="csr")
+        for step in range(1, self.spread_steps + 1):
+            power = power @ adjacency
+            res = res + (self.spread_decay_factor ** step) * power
+        return res
+
+    def apply_spreading_activation(self, vectors):
+        """Add spread activations to concept bags with a single sparse product"""
+        with tictoc(f"Spreading activation over {self.spread_steps} steps"):
+            spread = sparse.csr_matrix(vectors) @ self.get_spreading_matrix()
+            if sparse.issparse(vectors):
+                return (vectors + spread).tocsr()
+            return vectors + spread.toarray()
 
     # read existing resource-wise serialized semantic cache from previous runs to speedup resolving
     def load_semantic_cache(self):
@@ -269,11 +318,6 @@ class SemanticResource(Serializable):
         if exists(cache_path):
             self.lookup_cache = read_pickled(cache_path)
             info("Read a {}-long semantic cache from {}.".format(len(self.lookup_cache), cache_path))
-        # spreading activation cache
-        hypernym_cache_path = self.get_cache_path()
-        if exists(hypernym_cache_path):
-            self.hypernym_cache = read_pickled(hypernym_cache_path)
-            info("Read a {}-long hypernym semantic cache from {}.".format(len(self.hypernym_cache), hypernym_cache_path))
 
     # write the semantic cache after resolution of the current dataset
     def write_semantic_cache(self):
@@ -294,10 +338,12 @@ class SemanticResource(Serializable):
         self.load_semantic_cache()
 
         train_idx = self.indices.get_train_instances()
-        words = Text.get_words(self.text.data.get_slice(train_idx))
+        words = self.get_bag_input(train_idx)
         info(f"Building {self.name} model")
         bagger.map_collection(words, fit=True, transform=False)
         self.vocabulary = bagger.get_vocabulary()
+        if self.do_spread_activation:
+            self.add_spread_concepts()
         self.model = self.vocabulary
         info(f"Built a semantic bag model with {len(self.vocabulary)} concepts.")
         del bagger
@@ -305,11 +351,59 @@ class SemanticResource(Serializable):
     def save_model(self):
         super().save_model()
 
+    def outputs_depend_on_batch(self):
+        # idf weights are fitted on each mapped collection
+        return self.semantic_weights == defs.weights.tfidf
+
     def get_bagger(self):
         """Retrieve a bag class instance"""
-        bagger = Bag(weighting=self.semantic_weights, vocabulary=self.vocabulary, ngram_range=self.config.ngram_range, analyzer=self.analyze, max_terms=self.config.max_terms)
+        bagger = Bag(weighting=self.semantic_weights, vocabulary=self.vocabulary, ngram_range=self.config.ngram_range, analyzer=self.analyze,
+                     max_terms=self.config.max_terms, vocabulary_analyzer=self.resolve_vocabulary)
         return bagger
 
+    def get_bag_input(self, idx):
+        """Get the instances to map to concepts; compact texts are mapped via their interned vocabulary"""
+        data = self.text.data.get_slice(idx)
+        if not self.text.data.is_compact():
+            return Text.get_words(data)
+        if self.disambiguation == defs.disam.pos and data.pos_ids is not None:
+            # resolve distinct (word, pos) pairs instead
+            return data.get_pos_pairs()
+        return data
+
+    def analyze_word(self, word_information):
+        """Resolve a single word to its concepts"""
+        return self.analyze([word_information])
+
+    def resolve_vocabulary(self, vocabulary):
+        """Resolve each distinct word of a vocabulary to its concepts once
+
+        Returns:
+            The list of concepts for each vocabulary entry
+        """
+        if self.resolved_vocabulary is vocabulary:
+            return self.resolved_concepts
+        # without caching, resolutions are kept for the current vocabulary only
+        cache = self.lookup_cache if self.do_cache else {}
+        missing = list({w for w in vocabulary if w not in cache})
+        if missing:
+            with tictoc(f"Resolving {len(missing)} distinct words to {self.base_name} concepts"):
+                if self.config.workers > 1:
+                    # forked workers inherit the resource, rather than receiving it pickled
+                    global pool_resource
+                    pool_resource = self
+                    try:
+                        with get_context("fork").Pool(self.config.workers) as pool:
+                            concepts = pool.map(resolve_in_pool, missing, chunksize=max(1, len(missing) // (4 * self.config.workers)))
+                    finally:
+                        pool_resource = None
+                else:
+                    concepts = [self.analyze_word(w) for w in missing]
+            cache.update(zip(missing, concepts))
+        self.resolved_vocabulary = vocabulary
+        self.resolved_concepts = [cache[w] for w in vocabulary]
+        return self.resolved_concepts
+
     # function to map words to wordnet concepts
     def produce_outputs(self):
         info(f"Producing {self.name} semantic outputs")
@@ -317,14 +411,18 @@ class SemanticResource(Serializable):
         # read the semantic resource input-concept cache , if it exists
         self.load_semantic_cache()
 
-        self.embeddings = np.ndarray((0, len(self.vocabulary)), dtype=np.int32)
+        # per-role blocks, joined in a single copy
+        blocks = [np.ndarray((0, len(self.vocabulary)), dtype=np.int32)]
         bagger = self.get_bagger()
         for idx in self.indices.get_train_test():
-            texts = Text.get_strings(self.text.data.get_slice(idx))
-            vecs = bagger.map_collection(texts, fit=False, transform=True)
-            self.embeddings = np.append(self.embeddings, vecs, axis=0)
+            texts = self.get_bag_input(idx)
+            blocks.append(bagger.map_collection(texts, fit=False, transform=True))
             del texts
         del bagger
+        self.embeddings = np.concatenate(blocks, axis=0)
+        del blocks
+        if self.do_spread_activation:
+            self.embeddings = self.apply_spreading_activation(self.embeddings)
 
         # store the cache
         self.write_semantic_cache()
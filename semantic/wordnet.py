@@ -3,10 +3,12 @@ from os import listdir
 import nltk
 
 from semantic.semantic_resource import SemanticResource
-from utils import info, nltk_download
+from utils import apply_nltk_data_path, info, nltk_download
 from nltk.corpus import wordnet as wn
 from collections import defaultdict
 
+apply_nltk_data_path()
+
 
 class Wordnet(SemanticResource):
     name = "wordnet"
@@ -70,16 +72,8 @@ class Wordnet(SemanticResource):
         pass
 
     def get_model(self):
-        # save wordnet synset names to avoid wordnet dependency
-        return [s.name() for s in self.vocabulary]
-
-    def load_model(self):
-        """Default model loading function, via pickled object deserializaLoad the model"""
-        if super().load_model():
-            # map vocab to synset objects
-            info("Mapping semantic vocabulary strings to wordnet synset objects")
-            self.vocabulary = [wn.synset(t) for t in self.vocabulary]
-        return self.model_loaded
+        # the vocabulary consists of wordnet synset names
+        return self.vocabulary
 
 
     def analyze(self, inputs):
@@ -89,13 +83,20 @@ class Wordnet(SemanticResource):
             synsets.extend(self.get_word_synsets(word))
         return synsets
 
-    def get_word_synsets(self, word):
-        """Fetch synsets from an input word"""
+    def get_word_synsets(self, word_information):
+        """Fetch synset names from an input word or (word, pos) pair"""
+        word = word_information[0] if type(word_information) is tuple else word_information
         synsets = wn.synsets(word)
         if not synsets:
-            return {}
-        synsets = self.disambiguate(synsets, word)
-        return synsets
+            return []
+        synsets = self.disambiguate(synsets, word_information)
+        return [s.name() for s in synsets]
+
+    def get_concept_relations(self):
+        """Synset - hypernym relations"""
+        for synset in wn.all_synsets():
+            for hyper in synset.hypernyms():
+                yield synset.name(), hyper.name()
 
     def spread_activation(self, synset_name):
         """Retrieve wordnet hypernyms from a given synset"""
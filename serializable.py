@@ -1,4 +1,4 @@
-from utils import error, read_pickled, info, debug, write_pickled
+from utils import error, read_pickled, info, debug, write_pickled, read_model_artifact, write_model_artifact
 from component.component import Component
 from os.path import exists, isfile, join, dirname, isabs, basename
 from os import makedirs
@@ -232,10 +232,10 @@ class Serializable(Component):
         return path
 
     def load_model(self):
-        """Default model loading function, via pickled object deserializaLoad the model"""
+        """Default model loading function, via pickled object deserialization, with large arrays memory-mapped"""
         try:
             # info(f"Loading model for {self.get_full_name()}")
-            self.model = read_pickled(self.get_model_path(), msg=f"{self.get_full_name()} model")
+            self.model = read_model_artifact(self.get_model_path(), msg=f"{self.get_full_name()} model")
             return True
         except FileNotFoundError:
             debug(f"Model file not found: {self.get_model_path()}")
@@ -251,7 +251,7 @@ class Serializable(Component):
             return
         # write intermmediate folders
         makedirs(dirname(path), exist_ok=True)
-        write_pickled(path, model, msg=f"{self.get_full_name()} model" )
+        write_model_artifact(path, model, msg=f"{self.get_full_name()} model")
 
     def save_outputs(self):
         """Save the produced outputs"""
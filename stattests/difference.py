@@ -1,6 +1,8 @@
 """Statistical significance differene tests."""
 from itertools import combinations
 
+import numpy as np
+import pandas as pd
 from scipy.stats import f_oneway
 from statsmodels.stats.multicomp import MultiComparison, pairwise_tukeyhsd
 
@@ -16,10 +18,13 @@ class Anova(Difference):
     """Assumes normality, IID."""
     def run(self, data, groups):
         self.results = []
-        for name1, name2 in combinations(set(groups), 2):
-            # get data per pairwise comp
-            data1, data2 = [[data.iloc[i] for i in range(len(groups)) if groups.iloc[i] == n]
-                            for n in (name1, name2)]
+        data = np.asarray(data, dtype=np.float64)
+        # data array per group, via a single grouping pass; values are compared as is, missing ones dropped
+        codes, names = pd.factorize(np.asarray(groups, dtype=object))
+        data, codes = data[codes >= 0], codes[codes >= 0]
+        order = np.argsort(codes, kind="stable")
+        group_data = np.split(data[order], np.cumsum(np.bincount(codes, minlength=len(names)))[:-1])
+        for (name1, data1), (name2, data2) in combinations(zip(names, group_data), 2):
             stat, p = f_oneway(data1, data2)
             self.results.append((stat, p, (name1, name2)))
 
@@ -0,0 +1,40 @@
+import numpy as np
+from scipy import sparse
+
+from bundle.datatypes import CompositeMatrix, Numeric, get_nan_row_mask
+from bundle.datausages import Indices
+from manip.replication import Replication
+
+
+def test_numeric_slice_of_composite_is_lazy():
+    dense = np.arange(12, dtype=np.float32).reshape(4, 3)
+    num = Numeric(CompositeMatrix([dense, sparse.csr_matrix(dense)], row_index=[0, 0, 1, 2, 3]))
+    part = num.get_slice([4, 1])
+    assert type(part) is CompositeMatrix
+    assert np.array_equal(np.asarray(part), np.hstack([dense[[3, 0]], dense[[3, 0]]]))
+    rest = num.get_all_but_slice([0, 1])
+    assert type(rest) is CompositeMatrix and rest.shape == (3, 6)
+
+
+def test_nan_row_mask():
+    dense = np.ones((4, 2))
+    dense[2, 1] = np.nan
+    assert np.array_equal(get_nan_row_mask(dense), [False, False, True, False])
+    sp = sparse.csr_matrix(np.array([[0, 1], [np.nan, 0], [0, 0]]))
+    assert np.array_equal(get_nan_row_mask(sp), [False, True, False])
+    composite = CompositeMatrix([dense, sparse.csr_matrix(np.ones((4, 1)))], row_index=[2, 0, 2])
+    assert np.array_equal(get_nan_row_mask(composite), [True, False, True])
+    assert not get_nan_row_mask(np.zeros((3, 2), np.int32)).any()
+
+
+def test_replication_of_sparse_input():
+    repl = Replication.__new__(Replication)
+    repl.name, repl.replicate_times = "repl", 3
+    vec = sparse.csr_matrix(np.arange(8, dtype=np.float32).reshape(4, 2))
+    repl.inputs, repl.indices = [vec], [Indices([[0, 2], [1, 3]], ["train", "test"])]
+    repl.produce_outputs()
+    assert repl.outputs.shape == (12, 2)
+    assert np.array_equal(np.asarray(repl.outputs)[[3, 4, 5]], np.repeat(vec.toarray()[[1]], 3, axis=0))
+    # each index expands to the replicated rows of its instances
+    assert np.array_equal(repl.indices.get_tag_instances("train"), [0, 1, 2, 6, 7, 8])
+    assert np.array_equal(repl.indices.get_tag_instances("test"), [3, 4, 5, 9, 10, 11])
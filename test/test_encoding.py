@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+import endpoint.encoding as encoding
+from endpoint.encoding import JSONEncoder, MsgpackEncoder, get_encoder
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(encoding, "encoder_cache", {})
+
+
+def test_default_is_json():
+    for accept in (None, "", "*/*", "text/html", "application/msgpack;q=0"):
+        assert type(get_encoder(accept)) is JSONEncoder
+
+
+def test_quality_and_order():
+    pytest.importorskip("msgpack")
+    assert type(get_encoder("application/json;q=0.5, application/msgpack")) is MsgpackEncoder
+    assert type(get_encoder("application/msgpack;q=0.2, application/json;q=0.9")) is JSONEncoder
+    # ties are resolved in header order
+    assert type(get_encoder("application/x-msgpack, application/json")) is MsgpackEncoder
+    assert type(get_encoder("application/json, application/msgpack")) is JSONEncoder
+    assert type(get_encoder("application/msgpack;q=bad, application/json;q=0.1")) is JSONEncoder
+
+
+def test_fallback_on_missing_dependency(monkeypatch):
+    class Unavailable:
+        def __init__(self):
+            raise ImportError()
+    monkeypatch.setitem(encoding.encoders, "application/msgpack", Unavailable)
+    assert type(get_encoder("application/msgpack")) is JSONEncoder
+    assert encoding.encoder_cache["application/msgpack"] is None
+
+
+def test_encoders_are_reused():
+    assert get_encoder() is get_encoder("application/json")
+
+
+def test_json_encoding():
+    outputs = {"scores": np.arange(4, dtype=np.float32).reshape(2, 2), "sparse": sparse.csr_matrix(np.eye(2)), "n": np.int64(3)}
+    decoded = json.loads(get_encoder().encode(outputs))
+    assert decoded == {"scores": [[0, 1], [2, 3]], "sparse": [[1, 0], [0, 1]], "n": 3}
+
+
+def test_msgpack_typed_arrays():
+    msgpack = pytest.importorskip("msgpack")
+    encoder = get_encoder("application/msgpack")
+    assert encoder.keep_arrays
+    scores = np.arange(6, dtype=np.float32).reshape(2, 3)
+    decoded = msgpack.unpackb(encoder.encode({"scores": scores[:, ::2], "labels": np.array(["a", None], dtype=object)}))
+    arr = decoded["scores"]
+    restored = np.frombuffer(arr["data"], dtype=np.dtype(arr["dtype"])).reshape(arr["shape"])
+    assert np.array_equal(restored, scores[:, ::2])
+    assert decoded["labels"] == ["a", None]
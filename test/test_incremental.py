@@ -0,0 +1,59 @@
+from os.path import exists
+
+import numpy as np
+import pytest
+from sklearn.linear_model import SGDClassifier
+
+from bundle.datatypes import Numeric
+from learning.incremental import SGDSVM
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_learner(model_path, interrupt_at=None):
+    """Streaming learner over a separable toy problem; optionally fails at the given mini-batch iteration"""
+    rng = np.random.RandomState(0)
+    data = rng.randn(200, 5).astype(np.float32)
+    labels = (data[:, 0] + data[:, 1] > 0).astype(np.int64)
+    learner = SGDSVM.__new__(SGDSVM)
+    learner.model_class, learner.args = SGDClassifier, {"loss": "hinge", "random_state": 1}
+    learner.name, learner.seed, learner.num_labels = "sgd_svm", 1, 2
+    learner.embeddings, learner.targets = data, Numeric(labels[:, None])
+    learner.train_index, learner.val_index = np.arange(200), None
+    learner.epochs, learner.batch_size, learner.save_interval = 4, 32, 1
+    learner.early_stopping_patience = None
+    learner.input_aggregation, learner.sequence_length = None, 1
+    learner.get_current_model_path = lambda: model_path
+
+    if interrupt_at is not None:
+        iterations = []
+        iter_batches = learner.iter_batches
+
+        def failing_iter_batches(index, batch_size):
+            iterations.append(1)
+            if len(iterations) == interrupt_at:
+                raise Interrupted()
+            return iter_batches(index, batch_size)
+        learner.iter_batches = failing_iter_batches
+    return learner
+
+
+def test_resume_from_checkpoint(tmp_path):
+    model_path = str(tmp_path / "model")
+    reference, _ = make_learner(str(tmp_path / "reference")).train_model()
+
+    # batch iterations: scaler fitting, then one per epoch; fail in the third epoch
+    with pytest.raises(Interrupted):
+        make_learner(model_path, interrupt_at=4).train_model()
+    checkpoint = model_path + ".checkpoint"
+    assert exists(checkpoint)
+
+    resumed, scaler = make_learner(model_path).train_model()
+    assert not exists(checkpoint)
+    # the interrupted run continues as if uninterrupted
+    assert np.allclose(resumed.coef_, reference.coef_) and np.allclose(resumed.intercept_, reference.intercept_)
+    assert resumed.t_ == reference.t_
+    data = scaler.transform(np.asarray([[2, 2, 0, 0, 0], [-2, -2, 0, 0, 0]], np.float32))
+    assert list(resumed.predict(data)) == [1, 0]
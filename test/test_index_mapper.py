@@ -0,0 +1,61 @@
+import numpy as np
+
+from report.report import IndexMapper
+
+
+def make_mapper():
+    # 10 elements -> 6 selected -> 3 selected; the first level has a duplicate
+    return IndexMapper(10, [[7, 2, 5, 2, 9, 0], [4, 1, 5]])
+
+
+def backward(mapper, pos, level):
+    """Brute-force original index of a position at the given level"""
+    for lvl in range(level, -1, -1):
+        pos = mapper.indexes[lvl][pos]
+    return pos
+
+
+def test_backward_conversion():
+    mapper = make_mapper()
+    assert list(mapper.convert_indexes([0, 1, 2], source_level=1, target_level=-1)) == [9, 2, 0]
+    assert list(mapper.convert_indexes([0, 1, 2], source_level=1, target_level=0)) == [4, 1, 5]
+    assert list(mapper.convert_indexes([3, 4], source_level=0, target_level=-1)) == [2, 9]
+
+
+def test_forward_is_inverse():
+    mapper = make_mapper()
+    forward = mapper.convert_indexes(np.arange(10), source_level=-1)
+    assert list(forward) == [2, -1, 1, -1, -1, -1, -1, -1, -1, 0]
+    for orig, pos in enumerate(forward):
+        if pos >= 0:
+            assert backward(mapper, pos, 1) == orig
+        else:
+            assert all(backward(mapper, p, 1) != orig for p in range(3))
+    # a round trip restores the surviving indexes
+    survivors = np.flatnonzero(forward >= 0)
+    back = mapper.convert_indexes(forward[survivors], source_level=1, target_level=-1)
+    assert np.array_equal(back, survivors)
+
+
+def test_duplicates_map_to_first_position():
+    mapper = make_mapper()
+    assert mapper.convert_index(2, target_level=0)[0] == 1
+    assert list(mapper.inverse[0]) == [5, -1, 1, -1, -1, 2, -1, 0, -1, 4]
+
+
+def test_survival():
+    mapper = make_mapper()
+    assert mapper.index_survives(9, target_level=1) and not mapper.index_survives(7, target_level=1)
+    assert mapper.index_survives(7, target_level=0)
+    assert list(mapper.survival_mask([0, 1, 2, 7])) == [True, False, True, False]
+    assert mapper.convert_index(1) is None
+
+
+def test_level_positions():
+    mapper = make_mapper()
+    positions = mapper.get_level_positions()
+    assert positions.shape == (3, 10)
+    for lvl in range(2):
+        expected = mapper.convert_indexes(np.arange(10), source_level=-1, target_level=lvl)
+        assert np.array_equal(positions[lvl + 1], expected)
+    assert np.array_equal(mapper.get_level_positions([9, 1])[:, 0], [9, 4, 0])
@@ -0,0 +1,23 @@
+import nltk
+
+import utils
+from representation.representation import Representation
+from semantic.semantic_resource import SemanticResource
+from transform.transform import Transform
+
+
+def test_available_without_importing_modules():
+    assert "lsa" in Transform.get_available() and "pca" in Transform.get_available()
+    assert "wordnet" in SemanticResource.get_available()
+    assert "tfidf" in Representation.get_available()
+
+
+def test_exclusive_nltk_data_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, "nltk_data_path", None)
+    monkeypatch.setattr(nltk.data, "path", list(nltk.data.path))
+    monkeypatch.setenv("NLTK_DATA", "")
+    utils.set_nltk_data_path(str(tmp_path))
+    assert nltk.data.path == [str(tmp_path)]
+    nltk.data.path.append("/elsewhere")
+    utils.apply_nltk_data_path()
+    assert nltk.data.path == [str(tmp_path)]
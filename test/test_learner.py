@@ -0,0 +1,71 @@
+import numpy as np
+
+import defs
+from bundle.bundle import DataPool
+from bundle.datatypes import Dictionary, Numeric, Text
+from bundle.datausages import DataPack, Indices
+from learning.learner import Learner, scatter_predictions
+from report.report import MultistageClassificationReport
+from utils import to_namedtuple
+
+
+class FixedLearner(Learner):
+    """Learner predicting a fixed one-hot class per instance"""
+    def test_model(self, model):
+        res = np.zeros((len(self.test_index), 3), np.float32)
+        res[np.arange(len(self.test_index)), np.asarray(self.test_index) % 3] = 1
+        return res
+
+
+def make_learner(scope, num_instances=6, test_index=(1, 3, 4)):
+    learner = FixedLearner.__new__(FixedLearner)
+    learner.config = to_namedtuple({"prediction_scope": scope, "prediction_workers": 2}, "config")
+    learner.models = [None]
+    learner.validation = None
+    learner.embeddings = np.zeros((num_instances, 2))
+    learner.test_embedding_index = np.asarray(test_index)
+    learner.train_embedding_index = np.setdiff1d(np.arange(num_instances), test_index)
+    return learner
+
+
+def test_scatter_predictions_aligns_rows_to_instances():
+    preds = scatter_predictions(4, [np.array([1, 3]), np.array([0])], [np.ones((2, 2)), 2 * np.ones((1, 2))])
+    assert preds.shape == (8, 2)
+    assert np.all(preds[[1, 3]] == 1) and np.all(preds[4] == 2)
+    assert np.isnan(preds[[0, 2, 5, 6, 7]]).all()
+
+
+def test_test_scope_predictions_are_instance_aligned():
+    learner = make_learner("test")
+    learner.produce_outputs()
+    assert learner.predictions.shape == (6, 3)
+    # test instances are predicted at their own rows, the rest are left empty
+    assert np.array_equal(np.argmax(learner.predictions[[1, 3, 4]], axis=1), [1, 0, 1])
+    assert np.isnan(learner.predictions[[0, 2, 5]]).all()
+    assert np.array_equal(learner.output_usage.get_tag_instances(defs.roles.test), [1, 3, 4])
+
+
+def test_test_scope_predictions_through_report():
+    num_instances = 6
+    learner = make_learner("test", num_instances)
+    learner.produce_outputs()
+
+    pool = DataPool()
+    pool.data = []
+    words = [f"w{i}" for i in range(num_instances)]
+    pool.current_running_chain = "params"
+    pool.add_data(DataPack(Dictionary({"top_k": 1})))
+    pool.current_running_chain = "data"
+    pool.add_data(DataPack(Text([{"words": [w]} for w in words]), Indices([[1, 3], [4]], ["ngram_inst_0", "ngram_inst_1"])))
+    pool.current_running_chain = "preds"
+    pool.add_data(DataPack(Numeric(learner.predictions), learner.output_usage))
+
+    params = {"data_chain": "data", "pred_chains": ["preds"], "idx_tags": [None], "debug": False, "label_mappings": [["a", "b", "c"]]}
+    report = MultistageClassificationReport(to_namedtuple({"params": params}, "config"))
+    report.data_pool = pool
+    report.produce_outputs()
+
+    results = report.result["results"]
+    overall = [[list(word["overall_preds"]) for word in inst["predictions"]] for inst in results]
+    # instance 1 -> class b, 3 -> class a, 4 -> class b
+    assert overall == [[["b"], ["a"]], [["b"]]]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from learning.knn import NeighbourIndex
+
+
+def make_data(num=2000, dim=16, seed=0):
+    rng = np.random.RandomState(seed)
+    centers = rng.randn(20, dim) * 4
+    data = centers[rng.randint(20, size=num)] + rng.randn(num, dim)
+    queries = centers[rng.randint(20, size=100)] + rng.randn(100, dim)
+    return data.astype(np.float32), queries.astype(np.float32)
+
+
+def brute_force(data, queries, k, metric):
+    if metric == "cosine":
+        data = data / np.linalg.norm(data, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    dists = ((queries[:, None, :] - data[None, :, :]) ** 2).sum(axis=-1)
+    return np.argsort(dists, axis=1)[:, :k]
+
+
+def get_recall(metric, num_probes):
+    data, queries = make_data()
+    k = 10
+    index = NeighbourIndex(metric, num_lists=40, num_probes=num_probes, seed=1)
+    ids = np.arange(len(data)) + 100
+    index.build(data, ids, np.zeros((len(data), 2), np.float32))
+    positions, distances = index.search(queries, k)
+    # distances are sorted
+    assert np.all(np.diff(distances, axis=1) >= -1e-5)
+    found = np.asarray(index.ids)[positions] - 100
+    expected = brute_force(data, queries, k, metric)
+    return np.mean([len(set(f) & set(e)) / k for f, e in zip(found, expected)])
+
+
+def test_recall_against_brute_force():
+    for metric in ("euclidean", "cosine"):
+        assert get_recall(metric, num_probes=8) >= 0.9
+        # probing all lists is exhaustive
+        assert get_recall(metric, num_probes=40) == 1.0
+
+
+def test_save_load(tmp_path):
+    data, queries = make_data(300)
+    targets = np.eye(3, dtype=np.float32)[np.arange(300) % 3]
+    index = NeighbourIndex("euclidean", num_lists=5, num_probes=2, seed=1)
+    index.build(data, np.arange(300), targets)
+    path = str(tmp_path / "index")
+    index.save(path)
+    loaded = NeighbourIndex.load(path)
+    assert type(loaded.vectors) is np.memmap
+    pos, dist = index.search(queries, 5)
+    loaded_pos, loaded_dist = loaded.search(queries, 5)
+    assert np.array_equal(pos, loaded_pos) and np.allclose(dist, loaded_dist)
+    scores = loaded.vote(loaded_pos)
+    assert np.allclose(scores.sum(axis=1), 1)
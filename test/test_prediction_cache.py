@@ -0,0 +1,100 @@
+from collections import namedtuple
+
+from component.prediction_cache import (PredictionCache, get_batch_dependent_components, merge_instance_outputs,
+                                        split_instance_outputs)
+
+
+def run_per_instance(calls):
+    """Pipeline stub with per-instance outputs, recording the texts of each run"""
+    def run(texts):
+        calls.append(list(texts))
+        return {"dp": {"data": {i: t.upper() for i, t in enumerate(texts)},
+                       "usages": {"Indices": [{"instances": [list(range(len(texts))), [i for i, t in enumerate(texts) if t.startswith("a")]], "tags": ["all", "a"]}]}}}
+    return run
+
+
+def test_lru_eviction_and_stats():
+    cache = PredictionCache(2, "fp")
+    cache.put("k1", 1)
+    cache.put("k2", 2)
+    assert cache.get("k1") == 1
+    # k2 is now the least recently used
+    cache.put("k3", 3)
+    assert cache.get("k2") is None
+    assert cache.get("k1") == 1 and cache.get("k3") == 3
+    stats = cache.get_stats()
+    assert stats["size"] == 2 and stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_sqlite_persistence(tmp_path):
+    path = str(tmp_path / "cache" / "outputs.db")
+    cache = PredictionCache(1, "fp", path)
+    cache.put("k1", {"a": [1, 2]})
+    cache.put("k2", 2)
+    assert "k1" not in cache.entries
+    # evicted from memory, fetched from disk
+    assert cache.get("k1") == {"a": [1, 2]}
+    reopened = PredictionCache(4, "fp", path)
+    assert reopened.get("k2") == 2
+    assert reopened.get_stats()["disk_hits"] == 1
+
+
+def test_split_merge_round_trip():
+    texts = ["abc", "xyz", "ab"]
+    outputs = run_per_instance([])(texts)
+    instance_outputs = split_instance_outputs(outputs, len(texts))
+    assert instance_outputs[1]["dp"] == ("XYZ", {"Indices": [{"instances": [True, False], "tags": ["all", "a"]}]})
+    assert merge_instance_outputs(instance_outputs) == outputs
+    # reordered instances are reindexed
+    merged = merge_instance_outputs(instance_outputs[::-1])
+    assert merged["dp"]["data"] == {0: "AB", 1: "XYZ", 2: "ABC"}
+    assert merged["dp"]["usages"]["Indices"][0]["instances"] == [[0, 1, 2], [0, 2]]
+
+
+def test_split_unaligned_outputs():
+    assert split_instance_outputs({"dp": {"data": {0: "summary"}}}, 2) is None
+    assert split_instance_outputs("text", 1) is None
+
+
+def test_fetch_outputs_deduplicates():
+    calls = []
+    run = run_per_instance(calls)
+    cache = PredictionCache(10, "fp")
+    texts = ["abc", "xyz"]
+    assert cache.fetch_outputs(texts, None, run) == run(texts)
+    calls.clear()
+    res = cache.fetch_outputs(["xyz", "new", " new ", "abc", "new"], None, run)
+    # the uncached text is run once, normalized duplicates included
+    assert calls == [["new"]]
+    assert res["dp"]["data"] == {0: "XYZ", 1: "NEW", 2: "NEW", 3: "ABC", 4: "NEW"}
+    assert res["dp"]["usages"]["Indices"][0]["instances"] == [[0, 1, 2, 3, 4], [3]]
+    # distinct parameters are cached separately
+    cache.fetch_outputs(["abc"], {"top_k": 2}, run)
+    assert calls == [["new"], ["abc"]]
+
+
+def test_fetch_unaligned_outputs_runs_once():
+    calls = []
+
+    def run(texts):
+        calls.append(list(texts))
+        return {"dp": {"data": {0: len(texts)}}}
+    cache = PredictionCache(10, "fp")
+    assert cache.fetch_outputs(["a", "b", "a"], None, run) == {"dp": {"data": {0: 3}}}
+    assert calls == [["a", "b", "a"]]
+    # known to be uncacheable, the cache is bypassed
+    cache.fetch_outputs(["a"], None, run)
+    assert calls[-1] == ["a"] and len(cache.entries) == 0
+
+
+def test_batch_dependent_components():
+    Comp = namedtuple("Comp", "name dependent")
+    Comp.get_full_name = lambda self: self.name
+    Comp.outputs_depend_on_batch = lambda self: self.dependent
+    Chain = namedtuple("Chain", "components")
+    Chain.get_components = lambda self: self.components
+    Pipeline = namedtuple("Pipeline", "chains")
+    pipelines = [Pipeline({"c1": Chain([Comp("manual", False), Comp("tfidf", True)])}),
+                 Pipeline({"c2": Chain([Comp("learner", False)])})]
+    assert get_batch_dependent_components(pipelines) == ["tfidf"]
+    assert get_batch_dependent_components(pipelines[1:]) == []
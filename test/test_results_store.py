@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from evaluation.results_store import ResultsStore, flatten_results
+
+
+def make_results(scores):
+    """Single- and multilabel-style nested results with per-fold scores"""
+    return {"run": {"f1-score": {"macro": {"mean": float(np.mean(scores)), "folds": scores}},
+                    "accuracy": {"mean": float(np.mean(scores)), "folds": scores}}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.add_run("old", {"learner": "mlp", "dropout": 0.3}, make_results([0.1, 0.2]))
+    store.add_run("a", {"learner": "svm", "params": {"c": 1}}, make_results([0.5, 0.6]))
+    store.add_run("b", {"learner": "knn", "params": {"c": 1}}, make_results([0.7, 0.8]))
+    return store
+
+
+def test_flatten_results():
+    rows = flatten_results(make_results([0.5, 0.6]))
+    assert ("run", "f1-score", "macro", "folds", 1, 0.6) in rows
+    assert ("run", "accuracy", None, "mean", None, 0.55) in rows
+    assert len(rows) == 6
+
+
+def test_round_trip(store, tmp_path):
+    scores = store.get_scores("mean", run_ids=["a", "b"])
+    assert list(scores.index) == ["a", "b"]
+    assert scores.loc["b", "run.f1-.mac.mean"] == 0.75 and scores.loc["a", "run.acc..mean"] == 0.55
+    folds = store.get_fold_scores("run", "f1-score", "macro", run_ids=["a", "b"])
+    assert list(folds["score"]) == [0.5, 0.6, 0.7, 0.8]
+    assert list(folds["learner"]) == ["svm", "svm", "knn", "knn"]
+    # non-scalar variables are stored as json
+    assert folds["params"].iloc[0] == '{"c": 1}'
+    # persisted across connections; re-adding a run replaces its scores
+    reopened = ResultsStore(str(tmp_path / "results.db"))
+    reopened.add_run("a", {"learner": "svm"}, make_results([0.9]))
+    assert list(reopened.get_fold_scores("run", "accuracy", None, run_ids=["a"])["score"]) == [0.9]
+
+
+def test_variables_of_runs(store):
+    assert store.get_variables() == ["learner", "dropout", "params"]
+    # variables unset in the selected runs are excluded
+    assert store.get_variables(["a", "b"]) == ["learner", "params"]
+    folds = store.get_fold_scores("run", "accuracy", None, run_ids=["a", "b"])
+    assert "dropout" not in folds.columns
+
+
+def test_is_current(store, tmp_path):
+    source = tmp_path / "results.json"
+    source.write_text("{}")
+    assert not store.is_current("c", str(source))
+    store.add_run("c", {}, {}, source=str(source))
+    assert store.is_current("c", str(source))
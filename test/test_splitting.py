@@ -0,0 +1,49 @@
+import numpy as np
+
+from learning.validation.splitting import folds_to_splits, iterative_stratification
+from utils import label_matrix
+
+
+def make_multilabel(num_instances, num_labels, seed=0):
+    rng = np.random.RandomState(seed)
+    labels = []
+    for _ in range(num_instances):
+        # skewed label frequencies, a few label-less instances
+        num = rng.choice([0, 1, 2, 3], p=[0.05, 0.45, 0.35, 0.15])
+        labels.append(rng.choice(num_labels, size=num, replace=False, p=np.arange(num_labels, 0, -1) / np.arange(num_labels + 1).sum()))
+    return labels
+
+
+def test_fold_proportions():
+    labels = make_multilabel(500, 8)
+    proportions = [0.2, 0.3, 0.5]
+    folds = iterative_stratification(labels, 8, proportions, seed=1)
+    assert folds.min() == 0 and folds.max() == 2
+    sizes = np.bincount(folds, minlength=3)
+    assert np.all(np.abs(sizes - np.asarray(proportions) * 500) <= 5)
+
+
+def test_label_balance():
+    num_labels, num_folds = 8, 4
+    labels = make_multilabel(600, num_labels)
+    folds = iterative_stratification(labels, num_labels, [1.0 / num_folds] * num_folds, seed=1)
+    mat = label_matrix(labels, num_labels).toarray()
+    totals = mat.sum(axis=0)
+    for f in range(num_folds):
+        per_label = mat[folds == f].sum(axis=0)
+        # each label is split evenly across folds, up to rounding and co-occurrence slack
+        assert np.all(np.abs(per_label - totals / num_folds) <= np.maximum(2, 0.05 * totals))
+
+
+def test_deterministic_and_sparse_input():
+    labels = make_multilabel(100, 5)
+    a = iterative_stratification(labels, 5, [0.5, 0.5], seed=3)
+    b = iterative_stratification(label_matrix(labels, 5), 5, [0.5, 0.5], seed=3)
+    assert np.array_equal(a, b)
+
+
+def test_folds_to_splits():
+    folds = np.array([0, 1, 0, 2, 1])
+    splits = folds_to_splits(folds, 3)
+    assert [list(test) for _, test in splits] == [[0, 2], [1, 4], [3]]
+    assert list(splits[0][0]) == [1, 3, 4]
@@ -0,0 +1,20 @@
+import numpy as np
+
+from stattests.difference import Anova
+
+
+def test_anova_groups_by_value():
+    scores = [0.1, 0.2, 0.15, 0.8, 0.9, 0.85, 0.5, 0.55]
+    groups = np.array([1, 1, 1, "1", "1", "1", None, None], dtype=object)
+    anova = Anova()
+    anova.run(scores, groups)
+    # 1 and "1" are distinct groups, missing values are no group
+    assert len(anova.results) == 1
+    stat, p, names = anova.results[0]
+    assert list(names) == [1, "1"] and p < 0.01
+
+
+def test_anova_pairwise():
+    anova = Anova()
+    anova.run(np.arange(9, dtype=float), ["a", "b", "c"] * 3)
+    assert [names for *_, names in anova.results] == [("a", "b"), ("a", "c"), ("b", "c")]
@@ -0,0 +1,51 @@
+from bundle.datatypes import TokenSpans, Text
+
+
+def make_instances(texts, tags=None):
+    res = []
+    for i, text in enumerate(texts):
+        words = text.split()
+        pos = list(zip(words, tags[i])) if tags is not None else []
+        res.append({"words": words, "pos": pos})
+    return res
+
+
+def test_concatenate_words():
+    first = TokenSpans.from_instances(make_instances(["a b", "b c"]))
+    second = TokenSpans.from_instances(make_instances(["c d", "", "a"]))
+    merged = TokenSpans.concatenate([first, second])
+    assert merged.get_word_lists() == [["a", "b"], ["b", "c"], ["c", "d"], [], ["a"]]
+    # the vocabulary of the first collection is kept as a prefix
+    assert merged.vocabulary[:3] == first.vocabulary and sorted(merged.vocabulary) == ["a", "b", "c", "d"]
+    assert merged.pos_ids is None
+
+
+def test_concatenate_sliced_views():
+    spans = TokenSpans.from_instances(make_instances(["a b", "c", "d e f"]))
+    merged = spans[[2, 0]] + spans[1:2]
+    assert merged.get_word_lists() == [["d", "e", "f"], ["a", "b"], ["c"]]
+    assert list(merged.starts) == [0, 3, 5] and list(merged.ends) == [3, 5, 6]
+
+
+def test_concatenate_pos():
+    first = TokenSpans.from_instances(make_instances(["dogs run"], [["NNS", "VBP"]]))
+    second = TokenSpans.from_instances(make_instances(["fast dogs", "run"], [["RB", "NNS"], ["VB"]]))
+    merged = first + second
+    assert merged.pos_vocabulary[:2] == ["NNS", "VBP"]
+    assert [inst["pos"] for inst in merged] == [[("dogs", "NNS"), ("run", "VBP")], [("fast", "RB"), ("dogs", "NNS")], [("run", "VB")]]
+    pairs = merged.get_pos_pairs()
+    assert pairs.get_word_lists() == [[("dogs", "NNS"), ("run", "VBP")], [("fast", "RB"), ("dogs", "NNS")], [("run", "VB")]]
+
+
+def test_concatenate_partial_pos():
+    first = TokenSpans.from_instances(make_instances(["a b"], [["X", "Y"]]))
+    second = TokenSpans.from_instances(make_instances(["c"]))
+    merged = first + second
+    assert merged.pos_ids is None and merged.get_word_lists() == [["a", "b"], ["c"]]
+
+
+def test_text_append_instance():
+    text = Text(make_instances(["a b"], [["X", "Y"]]))
+    text.append_instance(make_instances(["b c"], [["Y", "Z"]]))
+    assert text.is_compact()
+    assert [inst["pos"] for inst in text.instances] == [[("a", "X"), ("b", "Y")], [("b", "Y"), ("c", "Z")]]
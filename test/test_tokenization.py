@@ -0,0 +1,54 @@
+import string
+from collections import namedtuple
+from functools import partial
+
+import nltk
+import pytest
+
+import dataset.dataset as dataset_module
+from dataset.dataset import Dataset
+
+texts = [
+    "The quick brown fox, who cannot jump, didn't see the dog.",
+    "“Quoted” text — with dashes–and ‘single’ quotes… and «guillemets».",
+    "Wanna go? Gonna be fun; gotta see it, lemme know, gimme 5 minutes.",
+    "Café naïve résumé coöperate Ångström",
+    "Το γρήγορο καφέ αλεπού πηδάει πάνω από τον τεμπέλη σκύλο.",
+    "email@example.com costs $3.50 (approx.) -- i.e. 20% off!",
+    "tabs\tand\nnewlines   and  multiple    spaces",
+    "",
+]
+
+
+@pytest.fixture
+def dataset(monkeypatch):
+    try:
+        nltk.data.find("tokenizers/punkt")
+    except LookupError:
+        # without punkt data, keep lines unsplit; punctuation is removed within each sentence regardless
+        monkeypatch.setattr(dataset_module, "sent_tokenize", lambda text: [text])
+        monkeypatch.setattr(dataset_module, "word_tokenize", partial(nltk.word_tokenize, preserve_line=True))
+    dset = Dataset.__new__(Dataset)
+    dset.language = "english"
+    dset.config = namedtuple("config", "tokenizer")("regex")
+    dset.punctuation_remover = str.maketrans("", "", string.punctuation)
+    return dset
+
+
+def test_regex_matches_nltk(dataset):
+    for text in texts:
+        text = text.lower()
+        assert dataset.tokenize_regex(text, dataset.punctuation_remover) == dataset.tokenize_nltk(text, dataset.punctuation_remover), text
+
+
+def test_contractions_and_marks(dataset):
+    assert dataset.tokenize_regex("i cannot wanna go", dataset.punctuation_remover) == ["i", "can", "not", "wan", "na", "go"]
+    assert dataset.tokenize_regex("naïve élan", dataset.punctuation_remover) == ["naive", "elan"]
+    assert dataset_module.combining_mark_remover[ord("a")] == ord("a")
+    assert dataset_module.combining_mark_remover[0x301] is None
+
+
+def test_get_tokenizer(dataset):
+    assert dataset.get_tokenizer() == dataset.tokenize_regex
+    dataset.config = dataset.config._replace(tokenizer="nltk")
+    assert dataset.get_tokenizer() == dataset.tokenize_nltk
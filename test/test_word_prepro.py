@@ -0,0 +1,40 @@
+import string
+from collections import OrderedDict, namedtuple
+
+import pytest
+
+from dataset.dataset import Dataset
+
+Config = namedtuple("config", "tokenizer prepro extract_pos prepro_cache_size")
+
+
+def make_dataset(prepro, extract_pos, cache_size=2):
+    dset = Dataset.__new__(Dataset)
+    dset.config = Config("regex", prepro, extract_pos, cache_size)
+    dset.language, dset.remove_digits, dset.filter_stopwords = "english", False, False
+    dset.prepro_cache = OrderedDict()
+    return dset
+
+
+def test_prepro_without_pos_fails():
+    dset = make_dataset("stem", False)
+    with pytest.raises(Exception, match="without POS extraction"):
+        dset.process_single_text("dogs running", str.maketrans("", "", string.punctuation), None, None, set(), do_tag=False)
+
+
+def test_prepro_cache_eviction():
+    dset = make_dataset("stem", True)
+    calls = []
+
+    def prepro(w_pos):
+        calls.append(w_pos)
+        return w_pos[0][:3], w_pos[1]
+    data = {"pos": [("dogs", "NNS"), ("running", "VBG"), ("dogs", "NNS")]}
+    dset.apply_word_prepro(data, prepro)
+    assert data["words"] == [("dog", "NNS"), ("run", "VBG"), ("dog", "NNS")]
+    assert len(calls) == 2
+    data = {"pos": [("cats", "NNS"), ("dogs", "NNS")]}
+    dset.apply_word_prepro(data, prepro)
+    # the oldest entries are evicted for new ones
+    assert calls[2:] == [("cats", "NNS"), ("dogs", "NNS")]
+    assert list(dset.prepro_cache) == [("cats", "NNS"), ("dogs", "NNS")]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+import time
+from os.path import abspath, dirname
+
+import numpy as np
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+import defs
+from bundle.datatypes import Numeric
+from bundle.datausages import DataPack, Predictions
+from endpoint.encoding import JSONEncoder, MsgpackEncoder
+
+"""Compare the latency and size of endpoint output encodings, for a prediction matrix"""
+
+
+def legacy_encode(dp):
+    """Per-instance list conversion and standard library json, as previously done by the endpoint"""
+    res = {"usages": {}, "data": {}}
+    for i, inst in enumerate(dp.data.instances):
+        res["data"][i] = inst.tolist()
+    res["usages"] = {u.name: [u.to_json()] for u in dp.usages}
+    return json.dumps({dp.get_id(): res}, ensure_ascii=False).encode("utf-8")
+
+
+def make_encoders():
+    encoders = {"legacy json": legacy_encode}
+    json_encoder = JSONEncoder()
+    name = "json (orjson)" if json_encoder.orjson is not None else "json (vectorized)"
+    encoders[name] = lambda dp: json_encoder.encode({dp.get_id(): dp.to_json()})
+    try:
+        msgpack_encoder = MsgpackEncoder()
+        encoders["msgpack"] = lambda dp: msgpack_encoder.encode({dp.get_id(): dp.to_json(keep_arrays=True)})
+    except ImportError:
+        print("msgpack is not installed, skipping its encoding")
+    return encoders
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-instances", type=int, default=100000)
+parser.add_argument("-labels", type=int, default=20)
+parser.add_argument("-repeats", type=int, default=3)
+parser.add_argument("-seed", type=int, default=1337)
+args = parser.parse_args()
+
+rng = np.random.RandomState(args.seed)
+predictions = rng.rand(args.instances, args.labels).astype(np.float32)
+dp = DataPack(Numeric(predictions), Predictions([np.arange(args.instances)], [defs.roles.test]))
+print(f"Encoding a {predictions.shape} prediction matrix, best of {args.repeats} runs")
+
+print("{:20s} {:>12s} {:>12s}".format("encoding", "latency (s)", "size (MB)"))
+for name, encode in make_encoders().items():
+    durations = []
+    for _ in range(args.repeats):
+        start = time.time()
+        payload = encode(dp)
+        durations.append(time.time() - start)
+    print("{:20s} {:12.3f} {:12.2f}".format(name, min(durations), len(payload) / 1e6))
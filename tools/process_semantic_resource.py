@@ -1,14 +1,23 @@
 import argparse
+import glob
+import json
+import os
 import pickle
+import sys
+import time
+from multiprocessing import Pool
+from os import makedirs
+from os.path import abspath, dirname, exists, join
 
 import tqdm
-import yaml
 from nltk.corpus import wordnet as wn
 
-import dataset
-import settings
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+from config.chain_components import dataset_conf
+from config.global_components import misc_conf
+from dataset.dataset import Dataset
 from semantic.semantic_resource import SemanticResource
-from utils import info, setup_simple_logging, to_namedtuple
+from utils import info, read_pickled, setup_simple_logging, warning, write_pickled
 
 
 """
@@ -57,43 +66,139 @@ def word_freqs(thedict):
     print("Total {} residuals, each <= 2 %: {}".format(num_residuals, residuals))
 
 
-def mine_wordnet_examples_definitions():
+class SynsetTextProcessor(Dataset):
+    """Dataset text preprocessing, applied to synset examples and definitions"""
+    name = "wordnet_texts"
+    language = "english"
+
+    def __init__(self, config):
+        self.config = config
+        Dataset.__init__(self, skip_init=True)
+        self.filter_stopwords = config.filter_stopwords
+        self.remove_digits = config.remove_digits
+        self.stopwords = set()
+        self.setup_nltk_resources()
+
+    def get_words(self, text):
+        data = self.process_single_text(text, self.punctuation_remover, self.digit_remover, self.word_prepro_func, self.stopwords)
+        # stemmed / lemmatized words are (word, pos) tuples
+        return [w[0] if type(w) is tuple else w for w in data["words"]]
+
+
+# per-process text processor, set by the worker initializer
+processor = None
+
+
+def init_miner(prepro_config):
+    global processor
+    processor = SynsetTextProcessor(prepro_config)
+
+
+def mine_shard(shard):
+    """Extract example and definition words of a chunk of synsets, as columns"""
+    shard_id, names = shard
+    columns = {"synset": [], "examples": [], "example_words": [], "definition_words": []}
+    for name in names:
+        ss = wn.synset(name)
+        columns["synset"].append(name)
+        columns["examples"].append(ss.examples())
+        columns["example_words"].append(list(set(word for t in ss.examples() for word in processor.get_words(t))))
+        columns["definition_words"].append(list(set(processor.get_words(ss.definition()))))
+    return shard_id, columns
+
+
+def get_shard_path(output_dir, shard_id):
+    return join(output_dir, "shard_{:06d}.pkl".format(shard_id))
+
+
+def write_shard(output_dir, shard_id, columns):
+    # write and rename, so that partial shards are never picked up on resume
+    path = get_shard_path(output_dir, shard_id)
+    write_pickled(path + ".tmp", columns)
+    os.replace(path + ".tmp", path)
+
+
+def get_manifest(prepro_config, chunk_size, num_synsets):
+    """Settings that determine the shard contents"""
+    return {"prepro": prepro_config.prepro, "extract_pos": prepro_config.extract_pos, "filter_stopwords": prepro_config.filter_stopwords,
+            "remove_digits": prepro_config.remove_digits, "tokenizer": prepro_config.tokenizer, "chunk_size": chunk_size, "num_synsets": num_synsets}
+
+
+def check_manifest(output_dir, manifest):
+    """Invalidate existing shards unless they were mined with the same settings, then record the current ones"""
+    path = join(output_dir, "manifest.json")
+    existing = None
+    if exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+    shard_paths = glob.glob(join(output_dir, "shard_*.pkl"))
+    if shard_paths and existing != manifest:
+        warning(f"Shards in {output_dir} were mined with settings {existing}, but {manifest} are requested: removing {len(shard_paths)} existing shards.")
+        for shard_path in shard_paths:
+            os.remove(shard_path)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def mine_wordnet_examples_definitions(output_dir, prepro_config, workers=1, chunk_size=2000):
     """ Extract words related to wordnet synsets through examples and/or definition of synsets
+
+    Synsets are processed in chunks, across worker processes, with each chunk written to a separate shard.
+    Existing shards are skipped, so that interrupted runs resume where they stopped; a manifest of the preprocessing
+    settings and chunk size invalidates shards mined with different ones.
     """
     setup_simple_logging()
+    makedirs(output_dir, exist_ok=True)
+    info("Fetching all synsets.")
+    names = sorted(s.name() for s in wn.all_synsets())
+    shards = [(i, names[k: k + chunk_size]) for (i, k) in enumerate(range(0, len(names), chunk_size))]
+    check_manifest(output_dir, get_manifest(prepro_config, chunk_size, len(names)))
+    pending = [s for s in shards if not exists(get_shard_path(output_dir, s[0]))]
+    info(f"Mining {len(names)} synsets in {len(shards)} shards of size {chunk_size}, {len(shards) - len(pending)} of which exist in {output_dir}.")
+
+    num_pending = sum(len(s[1]) for s in pending)
+    start, num_done = time.time(), 0
+    with tqdm.tqdm(total=num_pending, ascii=True, desc="Fetching example and definition words") as pbar:
+        if workers > 1:
+            pool = Pool(workers, initializer=init_miner, initargs=(prepro_config,))
+            results = pool.imap_unordered(mine_shard, pending)
+        else:
+            init_miner(prepro_config)
+            pool, results = None, map(mine_shard, pending)
+        for shard_id, columns in results:
+            write_shard(output_dir, shard_id, columns)
+            num_done += len(columns["synset"])
+            pbar.update(len(columns["synset"]))
+            pbar.set_postfix(synsets_per_sec="{:.1f}".format(num_done / (time.time() - start)))
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if num_done:
+        info("Mined {} synsets in {:.1f} sec, {:.1f} synsets / sec with {} workers.".format(num_done, time.time() - start, num_done / (time.time() - start), workers))
+    merge_shards(output_dir, len(shards))
+
+
+def merge_shards(output_dir, num_shards):
+    """Gather shards to the synset - words mappings"""
     examples_per_synset = {}
     def_per_synset = {}
     examples_def_per_synset = {}
-
-    # instantiate dset object for text processing
-    dset = dataset.Dataset(skip_init=True)
-    dset.language = "english"
-    dset.setup_nltk_resources()
-
-    # get all to know how much it is
-
-    info("Fetching all synsets.")
-    all_ssets = list(wn.all_synsets())
-    # process each
-    with tqdm.tqdm(total=len(all_ssets), ascii=True, desc="Fetching example and definition words") as pbar:
-        for i, ss in enumerate(all_ssets):
-            name = ss.name()
-            examples = list(set([word for t in ss.examples() for word in dset.process_single_text(t, dset.punctuation_remover, dset.digit_remover, dset.word_prepro, dset.stopwords)]))
-            definition = list(set(dset.process_single_text(ss.definition(), dset.punctuation_remover, dset.word_prepro, dset.stopwords)))
-            # print("Synset {}/{}".format(i + 1, len(all_ssets)))
-
-            if examples:
-                examples_per_synset[name] = ss.examples()
-                if ss.definition():
-                    examples_def_per_synset[name] = list(set(examples + definition))
+    total = 0
+    for shard_id in range(num_shards):
+        columns = read_pickled(get_shard_path(output_dir, shard_id))
+        total += len(columns["synset"])
+        for name, examples, example_words, definition in zip(*[columns[k] for k in ("synset", "examples", "example_words", "definition_words")]):
+            if example_words:
+                examples_per_synset[name] = examples
+                if definition:
+                    examples_def_per_synset[name] = list(set(example_words + definition))
             if definition:
                 def_per_synset[name] = definition
-            pbar.update()
 
     # print results and save word lists
-    print("Examples exist for {}/{} synsets.".format(len(examples_per_synset), len(all_ssets)))
-    print("Definitions exist for {}/{} synsets.".format(len(def_per_synset), len(all_ssets)))
-    print("Examples or definitions exist for {}/{} synsets.".format(len(examples_def_per_synset), len(all_ssets)))
+    print("Examples exist for {}/{} synsets.".format(len(examples_per_synset), total))
+    print("Definitions exist for {}/{} synsets.".format(len(def_per_synset), total))
+    print("Examples or definitions exist for {}/{} synsets.".format(len(examples_def_per_synset), total))
     example_freqs(examples_per_synset)
     # count word frequencies
     word_freqs(examples_per_synset)
@@ -101,25 +206,18 @@ def mine_wordnet_examples_definitions():
     word_freqs(examples_def_per_synset)
 
     # write results
-    outfile = "wordnet_synset_examples.pkl"
-    print("Writing to {}".format(outfile))
-    with open(outfile, "wb") as f:
-        pickle.dump(examples_per_synset, f)
-
-    print("Writing to {}".format(outfile))
-    outfile = "wordnet_synset_examples_definitions.pkl"
-    with open(outfile, "wb") as f:
-        pickle.dump(examples_def_per_synset, f)
-
-    outfile = "wordnet_synset_definitions.pkl"
-    print("Writing to {}".format(outfile))
-    with open(outfile, "wb") as f:
-        pickle.dump(def_per_synset, f)
+    for outfile, data in zip(("wordnet_synset_examples.pkl", "wordnet_synset_examples_definitions.pkl", "wordnet_synset_definitions.pkl"),
+                             (examples_per_synset, examples_def_per_synset, def_per_synset)):
+        outfile = join(output_dir, outfile)
+        print("Writing to {}".format(outfile))
+        with open(outfile, "wb") as f:
+            pickle.dump(data, f)
 
 
 def produce_semantic_neighbourhood(config_file):
     """Function that produces semantic word neighbourhoods from a semantic resource.
     """
+    import settings
     try:
         config = settings.Config(config_file)
         config.misc.independent_component = True
@@ -176,14 +274,30 @@ def produce_semantic_neighbourhood(config_file):
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='')
-    parser.add_argument('-c', '--config_file', required=True)
+    parser.add_argument('-c', '--config_file', help="Configuration for semantic neighbourhood extraction")
+    parser.add_argument('--mine_wordnet', help="Output folder to mine wordnet examples and definitions to")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk_size', type=int, default=2000, help="Number of synsets per output shard")
+    parser.add_argument('--prepro', default=None, help="Word preprocessing: stem / lemma")
+    parser.add_argument('--keep_stopwords', action="store_true")
+    parser.add_argument('--remove_digits', action="store_true")
     return parser.parse_args()
 
 
+def make_preprocessing_config(args):
+    conf = dataset_conf({"name": SynsetTextProcessor.name, "prepro": args.prepro, "extract_pos": args.prepro is not None,
+                         "filter_stopwords": not args.keep_stopwords, "remove_digits": args.remove_digits})
+    conf.add_config_object("misc", misc_conf())
+    return conf
+
+
 def main():
 
     args = parse_arguments()
-    produce_semantic_neighbourhood(args.config_file)
+    if args.mine_wordnet:
+        mine_wordnet_examples_definitions(args.mine_wordnet, make_preprocessing_config(args), args.workers, args.chunk_size)
+    elif args.config_file:
+        produce_semantic_neighbourhood(args.config_file)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import subprocess
+import sys
+
+"""Measure module import overhead at startup, via the interpreter's -X importtime report"""
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module, runs):
+    """Import the module in fresh interpreters, returning the per-package cumulative timings (us) of the fastest run"""
+    best = None
+    for _ in range(runs):
+        res = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=repo_root, capture_output=True, text=True)
+        if res.returncode != 0:
+            print(res.stderr)
+            exit(1)
+        timings = {}
+        for line in res.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # top-level imports are not indented
+            name = name[1:]
+            if not name.startswith(" "):
+                timings[name] = int(cumulative)
+        # the requested module is the last one to complete
+        if best is None or timings[module] < best[module]:
+            best = timings
+    return best
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-module", help="Module to import", default="main")
+parser.add_argument("-runs", help="Number of runs, the fastest of which is reported", type=int, default=3)
+parser.add_argument("-top", help="Number of top-level imports to list", type=int, default=15)
+parser.add_argument("-max_seconds", help="Exit with an error if importing takes longer", type=float, default=None)
+args = parser.parse_args()
+
+timings = measure(args.module, args.runs)
+total = timings[args.module] / 1e6
+print(f"Importing {args.module}: {total:.3f} sec")
+for name, cumulative in sorted(timings.items(), key=lambda x: x[1], reverse=True)[:args.top]:
+    print(f"{cumulative / 1e6:10.3f} {name}")
+if args.max_seconds is not None and total > args.max_seconds:
+    print(f"Import time exceeds {args.max_seconds} sec")
+    exit(1)
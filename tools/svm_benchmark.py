@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.datasets import make_classification
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.model_selection import StratifiedShuffleSplit, train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC, LinearSVC
+
+"""Compare training / prediction time and probability quality of the kernel SVM and the calibrated linear SVM paths"""
+
+
+def softmax(scores):
+    if scores.ndim == 1:
+        scores = np.stack((-scores, scores), axis=1)
+    scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return scores / scores.sum(axis=1, keepdims=True)
+
+
+def load_data(args):
+    """Read features / labels from npy files, or generate synthetic data"""
+    if args.data is not None:
+        return np.load(args.data), np.load(args.labels)
+    return make_classification(args.samples, args.features, n_informative=args.features // 2, n_classes=args.classes, random_state=args.seed)
+
+
+def make_models(args):
+    held_out = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=args.seed)
+    models = {
+        "linear_svm softmax": LinearSVC(random_state=args.seed),
+        "linear_svm sigmoid": CalibratedClassifierCV(LinearSVC(random_state=args.seed), method="sigmoid", cv=held_out),
+        "linear_svm isotonic": CalibratedClassifierCV(LinearSVC(random_state=args.seed), method="isotonic", cv=held_out),
+    }
+    if not args.skip_svc:
+        models["svm (SVC, probability)"] = SVC(kernel=args.kernel, probability=True, random_state=args.seed)
+    return models
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-data", help="Npy feature matrix; synthetic data is generated if omitted", default=None)
+parser.add_argument("-labels", help="Npy label vector", default=None)
+parser.add_argument("-samples", type=int, default=20000)
+parser.add_argument("-features", type=int, default=300)
+parser.add_argument("-classes", type=int, default=5)
+parser.add_argument("-kernel", help="Kernel of the SVC baseline", default="rbf")
+parser.add_argument("-seed", type=int, default=1337)
+parser.add_argument("--skip_svc", action="store_true", help="Omit the (slow) SVC baseline")
+args = parser.parse_args()
+
+data, labels = load_data(args)
+train_data, test_data, train_labels, test_labels = train_test_split(data, labels, test_size=0.2, stratify=labels, random_state=args.seed)
+scaler = StandardScaler().fit(train_data)
+train_data, test_data = scaler.transform(train_data), scaler.transform(test_data)
+print(f"Train: {train_data.shape}, test: {test_data.shape}, classes: {len(np.unique(labels))}")
+
+print("{:25s} {:>10s} {:>12s} {:>10s} {:>10s}".format("model", "fit (s)", "predict (s)", "accuracy", "log loss"))
+for name, model in make_models(args).items():
+    start = time.time()
+    model.fit(train_data, train_labels)
+    fit_time = time.time() - start
+    start = time.time()
+    probs = model.predict_proba(test_data) if hasattr(model, "predict_proba") else softmax(model.decision_function(test_data))
+    predict_time = time.time() - start
+    predictions = model.classes_[probs.argmax(axis=1)]
+    print("{:25s} {:10.3f} {:12.3f} {:10.4f} {:10.4f}".format(name, fit_time, predict_time, accuracy_score(test_labels, predictions),
+                                                             log_loss(test_labels, probs, labels=model.classes_)))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+from config.chain_components import dataset_conf
+from config.global_components import misc_conf
+from dataset.dataset import Dataset
+
+"""Compare the speed and output of the dataset tokenizer backends"""
+
+
+class BenchmarkProcessor(Dataset):
+    name = "tokenizer_benchmark"
+    language = "english"
+
+    def __init__(self, config):
+        self.config = config
+        Dataset.__init__(self, skip_init=True)
+        self.filter_stopwords = config.filter_stopwords
+        self.remove_digits = config.remove_digits
+        self.stopwords = set()
+        self.setup_nltk_resources()
+
+    def process(self, texts):
+        return [self.process_single_text(t, self.punctuation_remover, self.digit_remover, self.word_prepro_func, self.stopwords)["words"] for t in texts]
+
+
+def read_texts(path):
+    """Read texts from a json dataset, or a text file with a document per line"""
+    if path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)["data"]
+        return [x["text"] for role in data for x in data[role]]
+    with open(path) as f:
+        return [line.strip() for line in f]
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("path", help="Json dataset or newline-delimited text file")
+parser.add_argument("-limit", type=int, default=None, help="Maximum number of documents")
+parser.add_argument("--remove_digits", action="store_true")
+parser.add_argument("--keep_stopwords", action="store_true")
+args = parser.parse_args()
+
+texts = read_texts(args.path)[:args.limit]
+outputs, durations = {}, {}
+for tokenizer in ("nltk", "regex"):
+    conf = dataset_conf({"name": BenchmarkProcessor.name, "tokenizer": tokenizer, "remove_digits": args.remove_digits,
+                         "filter_stopwords": not args.keep_stopwords})
+    conf.add_config_object("misc", misc_conf())
+    proc = BenchmarkProcessor(conf)
+    start = time.time()
+    outputs[tokenizer] = proc.process(texts)
+    durations[tokenizer] = time.time() - start
+    print("{:6s}: {:.3f} sec, {:.1f} docs / sec".format(tokenizer, durations[tokenizer], len(texts) / durations[tokenizer]))
+
+print("Speedup: {:.1f}x".format(durations["nltk"] / durations["regex"]))
+mismatches = [i for i in range(len(texts)) if outputs["nltk"][i] != outputs["regex"][i]]
+print(f"Documents with differing tokens: {len(mismatches)} / {len(texts)}")
+for i in mismatches[:5]:
+    print(f"Document {i}:\n nltk:  {outputs['nltk'][i]}\n regex: {outputs['regex'][i]}")
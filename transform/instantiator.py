@@ -1,20 +1,21 @@
-from transform.gmm import GMMClustering
-from transform.kmeans import KMeansClustering
-from transform.lda import LDA
-from transform.lida import LiDA
-from transform.lsa import LSA
-from transform.pca import PCA
-from utils import error
+from utils import error, import_object
 
 
 class Instantiator:
     component_name = "transform"
-    avail = [LSA, KMeansClustering, GMMClustering, LiDA, LDA, PCA]
+    # transform name to class path, imported on first use
+    avail = {
+        "lsa": "transform.lsa:LSA",
+        "kmeans": "transform.kmeans:KMeansClustering",
+        "gmm": "transform.gmm:GMMClustering",
+        "lida": "transform.lida:LiDA",
+        "lda": "transform.lda:LDA",
+        "pca": "transform.pca:PCA",
+    }
 
     def create(config):
         name = config.name
-        for tra in Instantiator.avail:
-            if tra.base_name == name:
-                return tra(config)
+        if name in Instantiator.avail:
+            return import_object(Instantiator.avail[name])(config)
         # any unknown name is assumed to be pretrained embeddings
-        error(f"Undefined feature transformation: {name}, available ones are {[tra.base_name for tra in Instantiator.avail]}")
+        error(f"Undefined feature transformation: {name}, available ones are {list(Instantiator.avail)}")
@@ -1,4 +1,4 @@
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 
 from transform.transform import Transform
 
@@ -25,6 +25,9 @@ class KMeansClustering(Transform):
         res = self.transformer.transform(data)
         return res
 
+    def get_incremental_transformer(self):
+        return MiniBatchKMeans(self.dimension, batch_size=self.config.chunk_size, random_state=self.config.misc.seed)
+
     def get_term_representations(self):
         """Return term-based, rather than document-based representations
         """
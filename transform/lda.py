@@ -16,3 +16,8 @@ class LDA(Transform):
         self.transformer = LatentDirichletAllocation(n_components=self.dimension, random_state=self.config.misc.seed)
         self.process_func_train = self.transformer.fit_transform
         self.process_func_test = self.transformer.transform
+
+    def get_incremental_transformer(self):
+        # online variational bayes
+        return LatentDirichletAllocation(n_components=self.dimension, learning_method="online", batch_size=self.config.chunk_size,
+                                         total_samples=len(self.train_index), random_state=self.config.misc.seed)
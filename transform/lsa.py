@@ -1,19 +1,26 @@
 from sklearn.decomposition import TruncatedSVD
 
 from transform.transform import Transform
+from utils import info
 
 
 class LSA(Transform):
     """Latent Semantic Analysis decomposition.
 
-    Based on the truncated SVD implementation of sklearn.
+    Based on the randomized truncated SVD implementation of sklearn, which operates on sparse inputs directly.
     """
     base_name = "lsa"
 
     def __init__(self, config):
         """LSA constructor"""
         Transform.__init__(self, config)
-        self.transformer = TruncatedSVD(self.dimension)
-        self.process_func_train = self.transformer.fit_transform
+        self.transformer = TruncatedSVD(self.dimension, algorithm="randomized", n_iter=self.config.power_iterations,
+                                        n_oversamples=self.config.oversampling, random_state=self.config.misc.seed)
+        self.process_func_train = self.fit
         self.process_func_test = self.transformer.transform
 
+    def fit(self, data):
+        res = self.transformer.fit_transform(data)
+        info("{} explained variance ratio: {:.4f} total, top components: {}".format(
+            self.base_name, self.transformer.explained_variance_ratio_.sum(), self.transformer.explained_variance_ratio_[:5].round(4).tolist()))
+        return res
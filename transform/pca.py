@@ -1,4 +1,6 @@
 from sklearn.decomposition import PCA as skPCA
+from sklearn.decomposition import IncrementalPCA
+from scipy.sparse import issparse
 from transform.transform import Transform
 
 
@@ -16,3 +18,10 @@ class PCA(Transform):
         self.process_func_train = self.transformer.fit_transform
         self.process_func_test = self.transformer.transform
 
+    def get_incremental_transformer(self):
+        return IncrementalPCA(self.dimension, batch_size=self.config.chunk_size)
+
+    def get_chunk_data(self, chunk):
+        data = Transform.get_chunk_data(self, chunk)
+        # incremental pca requires dense chunks
+        return data.toarray() if issparse(data) else data
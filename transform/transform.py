@@ -8,10 +8,10 @@ from bundle.bundle import DataPool
 from bundle.datatypes import *
 from bundle.datausages import *
 from component.component import Component
+from transform import instantiator
 from defs import roles
 from serializable import Serializable
-from utils import (debug, error, info, match_labels_to_instances, shapes_list,
-                   write_pickled, read_pickled)
+from utils import error, info, tictoc
 
 
 class Transform(Serializable):
@@ -34,19 +34,23 @@ class Transform(Serializable):
 
     @staticmethod
     def get_available():
-        return [cls.base_name for cls in Transform.__subclasses__()]
+        # registered names; transform modules are imported on first use
+        return list(instantiator.Instantiator.avail)
 
     def __init__(self, config):
-        if self.is_supervised:
-            self.consumes = [Numeric.name, Labels.name]
         self.name = self.base_name
         self.config = config
         self.dimension = config.dimension
-
-    def populate(self):
         Serializable.__init__(self, self.dir_name)
-        self.set_serialization_params()
-        self.acquire_data()
+
+    def get_consumption(self, chain_name):
+        if self.is_supervised:
+            self.consumes = [Numeric.name, Labels.name]
+        return super().get_consumption(chain_name)
+
+    def outputs_depend_on_batch(self):
+        # transforms are fitted on the inputs of each run
+        return True
 
     def get_dimension(self):
         return self.dimension
@@ -59,10 +63,6 @@ class Transform(Serializable):
 
     def compute(self):
         """Apply transform on input features"""
-        if self.loaded():
-            debug("Skipping {} computation due to transform data already loaded." .format(self.name))
-            return
-
         # sanity checks
         error("Got transform dimension of {} but input dimension is {}.".format(self.dimension, self.input_dimension), self.input_dimension < self.dimension)
 
@@ -72,13 +72,16 @@ class Transform(Serializable):
         # compute
         info("Applying {} {}-dimensional transform on the raw representation.".
              format(self.base_name, self.dimension))
+        if self.config.incremental:
+            self.compute_incremental()
+            return
 
         # train
         train_data = self.input_vectors[self.train_index, :]
 
         info("Transforming training input data shape: {}".format(train_data.shape))
         if self.is_supervised:
-            ground_truth = np.reshape(match_labels_to_instances(self.train_epi, self.train_labels), (len(train_data), ))
+            ground_truth = np.reshape(self.train_labels, (len(train_data), ))
             self.vectors = self.process_func_train(train_data, ground_truth)
         else:
             self.vectors = self.process_func_train(train_data)
@@ -86,7 +89,7 @@ class Transform(Serializable):
 
         if self.test_index.size > 0:
             # make zero output matrix
-            output_data = np.zeros((len(self.input_vectors), self.dimension), np.float32)
+            output_data = np.zeros((self.input_vectors.shape[0], self.dimension), np.float32)
             output_data[self.train_index, :] = self.vectors
 
             test_data = self.input_vectors[self.test_index, :]
@@ -102,19 +105,80 @@ class Transform(Serializable):
         self.term_components = self.get_term_representations()
         self.verify_transformed(self.vectors)
         info(f"Output shape: {self.vectors.shape}")
-        # write the output data
-        write_pickled(self.serialization_path_preprocessed, self.get_all_preprocessed())
-        # write the trained transformer model
-        self.save_model()
+
+    def get_incremental_transformer(self):
+        """Get a transformer supporting partial_fit, if the transform has one"""
+        return None
+
+    def get_chunks(self, index):
+        """Split an index to chunks of at least the configured size"""
+        num_chunks = max(1, len(index) // self.config.chunk_size)
+        return np.array_split(index, num_chunks)
+
+    def get_chunk_data(self, chunk):
+        """Fetch a chunk of the input; sparse and memory-mapped inputs are read one chunk at a time"""
+        data = self.input_vectors[chunk]
+        if type(data) is np.memmap:
+            data = np.asarray(data)
+        return data
+
+    def transform_chunk(self, data):
+        return self.transformer.transform(data)
+
+    def make_output_container(self):
+        """Preallocate the output matrix, memory-mapped on disk if configured"""
+        shape = (self.input_vectors.shape[0], self.dimension)
+        # partial outputs of a cascade selection must not overwrite the serialized full ones
+        if self.config.memmap and not self.data_pool.has_instance_selection():
+            path = self.serialization_path_preprocessed + ".npy"
+            info(f"Writing memory-mapped {self.name} outputs of shape {shape} to {path}")
+            return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+        return np.zeros(shape, np.float32)
+
+    def compute_incremental(self):
+        """Fit and apply the transform over bounded-size input chunks"""
+        error(f"Incremental computation is not supported for the {self.base_name} transform.", self.is_supervised)
+        self.transformer = self.get_incremental_transformer()
+        error(f"The {self.base_name} transform has no incremental variant.", self.transformer is None)
+
+        train_chunks = self.get_chunks(self.train_index)
+        with tictoc(f"Incremental {self.base_name} fitting on {len(self.train_index)} instances, {len(train_chunks)} chunks"):
+            for chunk in train_chunks:
+                self.transformer.partial_fit(self.get_chunk_data(chunk))
+
+        output_data = self.make_output_container()
+        self.output_roles = (roles.train,)
+        role_indexes = [self.train_index]
+        if self.test_index.size > 0:
+            self.output_roles = (roles.train, roles.test)
+            role_indexes.append(self.test_index)
+        for index in role_indexes:
+            for chunk in self.get_chunks(index):
+                vecs = self.transform_chunk(self.get_chunk_data(chunk))
+                # check each chunk as it is written
+                self.verify_transformed(vecs)
+                output_data[chunk, :] = vecs
+        if type(output_data) is np.memmap:
+            output_data.flush()
+        self.vectors = output_data
+
+        self.term_components = self.get_term_representations()
+        info(f"Output shape: {self.vectors.shape}")
 
     def get_raw_path(self):
         return None
 
     def get_all_preprocessed(self):
-        return self.vectors
+        # memory-mapped outputs are serialized by reference
+        vectors = self.vectors.filename if type(self.vectors) is np.memmap else self.vectors
+        return {"vectors": vectors, "indices": self.indices}
 
     def handle_preprocessed(self, data):
-        self.vectors = data
+        self.loaded_preprocessed = True
+        vectors, self.indices = data["vectors"], data["indices"]
+        if type(vectors) is str:
+            vectors = np.load(vectors, mmap_mode="r")
+        self.vectors = vectors
 
     def get_term_representations(self):
         """Return term-based, rather than document-based representations
@@ -129,70 +193,45 @@ class Transform(Serializable):
             error(
                 "{} result dimension {} does not match the prescribed input dimension {}"
                 .format(self.name, data_dim, self.dimension))
-        nans, _ = np.where(np.isnan(data))
-        if np.size(nans) != 0:
+        # locate nans only if any exist
+        if np.isnan(np.sum(data)):
+            nans, _ = np.where(np.isnan(data))
             error("{} result contains nan elements in :{}".format(
                 self.name, nans))
 
     def configure_name(self):
-        if self.is_supervised:
-            # set source name at the vector source
-            error(
-                "{} is supervised and needs an input bundle list.".format(
-                    self.get_full_name()),
-                len(self.inputs) <= 1)
-            # get the longest name, most probable
-            print(self.inputs.get_source_name())
-            self.input_name = max(self.inputs.get_source_name(),
-                                  key=lambda x: len(x))
-        else:
-            error(
-                "{} is not supervised but got an input bundle list, instead of a single bundle."
-                .format(self.get_full_name()),
-                len(self.inputs) <= 1)
-            # get the longest name, most probable
-            self.input_name = self.inputs.get_source_name()
-        self.name = "{}_{}_{}".format(self.input_name, self.base_name,
-                                      self.dimension)
+        if type(self.source_name) in [list, tuple]:
+            self.source_name = "_".join(self.source_name)
+        self.name = "{}_{}_{}".format(self.source_name, self.base_name, self.dimension)
         Component.configure_name(self, self.name)
 
-    def run(self):
-        """Transform component run function"""
-        error("{} needs vector information.".format(self.get_full_name()), not self.inputs.has_vectors())
-
+    def load_outputs_from_disk(self):
+        loaded = self.acquire_data()
+        if loaded:
+            info(f"Loaded {self.name} outputs of shape: {self.vectors.shape}.")
+        return loaded
+
+    def get_component_inputs(self):
+        """Fetch the input vectors, their indexes and, for supervised transforms, the labels"""
+        vectors = self.data_pool.request_data(Numeric, Indices, usage_matching="subset", client=self.name)
+        self.input_vectors = vectors.data.instances
+        self.indices = vectors.get_usage(Indices)
+        self.train_index, self.test_index = self.indices.get_train_test()
         if self.is_supervised:
-            error("{} is supervised and needs an input bundle list.".format(self.get_full_name()),
-                  len(self.inputs) <= 1)
-            error("{} got a {}-long bundle list, but a length of at most 2 is required."
-                .format(self.get_full_name(), len(self.inputs)),
-                len(self.inputs) > 2)
-            # verify that the input name is of the vectors source bundle
-            vectors_bundle_index = [
-                i for i in range(len(self.inputs))
-                if self.inputs.get(i).has_vectors()
-            ][0]
-            expected_name = self.inputs.get(
-                vectors_bundle_index).get_source_name()
-            if self.input_name != expected_name:
-                error("Supervised transform was configured to name {} but the vector bundle {} is encountered at runtime."
-                    .format(self.input_name, expected_name))
-
-            self.input_vectors = self.inputs.get(vectors_bundle_index).get_vectors().instances
-            self.train_epi = self.inputs.get(vectors_bundle_index).get_indices().elements_per_instance
-            error(f"{self.get_full_name()} is supervised and needs label information.", not self.inputs.has_labels())
-            self.train_labels = self.inputs.get_labels(enforce_single=True, roles=roles.train)
-        else:
-            error("{} is not supervised but got an input bundle list, instead of a single bundle."
-                .format(self.get_full_name()), len(self.inputs) <= 1)
-            self.input_vectors = self.inputs.get_vectors().instances
-
-        # indexes
-        self.train_index = self.inputs.get_indices(role=roles.train)
-        self.test_index = self.inputs.get_indices(role=roles.test)
-
-        self.populate()
+            labels = self.data_pool.request_data(None, Labels, usage_matching="subset", client=self.name,
+                                                 on_error_message=f"{self.get_full_name()} is supervised and needs label information.")
+            self.train_labels = [labels.data.instances[i] for i in self.train_index]
         self.input_dimension = self.input_vectors[0].shape[-1]
+
+    def build_model_from_inputs(self):
+        """Fit the transform; fitting projects the inputs as well"""
         self.compute()
-        # set the outputs: transformed vectors and identical indices
-        self.outputs.set_vectors(Numeric(vecs=self.vectors))
-        self.outputs.set_indices(self.inputs.get_indices())
+
+    def produce_outputs(self):
+        # outputs are computed while fitting the transform
+        pass
+
+    def set_component_outputs(self):
+        """Transformed vectors, under the input indexes"""
+        dp = DataPack(Numeric(self.vectors), self.indices)
+        self.data_pool.add_data_packs([dp], self.name)
@@ -1,12 +1,14 @@
 import logging
 import os
 import pickle
+import shutil
+import sys
 import time
 from collections import Counter, OrderedDict, namedtuple
 from os.path import exists
 import json
 
-import nltk
+import importlib
 import numpy as np
 import yaml
 
@@ -122,10 +124,35 @@ def well_defined(var, can_be=None, cannot_be=None, func=None):
     return var != cannot_be
 
 
+# exclusive nltk data folder, set from the configuration
+nltk_data_path = None
+
+def set_nltk_data_path(path):
+    """Set the nltk data folder, without importing nltk; it is applied by apply_nltk_data_path once nltk is loaded"""
+    global nltk_data_path
+    nltk_data_path = path
+    # for subprocesses
+    os.environ["NLTK_DATA"] = path
+    if "nltk" in sys.modules:
+        apply_nltk_data_path()
+
+def apply_nltk_data_path():
+    """Restrict nltk resource lookup to the configured data folder"""
+    if nltk_data_path is not None:
+        sys.modules["nltk"].data.path = [nltk_data_path]
+
 def nltk_download(config, name):
+    import nltk
+    apply_nltk_data_path()
     nltk.download(name, download_dir=nltk.data.path[0])
 
 
+def import_object(path):
+    """Import an object from a "package.module:name" specification"""
+    module_path, name = path.split(":")
+    return getattr(importlib.import_module(module_path), name)
+
+
 def setup_simple_logging(level="info", logging_dir="."):
     level = logging._nameToLevel[level.upper()]
     formatter = logging.Formatter(fmt='%(asctime)s - %(levelname)s - %(module)s - %(message)s')
@@ -201,17 +228,26 @@ def get_labelset(labels):
 
 
 # function for one-hot encoding, can handle multilabel
-def one_hot(labels, num_labels, is_multilabel):
-    output = np.empty((0, num_labels), np.float32)
-    for annot in labels:
-        binarized = np.zeros((1, num_labels), np.float32)
-        if type(annot) is list:
-            for lbl in annot:
-                binarized[0, lbl] = 1.0
-        else:
-            binarized[0, annot] = 1.0
-        output = np.append(output, binarized, axis=0)
-    return output
+def label_matrix(labels, num_labels):
+    """Sparse binary instance-label matrix from per-instance label collections or single labels"""
+    from scipy import sparse
+    labels = [np.atleast_1d(l) for l in labels]
+    lengths = np.fromiter((len(l) for l in labels), dtype=np.int64, count=len(labels))
+    cols = np.concatenate(labels).astype(np.int64) if len(labels) > 0 else np.empty(0, np.int64)
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    mat = sparse.csr_matrix((np.ones(len(cols), np.int8), cols, indptr), shape=(len(labels), num_labels))
+    mat.sum_duplicates()
+    mat.data[:] = 1
+    return mat
+
+def label_matrix_to_lists(matrix):
+    """Per-instance label index arrays from a binary instance-label matrix"""
+    matrix = matrix.tocsr()
+    return np.split(matrix.indices, matrix.indptr[1:-1])
+
+def one_hot(labels, num_labels, is_multilabel, sparse_output=False):
+    output = label_matrix(labels, num_labels)
+    return output if sparse_output else output.toarray().astype(np.float32)
 
 def all_labels_have_samples(labels, labelset):
     """Checks that at all labels have at least a sample in the label collection"""
@@ -333,14 +369,19 @@ def count_occurences(data, return_only_majority=False):
     """Gets majority (in terms of frequency) label in (potentially multilabel) input
     """
     counts = Counter()
-    try:
-        # iterable data
-        data[0].__iter__
-        for lab in data:
-            counts.update(lab)
-    except AttributeError:
-        # non-iterable data
-        counts = Counter(data)
+    if hasattr(data, "tocsc"):
+        # sparse instance-label matrix
+        freqs = np.asarray(data.sum(axis=0)).ravel()
+        counts = Counter({lbl: int(freqs[lbl]) for lbl in np.flatnonzero(freqs)})
+    else:
+        try:
+            # iterable data
+            data[0].__iter__
+            for lab in data:
+                counts.update(lab)
+        except AttributeError:
+            # non-iterable data
+            counts = Counter(data)
     # just the max label
     if return_only_majority:
         return counts.most_common(1)[0][0]
@@ -465,6 +506,85 @@ def write_pickled(path, data, msg="", write_intermmediate=True):
         pickle.dump(data, f)
 
 
+class ArrayExtractingPickler(pickle.Pickler):
+    """Pickler storing large numeric arrays as separate npy files, referenced from the pickle"""
+    def __init__(self, file, array_dir, min_bytes):
+        super().__init__(file)
+        self.array_dir = array_dir
+        self.min_bytes = min_bytes
+        self.arrays = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or obj.nbytes < self.min_bytes:
+            return None
+        if id(obj) not in self.arrays:
+            name = f"{len(self.arrays)}.npy"
+            np.save(os.path.join(self.array_dir, name), obj)
+            # keep a reference, so that the id is not reused by another array during the dump
+            self.arrays[id(obj)] = (obj, {"file": name, "shape": list(obj.shape), "dtype": str(obj.dtype)})
+        return self.arrays[id(obj)][1]["file"]
+
+
+class ArrayMappingUnpickler(pickle.Unpickler):
+    """Unpickler memory-mapping the arrays stored by the ArrayExtractingPickler"""
+    def __init__(self, file, array_dir):
+        super().__init__(file)
+        self.array_dir = array_dir
+        self.arrays = {}
+
+    def persistent_load(self, name):
+        if name not in self.arrays:
+            self.arrays[name] = np.load(os.path.join(self.array_dir, name), mmap_mode="r")
+        return self.arrays[name]
+
+
+def get_artifact_manifest_path(path):
+    return path + ".arrays" + os.sep + "manifest.json"
+
+
+def write_model_artifact(path, data, msg="", min_array_bytes=1 << 20):
+    """Serialize an object as a pickle, with large arrays in separate npy files listed in a manifest"""
+    if msg:
+        msg += " "
+    array_dir = os.path.dirname(get_artifact_manifest_path(path))
+    # write to temporary paths, replacing any existing artifact only once the dump succeeds
+    tmp_path, tmp_array_dir = path + ".tmp", array_dir + ".tmp"
+    if exists(tmp_array_dir):
+        shutil.rmtree(tmp_array_dir)
+    os.makedirs(tmp_array_dir)
+    info(f"Serializing {msg}to {path}")
+    with open(tmp_path, "wb") as f:
+        pickler = ArrayExtractingPickler(f, tmp_array_dir, min_array_bytes)
+        pickler.dump(data)
+    arrays = [entry for (_, entry) in pickler.arrays.values()]
+    with open(os.path.join(tmp_array_dir, "manifest.json"), "w") as f:
+        json.dump({"arrays": arrays, "bytes": sum(int(np.prod(a["shape"])) * np.dtype(a["dtype"]).itemsize for a in arrays)}, f)
+    if exists(array_dir):
+        old_array_dir = array_dir + ".old"
+        if exists(old_array_dir):
+            shutil.rmtree(old_array_dir)
+        os.rename(array_dir, old_array_dir)
+        os.rename(tmp_array_dir, array_dir)
+        shutil.rmtree(old_array_dir)
+    else:
+        os.rename(tmp_array_dir, array_dir)
+    os.replace(tmp_path, path)
+
+
+def read_model_artifact(path, msg=""):
+    """Deserialize an object written by write_model_artifact, memory-mapping its arrays; plain pickles are read as is"""
+    manifest_path = get_artifact_manifest_path(path)
+    if not exists(manifest_path):
+        return read_pickled(path, msg=msg)
+    if msg:
+        msg += " "
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    info(f"Reading serialized {msg}from {path}, mapping {len(manifest['arrays'])} arrays of {manifest['bytes'] / 2**20:.1f} MB")
+    with open(path, "rb") as f:
+        return ArrayMappingUnpickler(f, os.path.dirname(manifest_path)).load()
+
+
 def read_ordered_yaml(input_path, Loader=yaml.SafeLoader, object_pairs_hook=OrderedDict):
     """Read a yaml file preserving order of components
     """